@@ -0,0 +1,226 @@
+"""
+Admission control for heavy engine calls.
+
+Every endpoint is a plain `def` handler on the server's shared thread pool,
+so a few concurrent calendar or multi-year transit computations could take
+enough of its threads (and of the CPU) to starve /api/current and the /
+health check. The engine work behind the heavy endpoints - a result-cache
+miss, an event query, a crossing search, a batch, the chunks of a range
+stream - is handed to a ComputePool instead:
+
+- a pool runs its calls on its own `workers` threads, so however many heavy
+  requests arrive, no more than that many computations of the class run at once;
+- every request thread blocked on a pool counts against its limit of
+  workers + queue_depth: waiting for a worker, waiting for its call, waiting
+  on a computation another request started (admit(), around the single-flight
+  layer), or serving an open range stream. Past the limit a request fails at
+  once with Overloaded (a 503 with Retry-After) without doing any work,
+  instead of piling up threads that would time out anyway;
+- lightweight endpoints (/, /api/current, /api/live, /metrics) never enter a
+  pool. The heavy requests of a pool hold at most workers + queue_depth of
+  the shared threads, so the lightweight ones always find one free.
+
+Cache hits are answered without entering a pool. Time spent waiting for a
+worker is observed in compute_queue_seconds; stats() has the counts.
+"""
+import contextvars
+import math
+import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from metrics import Histogram, profiled_call
+
+# Items computed per pool call when a lazy stream is consumed through stream():
+# the first call computes STREAM_FIRST_CHUNK, so the response starts early, and
+# each following call twice as many, up to STREAM_CHUNK
+STREAM_FIRST_CHUNK = 1
+STREAM_CHUNK = 256
+
+QUEUE_SECONDS = Histogram("compute_queue_seconds", "Time engine calls waited for a compute pool worker", ["pool"])
+
+# Set in the pools' threads, so nested calls run inline instead of waiting on themselves
+_worker = threading.local()
+
+# Pools the current request thread is already admitted to, so it is counted once
+_admitted = threading.local()
+
+
+class Overloaded(Exception):
+    """A pool's queue is full; retry_after estimates the seconds until it has room."""
+
+    def __init__(self, pool, retry_after):
+        super().__init__(f"The {pool} queue is full; retry in {retry_after}s")
+        self.pool = pool
+        self.retry_after = retry_after
+
+
+def _mark_worker(pool):
+    _worker.pool = pool
+
+
+class _Stream:
+    """A stream() iterator; its pool slot is released once exhausted, closed or collected."""
+
+    def __init__(self, chunks, release):
+        self._chunks = chunks
+        self._release = release
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._chunks)
+
+    def close(self):
+        # A generator closed before its first item never runs its finally
+        self._chunks.close()
+        self._release()
+
+
+def _take(iterator, count):
+    return list(islice(iterator, count))
+
+
+class ComputePool:
+    """`workers` threads for one class of engine calls, with at most `queue_depth` calls waiting."""
+
+    def __init__(self, name, workers, queue_depth):
+        self.name = name
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{name}-pool",
+                                            initializer=_mark_worker, initargs=(self,))
+        self._lock = threading.Lock()
+        self.limit = workers + queue_depth
+        self.active = 0  # request threads (and open streams) counted against the limit
+        self.queued = 0
+        self.running = 0
+        self.calls = 0
+        self.rejected = 0
+        # Moving average of a call's run time, for Retry-After
+        self._call_seconds = 1.0
+
+    def retry_after(self):
+        """Whole seconds until the calls already admitted should be done."""
+        backlog = self.active / self.workers
+        return max(1, math.ceil(backlog * self._call_seconds))
+
+    def _acquire(self, check=True):
+        with self._lock:
+            if check and self.active >= self.limit:
+                self.rejected += 1
+                raise Overloaded(self.name, self.retry_after())
+            self.active += 1
+
+    def _release(self):
+        with self._lock:
+            self.active -= 1
+
+    @contextmanager
+    def admit(self):
+        """
+        Count the current thread against the limit for the block, or raise
+        Overloaded; run() calls inside it are not counted again. For waits
+        that may end up on a pool call made by another thread, e.g. a
+        single-flight computation.
+        """
+        pools = _admitted.__dict__.setdefault("pools", set())
+        if self in pools:
+            yield
+            return
+        self._acquire()
+        pools.add(self)
+        try:
+            yield
+        finally:
+            pools.discard(self)
+            self._release()
+
+    def run(self, fn, *args, admit=True):
+        """
+        fn(*args) on one of the pool's threads, in the caller's context, or
+        Overloaded when the pool is at its limit. admit=False skips the limit
+        check, for calls that continue work already admitted.
+        """
+        if getattr(_worker, "pool", None) is self:
+            return fn(*args)
+        if admit:
+            with self.admit():
+                return self._submit(fn, args)
+        return self._submit(fn, args)
+
+    def _submit(self, fn, args):
+        with self._lock:
+            self.queued += 1
+            self.calls += 1
+        future = self._executor.submit(contextvars.copy_context().run, self._call, time.perf_counter(), fn, args)
+        return future.result()
+
+    def _call(self, submitted, fn, args):
+        started = time.perf_counter()
+        QUEUE_SECONDS.observe(started - submitted, pool=self.name)
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+        try:
+            return profiled_call(fn, *args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.running -= 1
+                self._call_seconds += 0.2 * (elapsed - self._call_seconds)
+
+    def stream(self, items, chunk=STREAM_CHUNK, first_chunk=STREAM_FIRST_CHUNK):
+        """
+        Iterate the lazy iterable `items`, computing it in the pool in chunks
+        of first_chunk items, then twice as many each time up to `chunk`.
+        The stream is admitted here, so a full pool raises Overloaded before
+        a response has started, and stays counted against the limit until it
+        is exhausted, closed or garbage collected.
+        """
+        self._acquire()
+        iterator = iter(items)
+
+        def chunks():
+            size = min(first_chunk, chunk)
+            try:
+                while True:
+                    batch = self.run(_take, iterator, size, admit=False)
+                    yield from batch
+                    if len(batch) < size:
+                        return
+                    size = min(size * 2, chunk)
+            finally:
+                released()
+
+        stream = _Stream(chunks(), lambda: released())
+        # Also released if the response never starts iterating
+        released = weakref.finalize(stream, self._release)
+        return stream
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_depth": self.queue_depth,
+                "active": self.active,
+                "queued": self.queued,
+                "running": self.running,
+                "calls": self.calls,
+                "rejected": self.rejected,
+            }
+
+
+def pool_from_env(name, workers, queue_depth):
+    """ComputePool sized by <NAME>_WORKERS and <NAME>_QUEUE_DEPTH, with the given defaults."""
+    prefix = name.upper()
+    return ComputePool(name, max(1, int(os.environ.get(f"{prefix}_WORKERS", workers))),
+                       max(0, int(os.environ.get(f"{prefix}_QUEUE_DEPTH", queue_depth))))
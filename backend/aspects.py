@@ -0,0 +1,235 @@
+"""
+Vectorized aspect scanner.
+
+All bodies are sampled once over the window into a (bodies x samples) array.
+Every pairwise separation is computed by broadcasting, and crossings of every
+aspect angle are found in one pass as sign changes of the separation's offset
+from the angle (wrapped to [-180, 180)). Only the detected crossings are then
+refined, with a few Newton steps on the separation (relative speed is the
+derivative).
+
+Targets are separation angles (longitude of body1 - longitude of body2), so
+every aspect but the conjunction and the opposition is two targets: a trine
+is 120 and 240. Before sampling, reachable_combinations() drops the
+pair/target combinations that cannot become exact within the window: the
+separation of two bodies changes by at most the sum of their MAX_SPEED per
+day, so a combination further away than that times the window is skipped.
+
+aspect_windows() adds orbs: for each exact aspect the times the separation
+enters the orb (applying) and leaves it again (separating).
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from ephemeris import PLANETS, get_planet_position_speed, get_positions_speeds
+from search import MAX_SPEED
+
+# Aspect name -> angle. The calendar uses conjunction, trine and opposition.
+ASPECTS = {
+    "conjunction": 0,
+    "semisextile": 30,
+    "sextile": 60,
+    "square": 90,
+    "trine": 120,
+    "quincunx": 150,
+    "opposition": 180,
+}
+ASPECT_NAMES = {angle: name for name, angle in ASPECTS.items()}
+ASPECT_TITLES = {
+    0: "Conjunction", 30: "Semi-sextile (30)", 60: "Sextile (60)", 90: "Square (90)",
+    120: "Trine (120)", 150: "Quincunx (150)", 180: "Opposition",
+}
+
+# Orb (degrees either side of exact) per aspect angle
+DEFAULT_ORBS = {0: 8.0, 30: 2.0, 60: 4.0, 90: 6.0, 120: 6.0, 150: 3.0, 180: 8.0}
+
+# Separation angles checked by default: conjunction, trine (both sides), opposition
+DEFAULT_TARGETS = (0, 120, 180, 240)
+
+# Pairs that never form a meaningful aspect (Rahu and Ketu are always exactly opposite)
+SKIP_PAIRS = {frozenset(('Rahu', 'Ketu'))}
+
+SAMPLE_STEP = 0.25 # 6 hours
+
+AspectHit = namedtuple("AspectHit", ["jd", "body1", "body2", "angle", "longitude1"])
+
+# An AspectHit with its orb and the JDs the separation enters and leaves it
+# (None when that lies beyond MAX_ORB_SEARCH_DAYS)
+AspectWindow = namedtuple("AspectWindow", ["hit", "orb", "applying_jd", "separating_jd"])
+
+# Orb edges: smallest search step, and how far from exact to look for them
+MIN_ORB_STEP = 1.0 / 24
+MAX_ORB_SEARCH_DAYS = 730
+
+
+def aspect_targets(names):
+    """Separation angles of the named aspects, e.g. ['trine'] -> [120, 240]. Raises KeyError if unknown."""
+    targets = set()
+    for name in names:
+        angle = ASPECTS[name]
+        targets.update((angle, (360 - angle) % 360))
+    return sorted(targets)
+
+
+def aspect_angle(target):
+    """Aspect angle of a separation target: 240 -> 120."""
+    return min(target, 360 - target)
+
+
+def aspect_pairs(bodies):
+    """Indices (first, second) of the body pairs checked, first < second."""
+    first, second = np.triu_indices(len(bodies), 1)
+    keep = [frozenset((bodies[i], bodies[j])) not in SKIP_PAIRS for i, j in zip(first, second)]
+    return first[keep], second[keep]
+
+
+def reachable_combinations(bodies, start_jd, end_jd, method="sidereal", targets=DEFAULT_TARGETS):
+    """
+    {(body1, body2): boolean array over targets} of the pair/target combinations
+    that can become exact in [start_jd, end_jd], from one sample at start_jd
+    and the bodies' maximum speeds. Pairs are in aspect_pairs() order.
+    """
+    bodies = list(bodies)
+    first, second = aspect_pairs(bodies)
+    lons = np.array([get_planet_position_speed(start_jd, name, PLANETS[name], method)[0] for name in bodies])
+    max_speed = np.array([MAX_SPEED[name] for name in bodies])
+    angles = np.asarray(targets, dtype=float)
+    separation = (lons[first] - lons[second]) % 360
+    distance = np.abs((separation[None, :] - angles[:, None] + 180) % 360 - 180)
+    reach = (max_speed[first] + max_speed[second]) * (end_jd - start_jd)
+    reachable = distance <= reach[None, :]
+    return {(bodies[i], bodies[j]): reachable[:, n] for n, (i, j) in enumerate(zip(first, second))}
+
+
+def sample_positions(bodies, jds, method="sidereal"):
+    """Longitudes and speeds of every body at every JD, each shaped (len(bodies), len(jds))."""
+    lons = np.empty((len(bodies), len(jds)))
+    speeds = np.empty_like(lons)
+    for row, name in enumerate(bodies):
+        if name == 'Ketu' and 'Rahu' in bodies:
+            continue
+        lons[row], speeds[row] = get_positions_speeds(jds, name, PLANETS[name], method)
+    if 'Ketu' in bodies and 'Rahu' in bodies:
+        # Opposite the node already sampled for Rahu
+        ketu, rahu = bodies.index('Ketu'), bodies.index('Rahu')
+        lons[ketu] = (lons[rahu] + 180) % 360
+        speeds[ketu] = speeds[rahu]
+    return lons, speeds
+
+
+def _refine(body1, body2, angle, jd, lo, hi, method, tolerance, max_iter=6):
+    """Newton steps on the separation offset, kept inside [lo, hi]. Returns (jd, longitude1)."""
+    for _ in range(max_iter):
+        lon1, speed1 = get_planet_position_speed(jd, body1, PLANETS[body1], method)
+        lon2, speed2 = get_planet_position_speed(jd, body2, PLANETS[body2], method)
+        offset = (lon1 - lon2 - angle + 180) % 360 - 180
+        relative = speed1 - speed2
+        if relative == 0:
+            break
+        dt = offset / relative
+        if not lo <= jd - dt <= hi:
+            break
+        jd -= dt
+        lon1 -= speed1 * dt
+        if abs(dt) < tolerance:
+            break
+    return jd, lon1 % 360
+
+
+def find_aspects(bodies, start_jd, end_jd, method="sidereal", targets=DEFAULT_TARGETS,
+                 step=SAMPLE_STEP, tolerance=1.0 / 1440):
+    """
+    Find every exact aspect between pairs of `bodies` in [start_jd, end_jd).
+    Returns a list of AspectHit in time order.
+    """
+    jds = sample_grid(start_jd, end_jd, step)
+    lons, _ = sample_positions(bodies, jds, method)
+    return detect_aspects(bodies, jds, lons, start_jd, end_jd, method, targets, tolerance)
+
+
+def sample_grid(start_jd, end_jd, step=SAMPLE_STEP):
+    """JDs from start_jd every `step` days, up to the first one at or past end_jd."""
+    count = int(np.ceil((end_jd - start_jd) / step)) + 1
+    return start_jd + np.arange(count) * step
+
+
+def detect_aspects(bodies, jds, lons, start_jd, end_jd, method="sidereal", targets=DEFAULT_TARGETS,
+                   tolerance=1.0 / 1440, combinations=None):
+    """
+    Aspects between `bodies` from longitudes already sampled on the evenly
+    spaced grid `jds` (lons shaped (len(bodies), len(jds)), see sample_positions).
+    combinations: optional reachable_combinations() result; pairs missing from it are skipped.
+    Returns the refined AspectHit in [start_jd, end_jd), in time order.
+    """
+    bodies = list(bodies)
+    first, second = aspect_pairs(bodies)
+
+    # (pairs, samples) separations, then (targets, pairs, samples) offsets from each angle
+    separation = (lons[first] - lons[second]) % 360
+    angles = np.asarray(targets, dtype=float)
+    offset = (separation[None, :, :] - angles[:, None, None] + 180) % 360 - 180
+
+    before, after = offset[:, :, :-1], offset[:, :, 1:]
+    crossed = (before * after < 0) & (np.abs(before - after) < 180)
+    if combinations is not None:
+        none = np.zeros(len(angles), dtype=bool)
+        allowed = np.array([combinations.get((bodies[i], bodies[j]), none) for i, j in zip(first, second)]).T
+        crossed &= allowed.reshape(len(angles), len(first))[:, :, None]
+
+    hits = []
+    for t_idx, p_idx, k in zip(*np.nonzero(crossed)):
+        # Linear estimate inside the sample interval, then Newton refinement
+        fraction = abs(before[t_idx, p_idx, k]) / (abs(before[t_idx, p_idx, k]) + abs(after[t_idx, p_idx, k]))
+        lo, hi = jds[k], jds[k + 1]
+        estimate = lo + (hi - lo) * fraction
+        body1, body2 = bodies[first[p_idx]], bodies[second[p_idx]]
+        angle = float(angles[t_idx])
+        jd, lon1 = _refine(body1, body2, angle, estimate, lo, hi, method, tolerance)
+        if start_jd <= jd < end_jd:
+            hits.append(AspectHit(jd, body1, body2, angle, lon1))
+
+    hits.sort(key=lambda h: h.jd)
+    return hits
+
+
+def _offset(body1, body2, angle, jd, method):
+    lon1, _ = get_planet_position_speed(jd, body1, PLANETS[body1], method)
+    lon2, _ = get_planet_position_speed(jd, body2, PLANETS[body2], method)
+    return (lon1 - lon2 - angle + 180) % 360 - 180
+
+
+def orb_edge(hit, orb, direction, method="sidereal", tolerance=1.0 / 1440, max_days=MAX_ORB_SEARCH_DAYS):
+    """
+    JD where the separation of an AspectHit gets `orb` degrees away from exact,
+    walking from the exact time forward (direction 1) or backward (-1).
+    Steps are bounded by the bodies' maximum relative speed, so the edge
+    cannot be stepped over; the last step is bisected. None past max_days.
+    """
+    max_relative = MAX_SPEED[hit.body1] + MAX_SPEED[hit.body2]
+    t, distance = hit.jd, 0.0
+    while abs(t - hit.jd) < max_days:
+        step = max((orb - distance) / max_relative, MIN_ORB_STEP)
+        t_next = t + direction * step
+        distance_next = abs(_offset(hit.body1, hit.body2, hit.angle, t_next, method))
+        if distance_next >= orb:
+            inside, outside = t, t_next
+            while abs(outside - inside) > tolerance:
+                middle = (inside + outside) / 2
+                if abs(_offset(hit.body1, hit.body2, hit.angle, middle, method)) >= orb:
+                    outside = middle
+                else:
+                    inside = middle
+            return outside
+        t, distance = t_next, distance_next
+    return None
+
+
+def aspect_windows(hits, method="sidereal", orbs=DEFAULT_ORBS, tolerance=1.0 / 1440):
+    """AspectWindow for each AspectHit; orbs maps aspect angles (0-180) to orbs in degrees."""
+    windows = []
+    for hit in hits:
+        orb = orbs[aspect_angle(hit.angle)]
+        windows.append(AspectWindow(hit, orb, orb_edge(hit, orb, -1, method, tolerance),
+                                    orb_edge(hit, orb, 1, method, tolerance)))
+    return windows
@@ -0,0 +1,142 @@
+"""
+Bulk natal charts with columnar output.
+
+calculate_positions builds one list of formatted dicts per chart. For
+thousands of charts that formatting, and the per-chart Python loop, dominate.
+Here the records are converted to Julian Days once, planets are computed per
+body over the whole chunk with get_positions_speeds (a single table lookup per
+body when the tables cover the dates), and only the Ascendant, MC and house
+cusps need one swe.houses_ex call per chart. The cusps are Placidus, except
+beyond the polar circles where Placidus is undefined: those charts get
+Porphyry cusps (same Ascendant and MC), and the "house_system" column says
+which.
+
+The result is columnar: one array per field, indexed like the input records.
+Chunks of BATCH_CHUNK_SIZE charts are spread over the shared process pool of
+parallel.py (TRANSIT_WORKERS). Divisional signs (vargas.py) are computed once
+over the merged columns, all charts and bodies in one array.
+
+Usage: python batch.py [charts] [workers] prints the throughput in charts/s.
+"""
+import sys
+import time
+
+import numpy as np
+import swisseph as swe
+
+from engine import get_julian_day
+from ephemeris import PLANETS, canonical_method, get_positions_speeds, houses_ex
+from parallel import configured_workers, map_tasks
+from vargas import varga_signs
+
+BATCH_CHUNK_SIZE = 500
+HOUSE_SYSTEM = b'P'
+# For the charts where HOUSE_SYSTEM fails (Placidus beyond the polar circles)
+FALLBACK_HOUSE_SYSTEM = b'O'
+
+
+def _batch_chunk(task):
+    """Columns for one chunk: (jds, lats, lons, method) -> dict of lists."""
+    jds, lats, lons, method = task
+    jds = np.asarray(jds, dtype=float)
+    columns = {"longitude": {}, "speed": {}}
+    for name, planet_id in PLANETS.items():
+        if name == 'Ketu':
+            # Opposite Rahu; reuse its column instead of recomputing the node
+            rahu = np.asarray(columns["longitude"]['Rahu'])
+            columns["longitude"][name] = ((rahu + 180) % 360).tolist()
+            columns["speed"][name] = columns["speed"]['Rahu']
+            continue
+        lon, speed = get_positions_speeds(jds, name, planet_id, method)
+        columns["longitude"][name] = lon.tolist()
+        columns["speed"][name] = speed.tolist()
+
+    ascendant, mc, cusps, systems = [], [], [], []
+    for jd, lat, lon in zip(jds.tolist(), lats, lons):
+        system = HOUSE_SYSTEM
+        try:
+            house_cusps, ascmc = houses_ex(jd, lat, lon, system, method)
+        except swe.Error:
+            system = FALLBACK_HOUSE_SYSTEM
+            house_cusps, ascmc = houses_ex(jd, lat, lon, system, method)
+        ascendant.append(ascmc[0])
+        mc.append(ascmc[1])
+        cusps.append(house_cusps[:12])
+        systems.append(system.decode())
+    columns["ascendant"] = ascendant
+    columns["mc"] = mc
+    columns["house_system"] = systems
+    # One array per house, like the other fields
+    columns["cusps"] = [list(house) for house in zip(*cusps)] if cusps else [[] for _ in range(12)]
+    return columns
+
+
+def _merge(chunks):
+    merged = {"longitude": {name: [] for name in PLANETS}, "speed": {name: [] for name in PLANETS},
+              "ascendant": [], "mc": [], "house_system": [], "cusps": [[] for _ in range(12)]}
+    for chunk in chunks:
+        for field in ("longitude", "speed"):
+            for name in PLANETS:
+                merged[field][name].extend(chunk[field][name])
+        merged["ascendant"].extend(chunk["ascendant"])
+        merged["mc"].extend(chunk["mc"])
+        merged["house_system"].extend(chunk["house_system"])
+        for house, values in zip(merged["cusps"], chunk["cusps"]):
+            house.extend(values)
+    return merged
+
+
+def _vargas(columns, vargas):
+    """{varga: {body: list}} of the divisional signs of every planet and the Ascendant."""
+    bodies = list(columns["longitude"]) + ["Ascendant"]
+    longitudes = np.array([columns["longitude"][name] for name in bodies[:-1]] + [columns["ascendant"]], dtype=float)
+    longitudes = longitudes.reshape(len(bodies), -1)
+    return {varga: dict(zip(bodies, signs.tolist())) for varga, signs in varga_signs(longitudes, vargas).items()}
+
+
+def calculate_positions_batch(records, method: str = "sidereal", workers: int = None,
+                              chunk_size: int = BATCH_CHUNK_SIZE, vargas=()):
+    """
+    Planets, Ascendant, MC and Placidus house cusps for many charts.
+    records: iterable of (datetime, lat, lon); naive datetimes are taken as UTC.
+    Returns a columnar dict: "jd" (list), "longitude"/"speed" ({body: list}),
+    "ascendant", "mc" (lists), "cusps" (12 lists, house 1 first) and
+    "house_system" ("P", or "O" for Porphyry where Placidus fails), and with
+    vargas (names of vargas.VARGAS) "vargas": {varga: {body: list of 0-based signs}}.
+    workers is passed to parallel.map_tasks (default: the shared pool).
+    """
+    method = canonical_method(method)
+    jds, lats, lons = [], [], []
+    for dt, lat, lon in records:
+        jds.append(get_julian_day(dt))
+        lats.append(lat)
+        lons.append(lon)
+
+    tasks = [(jds[i:i + chunk_size], lats[i:i + chunk_size], lons[i:i + chunk_size], method)
+             for i in range(0, len(jds), chunk_size)]
+    result = _merge(map_tasks(_batch_chunk, tasks, workers))
+    result["jd"] = jds
+    if vargas:
+        result["vargas"] = _vargas(result, vargas)
+    return result
+
+
+if __name__ == "__main__":
+    from datetime import datetime, timedelta
+
+    import pytz
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    rng = np.random.default_rng(0)
+    start = datetime(1950, 1, 1, tzinfo=pytz.utc)
+    records = [(start + timedelta(minutes=int(m)), float(lat), float(lon))
+               for m, lat, lon in zip(rng.integers(0, 60 * 24 * 365 * 70, count),
+                                      rng.uniform(-60, 60, count), rng.uniform(-180, 180, count))]
+
+    calculate_positions_batch(records[:10], workers=workers)  # start the pool
+    t0 = time.perf_counter()
+    calculate_positions_batch(records, workers=workers)
+    elapsed = time.perf_counter() - t0
+    print(f"{count} charts in {elapsed:.2f}s: {count / elapsed:.0f} charts/s "
+          f"(workers: {configured_workers() if workers is None else workers})")
@@ -0,0 +1,56 @@
+"""
+Throughput and correctness of the engine under mixed-method concurrent load.
+
+Several threads run calculate_positions / calculate_transits with methods
+drawn at random (tropical and every ayanamsa), the way FastAPI's thread pool
+serves concurrent requests. Every result is compared with a single-threaded
+reference, so any leak of one request's sidereal mode into another shows up
+as a mismatch.
+
+Usage: python bench_concurrency.py [threads] [operations]
+"""
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytz
+
+from engine import calculate_positions, calculate_transits
+from ephemeris import METHODS
+
+DT = datetime(2024, 1, 1, 12, 0, tzinfo=pytz.utc)
+YEAR = 2024
+
+
+def run_op(op):
+    kind, method = op
+    if kind == "positions":
+        return [round(p["full_degree"], 9) for p in calculate_positions(DT, method=method)]
+    return [(t.planet, t.jd) for t in calculate_transits(YEAR, "Mars", method=method)]
+
+
+def bench(threads, ops, reference):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(run_op, ops))
+    elapsed = time.perf_counter() - start
+    mismatches = sum(1 for op, res in zip(ops, results) if res != reference[op])
+    return elapsed, mismatches
+
+
+if __name__ == "__main__":
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+
+    keys = [(kind, method) for kind in ("positions", "transits") for method in METHODS]
+    reference = {key: run_op(key) for key in keys}
+
+    rng = random.Random(0)
+    ops = [rng.choice(keys) for _ in range(count)]
+
+    print(f"{count} mixed operations over methods: {', '.join(METHODS)}")
+    for n in sorted({1, threads}):
+        elapsed, mismatches = bench(n, ops, reference)
+        print(f"  {n:3} threads: {elapsed:6.2f}s  {count / elapsed:7.1f} ops/s  mismatches: {mismatches}")
@@ -0,0 +1,178 @@
+"""
+Micro-benchmarks of engine.py with ephemeris-call accounting.
+
+Each operation (calculate_positions, calculate_transits for all planets and
+for one planet, calculate_monthly_events; both methods; several years) is
+measured for:
+
+- wall time: best of --repeat runs,
+- peak memory: tracemalloc peak during one extra run (timed runs are not traced),
+- calls: how many times swe.calc_ut, swe.houses_ex and swe.revjul were called
+  in one run - the number that matters when the time is spent in the ephemeris.
+
+`run` writes the results to a JSON baseline; `compare` measures again and
+flags every operation whose time, memory or call count grew by more than
+--threshold relative to the baseline (exit status 1 if any did). Results are
+only comparable between runs with the same ephemeris setup (the tables
+file in particular removes most calc_ut calls), which is recorded in "meta".
+
+Usage:
+    python bench_engine.py run [--output bench_baseline.json] [--repeat 3]
+    python bench_engine.py compare bench_baseline.json [--threshold 0.2]
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+import pytz
+import swisseph as swe
+
+import engine
+from ephemeris import EPHEMERIS_TABLES, EPHEMERIS_VERSION
+
+COUNTED_CALLS = ("calc_ut", "houses_ex", "revjul")
+DEFAULT_OUTPUT = "bench_baseline.json"
+
+# Representative years: inside the default tables span (2000-2050) and outside it
+YEARS = (1975, 2024, 2075)
+METHODS = ("sidereal", "tropical")
+SINGLE_PLANET = "Mars"
+MONTH = 3
+
+# Growth below these is noise whatever the ratio (call counts are exact)
+NOISE_FLOOR = {"wall_s": 0.001, "peak_kib": 16}
+
+
+def operations():
+    """(name, callable) for every benchmarked operation."""
+    ops = []
+    for method in METHODS:
+        for year in YEARS:
+            dt = datetime(year, 6, 15, 12, 0, tzinfo=pytz.utc)
+            ops.append((f"positions:{year}:{method}",
+                        lambda dt=dt, method=method: engine.calculate_positions(dt, method=method)))
+            ops.append((f"transits:{year}:all:{method}",
+                        lambda year=year, method=method: engine.calculate_transits(year, method=method)))
+            ops.append((f"transits:{year}:{SINGLE_PLANET}:{method}",
+                        lambda year=year, method=method: engine.calculate_transits(year, SINGLE_PLANET, method)))
+            ops.append((f"calendar:{year}-{MONTH:02}:{method}",
+                        lambda year=year, method=method: engine.calculate_monthly_events(year, MONTH, method)))
+    return ops
+
+
+class CallCounter:
+    """Counts calls of the COUNTED_CALLS functions of the swisseph module while active."""
+
+    def __init__(self):
+        self.counts = Counter()
+        self._originals = {}
+
+    def __enter__(self):
+        for name in COUNTED_CALLS:
+            original = self._originals[name] = getattr(swe, name)
+
+            def counted(*args, _name=name, _original=original, **kwargs):
+                self.counts[_name] += 1
+                return _original(*args, **kwargs)
+            setattr(swe, name, counted)
+        return self
+
+    def __exit__(self, *exc):
+        for name, original in self._originals.items():
+            setattr(swe, name, original)
+
+
+def measure(fn, repeat):
+    fn()  # warm up imports, table pages and caches
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    with CallCounter() as counter:
+        fn()
+    calls = {name: counter.counts[name] for name in COUNTED_CALLS}
+    return {"wall_s": round(best, 6), "peak_kib": round(peak / 1024, 1), "calls": calls}
+
+
+def run_all(repeat, only=None):
+    results = {}
+    for name, fn in operations():
+        if only and only not in name:
+            continue
+        results[name] = measure(fn, repeat)
+        r = results[name]
+        calls = " ".join(f"{k}={v}" for k, v in r["calls"].items())
+        print(f"  {name:32} {r['wall_s'] * 1000:9.2f} ms  {r['peak_kib']:9.1f} KiB  {calls}")
+    return results
+
+
+def meta():
+    return {
+        "engine_version": engine.ENGINE_VERSION,
+        "ephemeris_version": EPHEMERIS_VERSION,
+        "tables": EPHEMERIS_TABLES is not None,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "created": datetime.now(pytz.utc).isoformat(),
+    }
+
+
+def compare(baseline, current, threshold):
+    """Lines describing every metric that grew by more than threshold (a fraction)."""
+    regressions = []
+    for name, new in current.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        metrics = [("wall_s", old["wall_s"], new["wall_s"]), ("peak_kib", old["peak_kib"], new["peak_kib"])]
+        metrics += [(call, old["calls"].get(call, 0), new["calls"][call]) for call in COUNTED_CALLS]
+        for metric, before, after in metrics:
+            if after > before * (1 + threshold) and after - before > NOISE_FLOOR.get(metric, 0):
+                change = f"+{(after / before - 1) * 100:.0f}%" if before else "new"
+                regressions.append(f"{name} {metric}: {before} -> {after} ({change})")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark engine.py and count ephemeris calls.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_parser = sub.add_parser("run", help="Measure and write a baseline file")
+    run_parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    compare_parser = sub.add_parser("compare", help="Measure and compare with a baseline file")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("--threshold", type=float, default=0.2,
+                                help="Allowed relative growth per metric (default 0.2 = 20%%)")
+    for p in (run_parser, compare_parser):
+        p.add_argument("--repeat", type=int, default=3, help="Timed runs per operation (best is kept)")
+        p.add_argument("--only", help="Only operations whose name contains this string")
+    args = parser.parse_args()
+
+    print(f"engine {engine.ENGINE_VERSION}, {EPHEMERIS_VERSION}")
+    results = run_all(args.repeat, args.only)
+
+    if args.command == "run":
+        with open(args.output, "w") as f:
+            json.dump({"meta": meta(), "results": results}, f, indent=2)
+        print(f"Wrote {args.output}")
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["meta"]["ephemeris_version"] != EPHEMERIS_VERSION:
+            print(f"warning: baseline was measured with {baseline['meta']['ephemeris_version']}")
+        regressions = compare(baseline["results"], results, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+        sys.exit(1 if regressions else 0)
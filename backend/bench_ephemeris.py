@@ -0,0 +1,123 @@
+"""
+Per-call cost and longitude error of each ephemeris backend.
+
+For every backend whose data files are available (see ephemeris_backend.py)
+and for the precomputed tables (ephemeris_tables.py) when a table file is
+present, the same random dates are evaluated for every body:
+
+- cost: mean wall time of one swe.calc_ut (or table lookup) in microseconds,
+- error: mean and worst tropical longitude difference in arcseconds against
+  the most accurate backend available (jpl, else swiss, else moshier - which
+  then only measures cost, and the fit of the tables).
+
+Dates are drawn from 1900-2100 (inside the .se1 and DE440 coverage) and, for
+the tables, from the years the table file covers.
+
+Usage:
+    python bench_ephemeris.py [--samples 2000] [--output bench_ephemeris.json]
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import swisseph as swe
+
+from ephemeris_backend import BACKEND_FLAGS, configure
+from ephemeris_tables import TABLE_BODIES, load_tables
+
+# Most accurate first
+BACKEND_PREFERENCE = ("jpl", "swiss", "moshier")
+
+START_JD = 2415020.5  # 1900-01-01
+END_JD = 2488069.5    # 2100-01-01
+
+
+def available_backends():
+    """Backend names whose data files can be read, most accurate first."""
+    return [name for name in BACKEND_PREFERENCE if configure(name).name == name]
+
+
+def longitudes(backend, jds):
+    """{body: (longitudes, seconds per call)} with `backend` for every body of TABLE_BODIES."""
+    flags = configure(backend).flags | swe.FLG_SPEED
+    result = {}
+    for name, (planet_id, _, _) in TABLE_BODIES.items():
+        start = time.perf_counter()
+        values = [swe.calc_ut(jd, planet_id, flags)[0][0] for jd in jds]
+        result[name] = (np.array(values), (time.perf_counter() - start) / len(jds))
+    return result
+
+
+def table_longitudes(tables, jds):
+    result = {}
+    for name in TABLE_BODIES:
+        start = time.perf_counter()
+        values = [tables.lookup(name, jd, "tropical")[0] for jd in jds]
+        result[name] = (np.array(values), (time.perf_counter() - start) / len(jds))
+    return result
+
+
+def summarize(values, reference):
+    """{body: {cost_us, mean_error_arcsec, max_error_arcsec}}; errors are None without a reference."""
+    summary = {}
+    for name, (lons, per_call) in values.items():
+        entry = {"cost_us": round(per_call * 1e6, 2), "mean_error_arcsec": None, "max_error_arcsec": None}
+        if reference is not None:
+            error = np.abs((lons - reference[name][0] + 180) % 360 - 180) * 3600
+            entry["mean_error_arcsec"] = round(float(error.mean()), 4)
+            entry["max_error_arcsec"] = round(float(error.max()), 4)
+        summary[name] = entry
+    return summary
+
+
+def run(samples, seed=0):
+    rng = np.random.default_rng(seed)
+    jds = np.sort(rng.uniform(START_JD, END_JD, samples)).tolist()
+    backends = available_backends()
+    reference_name = backends[0] if len(backends) > 1 else None
+
+    results = {}
+    computed = {name: longitudes(name, jds) for name in backends}
+    reference = computed[reference_name] if reference_name else None
+    for name in backends:
+        results[name] = summarize(computed[name], None if name == reference_name else reference)
+
+    tables = load_tables()
+    if tables is not None:
+        # Against the best backend, even when it is the only one: that measures the fit
+        table_jds = np.sort(rng.uniform(tables.header["start_jd"], tables.header["end_jd"], samples)).tolist()
+        table_reference = longitudes(backends[0], table_jds)
+        results["tables"] = summarize(table_longitudes(tables, table_jds), table_reference)
+    return {"reference": reference_name, "unavailable": [n for n in BACKEND_FLAGS if n not in backends],
+            "results": results}
+
+
+def print_report(report):
+    print(f"reference: {report['reference'] or 'none (only one backend available)'}")
+    print(f"tables: {'yes' if 'tables' in report['results'] else 'no table file'}")
+    if report["unavailable"]:
+        print(f"unavailable (no data files): {', '.join(report['unavailable'])}")
+    for profile, bodies in report["results"].items():
+        costs = [b["cost_us"] for b in bodies.values()]
+        worst = [b["max_error_arcsec"] for b in bodies.values() if b["max_error_arcsec"] is not None]
+        summary = f"max error {max(worst):.4f}\"" if worst else "reference"
+        print(f"\n{profile}: mean {np.mean(costs):.2f} us/call, {summary}")
+        for name, b in bodies.items():
+            error = "" if b["max_error_arcsec"] is None else \
+                f"  error mean {b['mean_error_arcsec']:.4f}\" max {b['max_error_arcsec']:.4f}\""
+            print(f"  {name:8} {b['cost_us']:8.2f} us{error}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare ephemeris backends for speed and accuracy.")
+    parser.add_argument("--samples", type=int, default=2000, help="Random dates per body")
+    parser.add_argument("--output", help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    report = run(args.samples)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}")
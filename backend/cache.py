@@ -0,0 +1,236 @@
+"""
+Tiered result cache for the API.
+
+Values are the serialized JSON bodies of responses (bytes), so the memory
+tier can be bounded by size and a hit needs no re-encoding:
+
+- MemoryLRU: in-process LRU bounded by total bytes, with hit/miss/eviction stats.
+- DiskCache: SQLite file shared by all workers and kept across restarts,
+  bounded by total size, least recently used entries pruned first.
+- TieredCache: memory first, then disk (promoting disk hits into memory).
+
+ObjectLRU is a separate, count-bounded LRU of unserialized values for short
+lived intermediate results (the /api/current micro-cache).
+
+Keys should include ENGINE_VERSION / EPHEMERIS_VERSION so that a code or
+ephemeris change never serves stale entries.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryLRU:
+    """Thread-safe LRU of bytes values, bounded by the total size of the values."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._items[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._items),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class ObjectLRU:
+    """Thread-safe LRU of arbitrary (treated as immutable) values, bounded by entry count."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._items), "hits": self.hits, "misses": self.misses}
+
+
+class DiskCache:
+    """
+    SQLite-backed key/value store, bounded by the total size of the values.
+    Safe to share between threads and processes. Every PRUNE_EVERY writes (of
+    this process) the least recently read or written entries are deleted
+    until the values fit in max_bytes.
+    """
+
+    PRUNE_EVERY = 32
+
+    def __init__(self, path, max_bytes=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL DEFAULT 0)"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(results)")}
+            if "accessed" not in columns:
+                # Files written before the size bound: their entries count as least recently used
+                conn.execute("ALTER TABLE results ADD COLUMN accessed REAL NOT NULL DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+        self.prune()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._connection()
+        row = conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        with conn:
+            conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+        return bytes(row[0])
+
+    def set(self, key, value):
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+        with self._lock:
+            self._writes += 1
+            due = self._writes % self.PRUNE_EVERY == 0
+        if due:
+            self.prune()
+
+    def prune(self):
+        """Delete the least recently used entries until the values fit in max_bytes."""
+        if self.max_bytes is None:
+            return
+        with self._connection() as conn:
+            deleted = conn.execute(
+                "DELETE FROM results WHERE key IN ("
+                "SELECT key FROM (SELECT key, SUM(length(value)) OVER (ORDER BY accessed DESC, key) AS total"
+                " FROM results) WHERE total > ?)",
+                (self.max_bytes,),
+            ).rowcount
+        with self._lock:
+            self.evictions += deleted
+
+    def stats(self):
+        entries, size = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(length(value)), 0) FROM results").fetchone()
+        with self._lock:
+            return {"path": self.path, "entries": entries, "bytes": size, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+class TieredCache:
+    """Memory LRU in front of an optional disk store."""
+
+    def __init__(self, memory, disk=None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def stats(self):
+        return {
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk is not None else None,
+        }
+
+
+def make_etag(value):
+    """Strong ETag for a cached body."""
+    return '"' + hashlib.sha1(value).hexdigest() + '"'
+
+
+def cache_from_env():
+    """
+    Build the API cache from environment variables:
+    CACHE_MAX_BYTES (memory tier size, default 64 MB),
+    CACHE_DB_PATH (SQLite file; empty string disables the disk tier) and
+    CACHE_DB_MAX_BYTES (disk tier size, default 512 MB).
+    """
+    max_bytes = int(os.environ.get("CACHE_MAX_BYTES", 64 * 1024 * 1024))
+    default_db = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache.sqlite3")
+    db_path = os.environ.get("CACHE_DB_PATH", default_db)
+    db_max_bytes = int(os.environ.get("CACHE_DB_MAX_BYTES", 512 * 1024 * 1024))
+    disk = DiskCache(db_path, db_max_bytes) if db_path else None
+    return TieredCache(MemoryLRU(max_bytes), disk)
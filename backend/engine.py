@@ -1,23 +1,19 @@
 import swisseph as swe
 from datetime import datetime
+from itertools import islice
 import pytz
+from ephemeris import (
+    ALL_METHODS, METHOD_ALL, PLANETS, ayanamsa, canonical_method, houses_ex, tropical_position_speed,
+)
+from search import find_sign_ingresses, iter_crossings, SIGN_SPAN, STATION_RETROGRADE, TOLERANCE_SECOND
+from scanner import AspectDetector, IngressDetector, NakshatraIngressDetector, StationDetector, scan
+from aspects import ASPECT_NAMES, ASPECT_TITLES, DEFAULT_ORBS, aspect_angle, aspect_targets, aspect_windows
+from metrics import phase
 
-# Constants
-PLANETS = {
-    'Sun': swe.SUN,
-    'Moon': swe.MOON,
-    'Mars': swe.MARS,
-    'Mercury': swe.MERCURY,
-    'Jupiter': swe.JUPITER,
-    'Venus': swe.VENUS,
-    'Saturn': swe.SATURN,
-    'Rahu': swe.MEAN_NODE, # Using Mean Node for Rahu
-    'Ketu': None,          # Ketu is 180 degrees from Rahu
-    'Uranus': swe.URANUS,
-    'Neptune': swe.NEPTUNE,
-    'Pluto': swe.PLUTO
-}
+# Bump whenever calculation output changes; API cache keys include it.
+ENGINE_VERSION = "5"
 
+# Constants
 ZODIAC_SIGNS = [
     "Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo",
     "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces"
@@ -50,569 +46,422 @@ def get_julian_day(dt: datetime):
     return swe.julday(dt_utc.year, dt_utc.month, dt_utc.day, 
                       dt_utc.hour + dt_utc.minute/60.0 + dt_utc.second/3600.0)
 
-def calculate_positions(dt: datetime, method: str = "sidereal"):
+def jd_to_datetime(jd):
+    """Convert Julian Day (UT) to an aware UTC datetime, truncated to the second."""
+    year, month, day, hour_float = swe.revjul(jd)
+    h = int(hour_float)
+    m = int((hour_float - h) * 60)
+    s = int(((hour_float - h) * 60 - m) * 60)
+    return datetime(year, month, day, h, m, s, tzinfo=pytz.utc)
+
+# Event records. Engines return these compact objects (raw JD, body and codes);
+# the display strings are only built when a response is serialized, through
+# to_dict(tz), in the client's timezone.
+IST = pytz.timezone('Asia/Kolkata')
+MONTH_ABBR = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+EVENT_STATION = "station"
+EVENT_ASPECT = "aspect"
+EVENT_TRANSIT = "ingress"
+EVENT_NAKSHATRA = "nakshatra"
+
+
+def display_date(dt):
+    """'%d %b %Y' without strftime."""
+    return f"{dt.day:02d} {MONTH_ABBR[dt.month - 1]} {dt.year}"
+
+
+def display_clock(dt):
+    """'%I:%M %p' without strftime."""
+    return f"{dt.hour % 12 or 12:02d}:{dt.minute:02d} {'AM' if dt.hour < 12 else 'PM'}"
+
+
+def _local_isoformat(jd, tz):
+    return jd_to_datetime(jd).astimezone(tz).isoformat() if jd is not None else None
+
+
+class TransitRecord:
+    """A sign change of `planet`, as listed by /api/transits."""
+    __slots__ = ("jd", "planet", "from_index", "to_index", "retrograde")
+
+    def __init__(self, jd: float, planet: str, from_index: int, to_index: int, retrograde: bool):
+        self.jd = jd
+        self.planet = planet
+        self.from_index = from_index
+        self.to_index = to_index
+        self.retrograde = retrograde
+
+    def to_dict(self, tz=IST):
+        local = jd_to_datetime(self.jd).astimezone(tz)
+        return {
+            "planet": self.planet,
+            "from_sign": ZODIAC_SIGNS[self.from_index],
+            "to_sign": ZODIAC_SIGNS[self.to_index],
+            "iso_time": local.isoformat(),
+            "display_time": f"{display_date(local)}, {display_clock(local)}",
+            "is_retrograde": self.retrograde
+        }
+
+
+class CalendarEvent:
+    """
+    A calendar event of `body`. `kind` is one of the EVENT_* codes and `value`
+    its detail: the search.STATION_* kind, the aspect angle (with `other`, the
+    second body), or the sign / nakshatra index entered.
+    """
+    __slots__ = ("jd", "kind", "body", "value", "longitude", "other")
+
+    def __init__(self, jd: float, kind: str, body: str, value, longitude: float, other: str = None):
+        self.jd = jd
+        self.kind = kind
+        self.body = body
+        self.value = value
+        self.longitude = longitude
+        self.other = other
+
+    def title(self):
+        """(type, event_name) as shown in the calendar."""
+        if self.kind == EVENT_STATION:
+            etype = "Retrograde Start" if self.value == STATION_RETROGRADE else "Retrograde End"
+            return "Retrograde", f"{self.body} {etype}"
+        if self.kind == EVENT_ASPECT:
+            aspect_name = ASPECT_TITLES[aspect_angle(self.value)]
+            if self.value == 0:
+                sign_str = ZODIAC_SIGNS[int(self.longitude / 30)]
+                return aspect_name, f"{self.body} - {self.other} Conjunction ({sign_str})"
+            return aspect_name, f"{self.body} - {self.other} {aspect_name}"
+        if self.kind == EVENT_NAKSHATRA:
+            return "Nakshatra", f"{self.body} enters {NAKSHATRAS[self.value]}"
+        return "Transit", f"{self.body} enters {ZODIAC_SIGNS[self.value]}"
+
+    def to_dict(self, tz=IST):
+        local = jd_to_datetime(self.jd).astimezone(tz)
+        event_type, event_name = self.title()
+        return {
+            "date": local.isoformat(),
+            "display_date": display_date(local),
+            "time": display_clock(local),
+            "type": event_type,
+            "event_name": event_name,
+            "degree": f"{ZODIAC_SIGNS[int(self.longitude / 30)]} {format_degree(self.longitude % 30)}"
+        }
+
+
+class CrossingRecord:
+    """A crossing of `longitude` by `body`, as listed by /api/search/crossing."""
+    __slots__ = ("jd", "body", "longitude", "retrograde")
+
+    def __init__(self, jd: float, body: str, longitude: float, retrograde: bool):
+        self.jd = jd
+        self.body = body
+        self.longitude = longitude
+        self.retrograde = retrograde
+
+    def to_dict(self, tz=IST):
+        local = jd_to_datetime(self.jd).astimezone(tz)
+        return {
+            "body": self.body,
+            "longitude": self.longitude,
+            "degree": f"{ZODIAC_SIGNS[int(self.longitude / 30)]} {format_degree(self.longitude % 30)}",
+            "iso_time": local.isoformat(),
+            "display_time": f"{display_date(local)}, {display_clock(local)}",
+            "is_retrograde": self.retrograde
+        }
+
+
+class AspectRecord:
+    """An exact aspect with its orb window, as listed by /api/aspects."""
+    __slots__ = ("jd", "body1", "body2", "angle", "longitude", "orb", "applying_jd", "separating_jd")
+
+    def __init__(self, window):
+        hit = window.hit
+        self.jd = hit.jd
+        self.body1 = hit.body1
+        self.body2 = hit.body2
+        self.angle = int(aspect_angle(hit.angle))
+        self.longitude = hit.longitude1
+        self.orb = window.orb
+        self.applying_jd = window.applying_jd
+        self.separating_jd = window.separating_jd
+
+    def to_dict(self, tz=IST):
+        exact = jd_to_datetime(self.jd).astimezone(tz)
+        return {
+            "body1": self.body1,
+            "body2": self.body2,
+            "aspect": ASPECT_NAMES[self.angle],
+            "angle": self.angle,
+            "orb": self.orb,
+            "applying": _local_isoformat(self.applying_jd, tz),
+            "exact": exact.isoformat(),
+            "separating": _local_isoformat(self.separating_jd, tz),
+            "event_name": f"{self.body1} - {self.body2} {ASPECT_TITLES[self.angle]}",
+            "display_time": f"{display_date(exact)}, {display_clock(exact)}",
+            "degree": f"{ZODIAC_SIGNS[int(self.longitude / 30)]} {format_degree(self.longitude % 30)}"
+        }
+
+
+# Location used for the Ascendant when none is given - New Delhi, for IST
+DEFAULT_LATITUDE = 28.6139
+DEFAULT_LONGITUDE = 77.2090
+
+
+def calculate_positions(dt: datetime, method: str = "sidereal",
+                        lat: float = DEFAULT_LATITUDE, lon: float = DEFAULT_LONGITUDE):
     """
     Calculate planetary positions for a given datetime.
-    Defaults to Lahiri Ayanamsa (Sidereal).
+    Defaults to Lahiri Ayanamsa (Sidereal); see ephemeris.METHODS for the others.
+    The Ascendant (last entry) is computed for lat/lon.
+    method="all" returns {method: positions} for every method of
+    ephemeris.ALL_METHODS, from a single tropical pass.
     """
     jd = get_julian_day(dt)
-    
-    # Flags and Sidereal Mode setup
-    flags = swe.FLG_SWIEPH | swe.FLG_SPEED
-    if method == "sidereal":
-        swe.set_sid_mode(swe.SIDM_LAHIRI, 0, 0)
-        flags |= swe.FLG_SIDEREAL
-    # For tropical, we just don't set FLG_SIDEREAL
-    
+    planets = tropical_planet_positions(jd)
+    ascendant = tropical_ascendant(jd, lat, lon)
+    if method == METHOD_ALL:
+        return {m: planet_entries(planets, jd, m) + [ascendant_entry(ascendant, jd, m)] for m in ALL_METHODS}
+    return planet_entries(planets, jd, method) + [ascendant_entry(ascendant, jd, method)]
+
+
+def position_entry(name, longitude, retrograde):
+    """Position entry of a body at `longitude` in the zodiac it was computed in."""
+    sign_index = int(longitude / 30)
+    nakshatra_index = int(longitude / (360/27))
+    return {
+        "name": name,
+        "full_degree": longitude,
+        "sign": ZODIAC_SIGNS[sign_index],
+        "degree_str": format_degree(longitude % 30),
+        "nakshatra_index": nakshatra_index + 1,
+        "nakshatra_name": NAKSHATRAS[nakshatra_index],
+        "retrograde": retrograde
+    }
+
+
+def tropical_planet_positions(jd: float):
+    """
+    [(name, longitude, speed)] of the planets at jd in the tropical zodiac.
+    Every method's positions are derived from these (see planet_entries).
+    """
     positions = []
-    
     for name, planet_id in PLANETS.items():
-        if name == 'Ketu':
-            # Calculate Rahu first, then Ketu is opposite
-            # We already handle Rahu in the loop, so we can check if Rahu data exists or just recalculate
-            # Use 'Rahu' (Mean Node) position + 180 degrees
-            rahu_res = swe.calc_ut(jd, swe.MEAN_NODE, flags)
-             # swe.calc_ut returns ( (long, lat, dist, speed_long, ...), rflag )
-             # Wait, pyswisseph documentation says:
-             # calc_ut(jd, planet, flags) -> ((longitude, latitude, distance, speed_long, speed_lat, speed_dist), rflag)
-             # IF result is just one tuple, it might differ based on version.
-             # Actually, usually it returns a tuple of various coordinates.
-             # Let's inspect the output in dev mode if this fails, but usually index 0 is long.
-             # Wait, calc_ut returns a tuple of results if successful?
-             # documentation: 
-             # Returns: tuple (list of 6 floats (long, lat, dist, speed in long, speed in lat, speed in dist), integer (flags))
-             
-            rahu_pos = rahu_res[0][0] # Longitude
-            ketu_pos = (rahu_pos + 180) % 360
-            
-            sign_index = int(ketu_pos / 30)
-            degree_in_sign = ketu_pos % 30
-            nakshatra_index = int(ketu_pos / (360/27))
-            
-            positions.append({
-                "name": "Ketu",
-                "full_degree": ketu_pos,
-                "sign": ZODIAC_SIGNS[sign_index],
-                "degree_str": format_degree(degree_in_sign),
-                "nakshatra_index": nakshatra_index + 1,
-                "nakshatra_name": NAKSHATRAS[nakshatra_index],
-                "retrograde": True # Nodes are always retrograde (Mean nodes)
-            })
-            continue
-
-        # Planet Flags already contains method related flags
-        res = swe.calc_ut(jd, planet_id, flags)
-        
-        # res is ((long, lat, dist, speed_long, ...), rflag)
-        # So we want res[0][0] for longitude, res[0][3] for speed in longitude
-        
+        # Served from the precomputed tables when available, else swe.calc_ut
         try:
-             # Check structure
-             props = res[0]
-             lon = props[0]
-             speed = props[3]
+            lon, speed = tropical_position_speed(jd, name, planet_id)
         except (IndexError, TypeError):
-             # Fallback or error handling
-             # If calc_ut fails it might raise Error
-             print(f"Error calculating {name}: {res}")
-             continue
-        
-        sign_index = int(lon / 30)
-        degree_in_sign = lon % 30
-        nakshatra_index = int(lon / (360/27))
-        is_retrograde = speed < 0
-        
-        positions.append({
-            "name": name,
-            "full_degree": lon,
-            "sign": ZODIAC_SIGNS[sign_index],
-            "degree_str": format_degree(degree_in_sign),
-            "nakshatra_index": nakshatra_index + 1,
-            "nakshatra_name": NAKSHATRAS[nakshatra_index],
-            "retrograde": is_retrograde
-        })
-        
-        
-    # Calculate Ascendant (Lagna) - Using New Delhi as default for IST
-    lat = 28.6139
-    lon = 77.2090
-    
+            # Fallback or error handling
+            # If calc_ut fails it might raise Error
+            print(f"Error calculating {name}")
+            continue
+        positions.append((name, lon, speed))
+    return positions
+
+
+def planet_entries(tropical, jd: float, method: str = "sidereal"):
+    """Position entries in the zodiac of `method` for tropical_planet_positions(jd)."""
+    shift, rate = ayanamsa(jd, method)
+    entries = []
+    for name, lon, speed in tropical:
+        # Ketu is opposite the mean node, which is always retrograde
+        retrograde = True if name == 'Ketu' else speed - rate < 0
+        entries.append(position_entry(name, (lon - shift) % 360, retrograde))
+    return entries
+
+
+def calculate_planet_positions(jd: float, method: str = "sidereal"):
+    """Position entries of the planets (everything but the Ascendant) at jd."""
+    return planet_entries(tropical_planet_positions(jd), jd, method)
+
+
+# The Ascendant and MC are the same in every house system, but Placidus
+# (b'P') fails beyond the polar circles; Porphyry is defined at any latitude
+ASCENDANT_HOUSE_SYSTEM = b'O'
+
+
+def tropical_ascendant(jd: float, lat: float, lon: float):
+    """Tropical longitude of the Ascendant (Lagna) at jd for the given location."""
     # swe.houses_ex returns (cusps, ascmc)
     # ascmc[0] is Ascendant
-    flags_houses = swe.FLG_SWIEPH
-    if method == "sidereal":
-        flags_houses |= swe.FLG_SIDEREAL
-        
-    cusps, ascmc = swe.houses_ex(jd, lat, lon, b'P', flags_houses)
-    asc_deg = ascmc[0]
-    
-    asc_sign_index = int(asc_deg / 30)
-    asc_degree_in_sign = asc_deg % 30
-    asc_nakshatra_index = int(asc_deg / (360/27))
-    
-    positions.append({
-        "name": "Ascendant",
-        "full_degree": asc_deg,
-        "sign": ZODIAC_SIGNS[asc_sign_index],
-        "degree_str": format_degree(asc_degree_in_sign),
-        "nakshatra_index": asc_nakshatra_index + 1,
-        "nakshatra_name": NAKSHATRAS[asc_nakshatra_index],
-        "retrograde": False
-    })
+    cusps, ascmc = houses_ex(jd, lat, lon, ASCENDANT_HOUSE_SYSTEM, 'tropical')
+    return ascmc[0]
+
+
+def ascendant_entry(ascendant: float, jd: float, method: str = "sidereal"):
+    """Position entry of the Ascendant for tropical_ascendant(jd, ...) in the zodiac of `method`."""
+    shift, _ = ayanamsa(jd, method)
+    return position_entry("Ascendant", (ascendant - shift) % 360, False)
 
-    return positions
+
+def calculate_ascendant(jd: float, lat: float, lon: float, method: str = "sidereal"):
+    """Position entry of the Ascendant (Lagna) at jd for the given location."""
+    return ascendant_entry(tropical_ascendant(jd, lat, lon), jd, method)
 
 
 def get_sign_from_longitude(lon):
     return int(lon / 30)
 
+def transit_planets(planet_name: str = None):
+    """
+    Planets covered by a transit listing: just planet_name if given
+    (empty if unknown), otherwise all planets except the Moon.
+    """
+    if planet_name:
+        return [planet_name] if planet_name in PLANETS else []
+    # Exclude Moon for yearly overview as requested
+    return [n for n in PLANETS if n != 'Moon']
+
+def planet_transits(name: str, start_jd: float, end_jd: float, method: str = "sidereal"):
+    """Sign changes of one planet in [start_jd, end_jd), in time order."""
+    method = canonical_method(method)
+    transits = []
+    
+    # Speed-guided ingress search (see search.py): long steps while the planet
+    # is far from a sign boundary, Newton refinement once one is bracketed.
+    for ingress in find_sign_ingresses(name, start_jd, end_jd, method, tolerance=TOLERANCE_SECOND):
+        transits.append(transit_record(name, ingress))
+    return transits
+
+def transit_record(name: str, ingress):
+    """/api/transits entry (TransitRecord) for a search.Ingress of planet `name`."""
+    return TransitRecord(ingress.jd, name, ingress.from_index, ingress.to_index, ingress.speed < 0)
+
+def year_range_jd(year: int):
+    """Julian Days of 1 Jan `year` and 1 Jan `year + 1`, 00:00 UTC."""
+    start_jd = get_julian_day(datetime(year, 1, 1, tzinfo=pytz.utc))
+    end_jd = get_julian_day(datetime(year + 1, 1, 1, tzinfo=pytz.utc))
+    return start_jd, end_jd
+
 def calculate_transits(year: int, planet_name: str = None, method: str = "sidereal"):
     """
     Calculate transits (sign changes) for a specific year.
     If planet_name is provided, calculate only for that planet.
     Otherwise calculate for all planets (excluding Moon if year view).
+    Returns TransitRecord in time order.
+    For several years across CPU cores see parallel.calculate_transits_range.
     """
-    flags = swe.FLG_SWIEPH
-    if method == "sidereal":
-        swe.set_sid_mode(swe.SIDM_LAHIRI, 0, 0)
-        flags |= swe.FLG_SIDEREAL
-    
-    start_date = datetime(year, 1, 1, tzinfo=pytz.utc)
-    end_date = datetime(year + 1, 1, 1, tzinfo=pytz.utc)
-    
-    start_jd = get_julian_day(start_date)
-    end_jd = get_julian_day(end_date)
+    method = canonical_method(method)
+    start_jd, end_jd = year_range_jd(year)
     
     transits = []
-    
-    # Filter planets
-    targets = PLANETS.items()
-    if planet_name:
-        if planet_name not in PLANETS:
-            return []
-        targets = [(planet_name, PLANETS[planet_name])]
-    else:
-        # Exclude Moon for yearly overview as requested
-        targets = [(n, p) for n, p in targets if n != 'Moon']
-        
-    for name, planet_id in targets:
-        if name == 'Ketu': 
-            # Ketu is implicitly handled by Rahu logic usually, but here we need to track it explicitly
-            # For simplicity, we can calculate Rahu transits and invert?
-            # Or just step through.
-            # Let's step through for all planets for robustness, although usually we use root finding.
-            # Given the timescale (1 year), stepping by day is okayish, but maybe slow for details.
-            # OPTIMIZATION: Check start and end positions. If same sign, check for retrograde loops?
-            # Actually, simply checking every day is safe enough for 1 year script for ~10 planets.
-            pass
-
-        # We will iterate day by day to find sign changes. 
-        # For a more robust production app, we would use swisseph's transit search (swe.nd), but it might be complex to set up for sign ingress in sidereal.
-        # Simple approach: Step by 1 day. If sign changes, refine.
-        
-        current_jd = start_jd
-        
-        # Get initial position
-        if name == 'Ketu':
-             rahu_pos = swe.calc_ut(current_jd, swe.MEAN_NODE, flags)[0][0]
-             curr_pos = (rahu_pos + 180) % 360
-        else:
-             curr_pos = swe.calc_ut(current_jd, planet_id, flags)[0][0]
-             
-        curr_sign = get_sign_from_longitude(curr_pos)
-        
-        # Step value: 1 day is usually fine, but Moon needs finer.
-        # Since we exclude Moon for general view, 1 day is fine.
-        # If planet_name == Moon, we might need smaller steps? 
-        # Moon moves ~13 deg/day. 1 day step is fine to detect change, but we might miss a quick entry/exit?
-        # Actually Moon stays in a sign for ~2.25 days. 6 hours step is safer for Moon.
-        step = 1.0 if name != 'Moon' else 0.25
-        
-        while current_jd < end_jd:
-            next_jd = current_jd + step
-            
-            if name == 'Ketu':
-                 rahu_pos = swe.calc_ut(next_jd, swe.MEAN_NODE, flags)[0][0]
-                 next_pos = (rahu_pos + 180) % 360
-            else:
-                 next_pos = swe.calc_ut(next_jd, planet_id, flags)[0][0]
-            
-            next_sign = get_sign_from_longitude(next_pos)
-            
-            if curr_sign != next_sign:
-                # Sign change detected!
-                # Refine time? For now, we take the day/time of detection.
-                # To be precise, we could binary search between current_jd and next_jd.
-                
-                # Binary search for ingress
-                left, right = current_jd, next_jd
-                ingress_jd = right
-                target_sign = next_sign
-                
-                for _ in range(10): # 10 iterations is usually enough precision
-                    mid = (left + right) / 2
-                    if name == 'Ketu':
-                        r_p = swe.calc_ut(mid, swe.MEAN_NODE, flags)[0][0]
-                        mid_pos = (r_p + 180) % 360
-                    else:
-                        mid_pos = swe.calc_ut(mid, planet_id, flags)[0][0]
-                    
-                    mid_sign = get_sign_from_longitude(mid_pos)
-                    
-                    if mid_sign == target_sign:
-                        right = mid
-                        ingress_jd = mid
-                    else:
-                        left = mid
-                
-                # Convert ingress_jd back to date
-                dt_ingress = swe.revjul(ingress_jd) # returns (y, m, d, h)
-                # Convert to python datetime
-                # swe.revjul returns fractional hour.
-                year_i, month_i, day_i, hour_float = dt_ingress[0], dt_ingress[1], dt_ingress[2], dt_ingress[3]
-                
-                # Extract time
-                h = int(hour_float)
-                m = int((hour_float - h) * 60)
-                s = int(((hour_float - h) * 60 - m) * 60)
-                
-                ingress_dt_utc = datetime(year_i, month_i, day_i, h, m, s, tzinfo=pytz.utc)
-                ingress_dt_ist = ingress_dt_utc.astimezone(pytz.timezone('Asia/Kolkata'))
-                
-                # Get speed at ingress to check retrograde
-                if name == 'Ketu':
-                    _, speed_at_ingress = get_planet_position_speed(ingress_jd, 'Ketu', None, method)
-                else:
-                    _, speed_at_ingress = get_planet_position_speed(ingress_jd, name, planet_id, method)
-                
-                is_retrograde = speed_at_ingress < 0
-
-                transits.append({
-                    "planet": name,
-                    "from_sign": ZODIAC_SIGNS[curr_sign],
-                    "to_sign": ZODIAC_SIGNS[next_sign],
-                    "iso_time": ingress_dt_ist.isoformat(),
-                    "display_time": ingress_dt_ist.strftime("%d %b %Y, %I:%M %p"),
-                    "is_retrograde": is_retrograde
-                })
-                
-                curr_sign = next_sign
-                
-            current_jd = next_jd
-            curr_pos = next_pos # Optimization
+    with phase("transits.scan"):
+        for name in transit_planets(planet_name):
+            transits.extend(planet_transits(name, start_jd, end_jd, method))
             
     # Sort by time
-    transits.sort(key=lambda x: x['iso_time'])
+    transits.sort(key=lambda x: x.jd)
     
     return transits
 
 
-def get_planet_position_speed(jd, planet_name, planet_id, method: str = "sidereal"):
-    """Helper to get pos/speed for specific planet/node"""
-    flags = swe.FLG_SWIEPH | swe.FLG_SPEED
-    if method == "sidereal":
-        # Note: Mode should be set by caller for global efficiency, but we can set it here too if needed
-        # swe.set_sid_mode(swe.SIDM_LAHIRI, 0, 0)
-        flags |= swe.FLG_SIDEREAL
+# Calendar coverage: stations for planets with retrograde cycles (Sun/Moon never,
+# Nodes always retro/weird); aspects and sign changes for all but the Moon (noise).
+STATION_PLANETS = [n for n in PLANETS if n not in ('Sun', 'Moon', 'Rahu', 'Ketu')]
+EVENT_PLANETS = [n for n in PLANETS if n != 'Moon']
+
+# Conjunction, Trine, Opposition, as separation angles [0, 120, 180, 240]:
+# 240 is a trine measured the other way round.
+CALENDAR_ASPECT_NAMES = ("conjunction", "trine", "opposition")
+CALENDAR_ASPECTS = aspect_targets(CALENDAR_ASPECT_NAMES)
 
-    if planet_name == 'Ketu':
-        rahu_res = swe.calc_ut(jd, swe.MEAN_NODE, flags)
-        rahu_pos = rahu_res[0][0]
-        rahu_speed = rahu_res[0][3]
-        return (rahu_pos + 180) % 360, rahu_speed # Ketu speed same as Rahu (mean node)
+
+def aspect_planets(include_moon: bool = False):
+    """Bodies checked for aspects: EVENT_PLANETS, plus the Moon when asked for."""
+    return [n for n in PLANETS if include_moon or n != 'Moon']
+
+def month_range_jd(year: int, month: int):
+    """Julian Days of the 1st of the month and the 1st of the next month, 00:00 UTC."""
+    start_date = datetime(year, month, 1, tzinfo=pytz.utc)
+    if month == 12:
+        end_date = datetime(year + 1, 1, 1, tzinfo=pytz.utc)
     else:
-        res = swe.calc_ut(jd, planet_id, flags)
-        return res[0][0], res[0][3]
+        end_date = datetime(year, month + 1, 1, tzinfo=pytz.utc)
+    return get_julian_day(start_date), get_julian_day(end_date)
+
+def station_event(name: str, station):
+    """Calendar entry for a search.Station."""
+    return CalendarEvent(station.jd, EVENT_STATION, name, station.kind, station.longitude)
+
+def aspect_event(hit):
+    """Calendar entry for an aspects.AspectHit."""
+    return CalendarEvent(hit.jd, EVENT_ASPECT, hit.body1, hit.angle, hit.longitude1, hit.body2)
+
+def transit_event(name: str, ingress):
+    """Calendar entry for a search.Ingress. Its longitude is the sign boundary itself."""
+    return CalendarEvent(ingress.jd, EVENT_TRANSIT, name, ingress.to_index, ingress.longitude)
+
+def nakshatra_event(name: str, ingress):
+    """Calendar entry for a nakshatra change (a search.Ingress over NAKSHATRA_SPAN)."""
+    return CalendarEvent(ingress.jd, EVENT_NAKSHATRA, name, ingress.to_index, ingress.longitude)
 
-def calculate_monthly_events(year: int, month: int, method: str = "sidereal"):
+# scanner.ScanEvent kind -> calendar entry
+CALENDAR_EVENT_FORMATTERS = {
+    "station": lambda e: station_event(e.body, e.item),
+    "aspect": lambda e: aspect_event(e.item),
+    "ingress": lambda e: transit_event(e.body, e.item),
+    "nakshatra": lambda e: nakshatra_event(e.body, e.item),
+}
+
+def calculate_monthly_events(year: int, month: int, method: str = "sidereal", nakshatras: bool = False,
+                             aspects=CALENDAR_ASPECT_NAMES, include_moon: bool = False):
     """
     Calculate astrological events for a specific month.
     Includes:
-    - Aspects (Conjunction 0, Trine 120, Opposition 180)
+    - Aspects (by default Conjunction 0, Trine 120, Opposition 180; any names
+      of aspects.ASPECTS), with the Moon too when include_moon
     - Retrograde movements (Start/End)
+    - Transits (Sign Changes)
+    - With nakshatras=True, nakshatra changes (Moon excluded like transits)
+    Returns CalendarEvent in time order.
+    For arbitrary ranges, streamed, see streams.iter_events.
     """
-    flags = swe.FLG_SWIEPH
-    if method == "sidereal":
-        swe.set_sid_mode(swe.SIDM_LAHIRI, 0, 0)
-        flags |= swe.FLG_SIDEREAL
+    method = canonical_method(method)
     
     # Range: from 1st of month to 1st of next month
-    start_date = datetime(year, month, 1, tzinfo=pytz.utc)
-    if month == 12:
-        end_date = datetime(year + 1, 1, 1, tzinfo=pytz.utc)
-    else:
-        end_date = datetime(year, month + 1, 1, tzinfo=pytz.utc)
-        
-    start_jd = get_julian_day(start_date)
-    end_jd = get_julian_day(end_date)
-    
-    events = []
-    
-    # 1. RETROGRADE MOVEMENTS
-    # Check speed sign change
-    # We step by small increments to find station points.
-    # Optimization: Check daily. If speed sign differs, refine.
-    
-    planet_list = [(n, p) for n, p in PLANETS.items()] # All planets
-    
-    for name, pid in planet_list:
-        if name in ['Sun', 'Moon', 'Rahu', 'Ketu']: continue # These don't have standard retro cycles (Sun/Moon never, Nodes always retro/weird)
-        
-        current_jd = start_jd
-        _, prev_speed = get_planet_position_speed(current_jd, name, pid, method)
-        
-        step = 1.0 # 1 day
-        while current_jd < end_jd:
-            next_jd = current_jd + step
-            _, next_speed = get_planet_position_speed(next_jd, name, pid, method)
-            
-            if (prev_speed > 0 and next_speed < 0) or (prev_speed < 0 and next_speed > 0):
-                # Speed changed sign!
-                # Refine time of station (speed = 0)
-                # Binary search
-                l, r = current_jd, next_jd
-                station_jd = r
-                for _ in range(10):
-                    mid = (l + r) / 2
-                    _, mid_speed = get_planet_position_speed(mid, name, pid, method)
-                    # We want speed 0, usually transition point is between + and -
-                    if (prev_speed > 0 and mid_speed > 0) or (prev_speed < 0 and mid_speed < 0):
-                         l = mid
-                    else:
-                         r = mid
-                         station_jd = mid
-                
-                # Event Type
-                etype = "Retrograde Start" if prev_speed > 0 else "Retrograde End"
-                
-                dt_event = swe.revjul(station_jd)
-                e_date = datetime(dt_event[0], dt_event[1], dt_event[2], int(dt_event[3]), int((dt_event[3]%1)*60), tzinfo=pytz.utc)
-                ist_date = e_date.astimezone(pytz.timezone('Asia/Kolkata'))
-                
-                 # Get position at station
-                pos_station, _ = get_planet_position_speed(station_jd, name, pid, method)
-                deg_str = format_degree(pos_station % 30)
-                sign_str = ZODIAC_SIGNS[int(pos_station / 30)]
-                
-                events.append({
-                    "date": ist_date.isoformat(),
-                    "display_date": ist_date.strftime("%d %b %Y"),
-                    "time": ist_date.strftime("%I:%M %p"),
-                    "type": "Retrograde",
-                    "event_name": f"{name} {etype}",
-                    "degree": f"{sign_str} {deg_str}"
-                })
-                
-                prev_speed = next_speed # Update for next check logic
-            
-            prev_speed = next_speed
-            current_jd = next_jd
-
-    # 2. ASPECTS (0, 120, 180)
-    # We compare every pair of planets. 
-    # Pairs: (P1, P2) where P1 index < P2 index to avoid duplicates.
-    # Aspects to check: 0 (Conj), 120 (Trine), 180 (Opp)
-    # Note: 120 means separation is 120 OR 240 (which is 120 relative).
-    
-    aspects = [0, 120, 180]
-    
-    # We step through the month. 
-    # For every step, calculate all planet positions.
-    # Check if any pair crosses an aspect angle.
-    # Step size: 6 hours = 0.25 day (to catch fast moon aspects accurately-ish)
-    
-    step = 0.25 
-    current_jd = start_jd
-    
-    # Pre-calculate positions for start
-    # Store as {name: pos}
-    prev_positions = {}
-    for name, pid in planet_list:
-        p, _ = get_planet_position_speed(current_jd, name, pid, method)
-        prev_positions[name] = p
-        
-    while current_jd < end_jd:
-        next_jd = current_jd + step
-        next_positions = {}
-        for name, pid in planet_list:
-            p, _ = get_planet_position_speed(next_jd, name, pid, method)
-            next_positions[name] = p
-            
-        # Check pairs (exclude Moon to reduce noise in calendar)
-        names = [n for n in PLANETS.keys() if n != 'Moon']
-        for i in range(len(names)):
-            for j in range(i + 1, len(names)):
-                p1 = names[i]
-                p2 = names[j]
-                
-                # Check aspect crossing
-                pos1_prev = prev_positions[p1]
-                pos2_prev = prev_positions[p2]
-                diff_prev = (pos1_prev - pos2_prev) % 360
-                
-                pos1_next = next_positions[p1]
-                pos2_next = next_positions[p2]
-                diff_next = (pos1_next - pos2_next) % 360
-                
-                # Check for crossing of 0, 120, 180, 240 (which is 120 other side)
-                targets = [0, 120, 180, 240]
-                
-                for target in targets:
-                    # We check if diff crossed target
-                    # Be careful of 360 wrap-around
-                    # Simple way: check absolute difference from target
-                    d_prev = min(abs(diff_prev - target), 360 - abs(diff_prev - target)) # Shortest distance to target
-                    d_next = min(abs(diff_next - target), 360 - abs(diff_next - target)) 
-                    
-                    # If we crossed, the sign of (diff - target) might change, OR wrapping happened.
-                    # Robust way: If shortest arc distance decreases then increases? No, that's min point.
-                    # Crossing: one is 'before', one is 'after'.
-                    # Or simpler: if diff_prev < target < diff_next (handling wrap)
-                    
-                    # Let's use a function to determine if 'target' is strictly between angle1 and angle2 in the shortest path direction.
-                    # Actually, since step is small (6h), movement is small (< 8 deg for moon, < 1 deg for others).
-                    # We can normalize so that current is 0.
-                    
-                    # Angle between prev and next is small.
-                    # We can model movement linearly.
-                    # relative_speed = (diff_next - diff_prev) (handled for wrap)
-                    
-                    # Let's simplify:
-                    # If abs(diff_prev - target) + abs(diff_next - target) is roughly abs(diff_prev - diff_next)? No.
-                    
-                    # Correct Robust Way:
-                    # diff_prev and diff_next are in [0, 360).
-                    # We want to know if 'target' was crossed.
-                    # Normalize everything to be relative to target?
-                    # Let val_prev = (diff_prev - target + 180) % 360 - 180  Output [-180, 180]
-                    # Let val_next = (diff_next - target + 180) % 360 - 180
-                    # If val_prev and val_next have different signs, AND abs(val_prev - val_next) < 180, then crossed.
-                    
-                    val_prev = (diff_prev - target + 180) % 360 - 180
-                    val_next = (diff_next - target + 180) % 360 - 180
-                    
-                    if (val_prev * val_next < 0) and abs(val_prev - val_next) < 180:
-                        # Crossed!
-                        # Interpolate time
-                        fraction = abs(val_prev) / (abs(val_prev) + abs(val_next))
-                        exact_jd = current_jd + step * fraction
-                        
-                        # Event details
-                        dt_cross = swe.revjul(exact_jd)
-                        e_date = datetime(dt_cross[0], dt_cross[1], dt_cross[2], int(dt_cross[3]), int((dt_cross[3]%1)*60), tzinfo=pytz.utc)
-                        ist_date = e_date.astimezone(pytz.timezone('Asia/Kolkata'))
-                        
-                        # Pos at exact time
-                        p1_pos_exact, _ = get_planet_position_speed(exact_jd, p1, PLANETS[p1], method)
-                        # p2_pos_exact same...
-                        
-                        deg_str = format_degree(p1_pos_exact % 30)
-                        sign_str = ZODIAC_SIGNS[int(p1_pos_exact / 30)]
-                        
-                        aspect_name = "Conjunction" if target == 0 else "Opposition" if target == 180 else "Trine (120)"
-                        event_name = f"{p1} - {p2} {aspect_name}"
-                        if aspect_name == "Conjunction":
-                            event_name = f"{p1} - {p2} Conjunction ({sign_str})"
-                        
-                        events.append({
-                            "date": ist_date.isoformat(),
-                            "display_date": ist_date.strftime("%d %b %Y"),
-                            "time": ist_date.strftime("%I:%M %p"),
-                            "type": aspect_name,
-                            "event_name": event_name,
-                            "degree": f"{sign_str} {deg_str}"
-                        })
-        
-        prev_positions = next_positions
-        current_jd = next_jd
-    
+    start_jd, end_jd = month_range_jd(year, month)
+
+    # One shared 6-hour sample grid feeds every detector (see scanner.py):
+    # 1. RETROGRADE MOVEMENTS - stations (speed = 0)
+    # 2. ASPECTS (0, 120, 180) - every pair/angle in one vectorized pass
     # 3. TRANSITS (Sign Changes) - Exclude Moon
-    # Step through the month to detect when planets change signs
-    
-    transit_planets = [(n, p) for n, p in PLANETS.items() if n != 'Moon']
-    
-    for name, pid in transit_planets:
-        current_jd = start_jd
-        
-        # Get initial position and sign
-        if name == 'Ketu':
-            rahu_pos = swe.calc_ut(current_jd, swe.MEAN_NODE, flags)[0][0]
-            curr_pos = (rahu_pos + 180) % 360
-        else:
-            curr_pos = swe.calc_ut(current_jd, pid, flags)[0][0]
-        
-        curr_sign = get_sign_from_longitude(curr_pos)
-        
-        # Step size: 1 day for most planets
-        step = 1.0
-        
-        while current_jd < end_jd:
-            next_jd = current_jd + step
-            
-            if name == 'Ketu':
-                rahu_pos = swe.calc_ut(next_jd, swe.MEAN_NODE, flags)[0][0]
-                next_pos = (rahu_pos + 180) % 360
-            else:
-                next_pos = swe.calc_ut(next_jd, pid, flags)[0][0]
-            
-            next_sign = get_sign_from_longitude(next_pos)
-            
-            if curr_sign != next_sign:
-                # Sign change detected! Binary search for precise time
-                left, right = current_jd, next_jd
-                ingress_jd = right
-                target_sign = next_sign
-                
-                for _ in range(10):
-                    mid = (left + right) / 2
-                    if name == 'Ketu':
-                        r_p = swe.calc_ut(mid, swe.MEAN_NODE, flags)[0][0]
-                        mid_pos = (r_p + 180) % 360
-                    else:
-                        mid_pos = swe.calc_ut(mid, pid, flags)[0][0]
-                    
-                    mid_sign = get_sign_from_longitude(mid_pos)
-                    
-                    if mid_sign == target_sign:
-                        right = mid
-                        ingress_jd = mid
-                    else:
-                        left = mid
-                
-                # Convert to datetime
-                dt_ingress = swe.revjul(ingress_jd)
-                year_i, month_i, day_i, hour_float = dt_ingress[0], dt_ingress[1], dt_ingress[2], dt_ingress[3]
-                
-                h = int(hour_float)
-                m = int((hour_float - h) * 60)
-                s = int(((hour_float - h) * 60 - m) * 60)
-                
-                ingress_dt_utc = datetime(year_i, month_i, day_i, h, m, s, tzinfo=pytz.utc)
-                ist_date = ingress_dt_utc.astimezone(pytz.timezone('Asia/Kolkata'))
-                
-                # Get position for degree display
-                if name == 'Ketu':
-                    r_p = swe.calc_ut(ingress_jd, swe.MEAN_NODE, flags)[0][0]
-                    pos_at_ingress = (r_p + 180) % 360
-                else:
-                    pos_at_ingress = swe.calc_ut(ingress_jd, pid, flags)[0][0]
-                
-                deg_str = format_degree(pos_at_ingress % 30)
-                sign_str = ZODIAC_SIGNS[next_sign]
-                
-                events.append({
-                    "date": ist_date.isoformat(),
-                    "display_date": ist_date.strftime("%d %b %Y"),
-                    "time": ist_date.strftime("%I:%M %p"),
-                    "type": "Transit",
-                    "event_name": f"{name} enters {sign_str}",
-                    "degree": f"{sign_str} {deg_str}"
-                })
-                
-                curr_sign = next_sign
-            
-            current_jd = next_jd
-            curr_pos = next_pos
-        
-    events.sort(key=lambda x: x['date'])
-    return events
+    detectors = [
+        StationDetector(STATION_PLANETS),
+        AspectDetector(aspect_planets(include_moon), aspect_targets(aspects)),
+        IngressDetector(EVENT_PLANETS, SIGN_SPAN, TOLERANCE_SECOND),
+    ]
+    if nakshatras:
+        detectors.append(NakshatraIngressDetector(EVENT_PLANETS, TOLERANCE_SECOND))
+
+    with phase("calendar.scan"):
+        found = scan(detectors, start_jd, end_jd, method)
+
+    # scan() already returns them in time order
+    return [CALENDAR_EVENT_FORMATTERS[e.kind](e) for e in found]
+
+
+def calculate_aspects(start_jd: float, end_jd: float, method: str = "sidereal", aspects=CALENDAR_ASPECT_NAMES,
+                      orb: float = None, include_moon: bool = False):
+    """
+    Exact aspects in [start_jd, end_jd) with their orb windows (AspectRecord,
+    time order). aspects: names of aspects.ASPECTS; orb: degrees for every
+    aspect instead of aspects.DEFAULT_ORBS.
+    """
+    method = canonical_method(method)
+    orbs = DEFAULT_ORBS if orb is None else dict.fromkeys(DEFAULT_ORBS, orb)
+    detector = AspectDetector(aspect_planets(include_moon), aspect_targets(aspects), TOLERANCE_SECOND)
+    with phase("aspects.scan"):
+        found = scan([detector], start_jd, end_jd, method)
+        windows = aspect_windows([e.item for e in found], method, orbs)
+    return [AspectRecord(window) for window in windows]
+
+
+def calculate_crossings(body: str, longitudes, start_jd: float, end_jd: float, method: str = "sidereal",
+                        limit: int = None):
+    """
+    Every time `body` reaches one of `longitudes` (degrees in the zodiac of
+    `method`) in [start_jd, end_jd), retrograde re-crossings included, as
+    CrossingRecord in time order; at most `limit` of them when given.
+    """
+    method = canonical_method(method)
+    crossings = iter_crossings(body, longitudes, start_jd, end_jd, method, TOLERANCE_SECOND)
+    with phase("crossings.search"):
+        return [CrossingRecord(c.jd, body, c.target, c.speed < 0) for c in islice(crossings, limit)]
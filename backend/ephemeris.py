@@ -0,0 +1,271 @@
+import threading
+
+import numpy as np
+import swisseph as swe
+from ephemeris_backend import backend_from_env
+from ephemeris_tables import load_tables
+from metrics import EPHEMERIS_CALLS
+
+# Moshier, Swiss (.se1 files) or JPL, chosen by EPHEMERIS_BACKEND (see ephemeris_backend.py).
+# Every calculation below passes its flags.
+EPHEMERIS_BACKEND = backend_from_env()
+EPHEMERIS_FLAGS = EPHEMERIS_BACKEND.flags
+
+# Precomputed Chebyshev tables (see ephemeris_tables.py), memory-mapped once per process.
+# None when no table file is present; every lookup then goes to Swiss Ephemeris.
+EPHEMERIS_TABLES = load_tables()
+
+# Identifies the ephemeris data behind every result (part of the API cache keys)
+EPHEMERIS_VERSION = f"swe-{swe.version}-{EPHEMERIS_BACKEND.name}"
+if EPHEMERIS_TABLES is not None:
+    EPHEMERIS_VERSION += "+tables-{}-{}-{}".format(EPHEMERIS_TABLES.header.get('backend', 'unknown'),
+                                                   EPHEMERIS_TABLES.header['start_year'],
+                                                   EPHEMERIS_TABLES.header['end_year'])
+
+PLANETS = {
+    'Sun': swe.SUN,
+    'Moon': swe.MOON,
+    'Mars': swe.MARS,
+    'Mercury': swe.MERCURY,
+    'Jupiter': swe.JUPITER,
+    'Venus': swe.VENUS,
+    'Saturn': swe.SATURN,
+    'Rahu': swe.MEAN_NODE, # Using Mean Node for Rahu
+    'Ketu': None,          # Ketu is 180 degrees from Rahu
+    'Uranus': swe.URANUS,
+    'Neptune': swe.NEPTUNE,
+    'Pluto': swe.PLUTO
+}
+
+# Sidereal systems selectable through the `method` parameter. "sidereal" is the
+# default and means Lahiri; "lahiri" is accepted as an alias of it.
+AYANAMSAS = {
+    'sidereal': swe.SIDM_LAHIRI,
+    'raman': swe.SIDM_RAMAN,
+    'kp': swe.SIDM_KRISHNAMURTI,
+    'fagan_bradley': swe.SIDM_FAGAN_BRADLEY,
+}
+METHOD_ALIASES = {'lahiri': 'sidereal'}
+METHODS = ('tropical',) + tuple(AYANAMSAS) + tuple(METHOD_ALIASES)
+# Every zodiac once, for method=all; computed from one tropical pass
+ALL_METHODS = ('tropical',) + tuple(AYANAMSAS)
+METHOD_ALL = 'all'
+
+# Positions are always computed tropical; a sidereal longitude is the tropical
+# one minus the ayanamsa of its system, and its speed the tropical speed minus
+# the ayanamsa's rate (identical to swe's FLG_SIDEREAL, which does the same
+# subtraction). The ayanamsa is the system's mean ayanamsa (swe.get_ayanamsa_ut,
+# a precession polynomial) plus the nutation in longitude, shared by all
+# systems. Both are smooth, so they are evaluated exactly on nodes every
+# AYANAMSA_NODE_DAYS, cached, and interpolated with a cubic in between: under
+# 1e-4" in value and 1e-8 degree/day in rate, a few microseconds per call
+# instead of a swe call per body and system.
+AYANAMSA_NODE_DAYS = 0.5
+# Nodes kept per system before the node cache is cleared
+MAX_AYANAMSA_NODES = 500000
+
+# The sidereal mode is global state inside Swiss Ephemeris (per thread in
+# thread-local builds such as the pyswisseph wheels, per process otherwise), and
+# FastAPI runs sync endpoints on a thread pool. Every call that depends on it goes
+# through calc_ut() or the ayanamsa nodes below, which set the mode for the
+# calling thread and compute under one lock, so concurrent requests with different methods cannot
+# see each other's ayanamsa in either kind of build. Nothing else should call
+# swe.set_sid_mode.
+_swe_lock = threading.Lock()
+# (thread ident, mode) of the last set_sid_mode call. Setting the mode flushes
+# swe's position cache, so it is skipped when the same thread asks for the
+# same mode again; any interleaving sets it afresh, which is correct whether
+# the state is per thread or per process.
+_last_sid_mode = None
+
+
+def canonical_method(method):
+    """Validate a method name and resolve aliases. Raises ValueError if unknown."""
+    method = METHOD_ALIASES.get(method, method)
+    if method != 'tropical' and method not in AYANAMSAS:
+        raise ValueError(f"Unknown method '{method}'. Expected one of: {', '.join(METHODS)}")
+    return method
+
+
+def _method_flags(method):
+    """Set the sidereal mode for method and return the extra flags. Caller holds _swe_lock."""
+    global _last_sid_mode
+    sid_mode = AYANAMSAS.get(method)
+    if sid_mode is None:
+        return 0
+    key = (threading.get_ident(), sid_mode)
+    if _last_sid_mode != key:
+        swe.set_sid_mode(sid_mode, 0, 0)
+        _last_sid_mode = key
+    return swe.FLG_SIDEREAL
+
+
+_nutation_nodes = {}
+# method -> {node index: ayanamsa}
+_ayanamsa_nodes = {}
+
+
+def _node_values(method, nodes):
+    """Exact ayanamsa of `method` at the node indexes `nodes` (iterable of int), through the node caches."""
+    nodes = list(nodes)
+    values = _ayanamsa_nodes.setdefault(method, {})
+    # Read into a local dict: another thread may clear the caches at any time
+    found = {k: values.get(k) for k in nodes}
+    missing = [k for k, value in found.items() if value is None]
+    if missing:
+        EPHEMERIS_CALLS.inc(len(missing), function="ayanamsa")
+        with _swe_lock:
+            if len(values) > MAX_AYANAMSA_NODES:
+                values.clear()
+            if len(_nutation_nodes) > MAX_AYANAMSA_NODES:
+                _nutation_nodes.clear()
+            _method_flags(method)
+            for k in missing:
+                jd = k * AYANAMSA_NODE_DAYS
+                nutation = _nutation_nodes.get(k)
+                if nutation is None:
+                    nutation = _nutation_nodes[k] = swe.calc_ut(jd, swe.ECL_NUT, EPHEMERIS_FLAGS)[0][2]
+                found[k] = values[k] = swe.get_ayanamsa_ut(jd) + nutation
+    return [found[k] for k in nodes]
+
+
+def _cubic(x, y0, y1, y2, y3):
+    """Cubic through (-1, y0), (0, y1), (1, y2), (2, y3) and its derivative, at x in [0, 1)."""
+    a = (-y0 + 3 * y1 - 3 * y2 + y3) / 6
+    b = (y0 - 2 * y1 + y2) / 2
+    c = (-2 * y0 - 3 * y1 + 6 * y2 - y3) / 6
+    return ((a * x + b) * x + c) * x + y1, (3 * a * x + 2 * b) * x + c
+
+
+def ayanamsa(jd, method="sidereal"):
+    """(ayanamsa, rate) of `method` at jd in degrees and degrees/day; (0, 0) for tropical."""
+    method = canonical_method(method)
+    if method == 'tropical':
+        return 0.0, 0.0
+    k = int(jd // AYANAMSA_NODE_DAYS)
+    values = _ayanamsa_nodes.get(method, {})
+    try:
+        nodes = values[k - 1], values[k], values[k + 1], values[k + 2]
+    except KeyError:
+        nodes = _node_values(method, range(k - 1, k + 3))
+    value, rate = _cubic(jd / AYANAMSA_NODE_DAYS - k, *nodes)
+    return value, rate / AYANAMSA_NODE_DAYS
+
+
+# (method, jds bytes, values, rates) of the last ayanamsa_many call: a scan asks
+# again for the same sample grid for every body
+_last_ayanamsa_many = None
+
+
+def ayanamsa_many(jds, method="sidereal"):
+    """Vectorized ayanamsa(): (values, rates) as NumPy arrays."""
+    global _last_ayanamsa_many
+    jds = np.asarray(jds, dtype=float)
+    method = canonical_method(method)
+    if method == 'tropical' or not jds.size:
+        return np.zeros_like(jds), np.zeros_like(jds)
+    key = jds.tobytes()
+    last = _last_ayanamsa_many
+    if last is not None and last[0] == method and last[1] == key:
+        return last[2], last[3]
+    k = np.floor(jds / AYANAMSA_NODE_DAYS).astype(np.int64)
+    # Only the nodes around the dates: a batch of scattered dates needs no nodes in between
+    nodes = np.unique(np.concatenate([k - 1, k, k + 1, k + 2]))
+    values = np.array(_node_values(method, nodes.tolist()))
+    i = np.searchsorted(nodes, k)
+    value, rate = _cubic(jds / AYANAMSA_NODE_DAYS - k, values[i - 1], values[i], values[i + 1], values[i + 2])
+    rate = rate / AYANAMSA_NODE_DAYS
+    _last_ayanamsa_many = (method, key, value, rate)
+    return value, rate
+
+
+def calc_ut(jd, planet_id, method="sidereal", flags=EPHEMERIS_FLAGS | swe.FLG_SPEED):
+    """swe.calc_ut with the zodiac of `method`, safe to call from any thread."""
+    method = canonical_method(method)
+    EPHEMERIS_CALLS.inc(function="calc_ut")
+    with _swe_lock:
+        return swe.calc_ut(jd, planet_id, flags | _method_flags(method))
+
+
+# Index of the ARMC in houses_ex's ascmc: a sidereal time, not a longitude
+ARMC = 2
+
+
+def houses_ex(jd, lat, lon, hsys=b'P', method="sidereal", flags=EPHEMERIS_FLAGS):
+    """swe.houses_ex with the zodiac of `method`, safe to call from any thread."""
+    method = canonical_method(method)
+    EPHEMERIS_CALLS.inc(function="houses_ex")
+    with _swe_lock:
+        cusps, ascmc = swe.houses_ex(jd, lat, lon, hsys, flags)
+    if method == 'tropical':
+        return cusps, ascmc
+    shift, _ = ayanamsa(jd, method)
+    return (tuple((c - shift) % 360 for c in cusps),
+            tuple(v if n == ARMC else (v - shift) % 360 for n, v in enumerate(ascmc)))
+
+
+def rise_trans(jd, planet_id, rsmi, lat, lon, altitude=0.0, flags=EPHEMERIS_FLAGS):
+    """
+    swe.rise_trans (rising, setting or meridian transit after jd), safe to call
+    from any thread. Returns the event's JD, or None when the body does not
+    rise/set that day (circumpolar).
+    """
+    EPHEMERIS_CALLS.inc(function="rise_trans")
+    with _swe_lock:
+        res, tret = swe.rise_trans(jd, planet_id, rsmi, (lon, lat, altitude), 0.0, 0.0, flags)
+    return tret[0] if res == 0 else None
+
+
+def tropical_position_speed(jd, planet_name, planet_id):
+    """
+    Tropical (longitude, speed) of a planet/node.
+    Served from the memory-mapped ephemeris tables when they cover jd,
+    otherwise computed with swe.calc_ut.
+    """
+    if EPHEMERIS_TABLES is not None and EPHEMERIS_TABLES.covers(planet_name, jd, 'tropical'):
+        EPHEMERIS_CALLS.inc(function="table_lookup")
+        return EPHEMERIS_TABLES.lookup(planet_name, jd, 'tropical')
+
+    if planet_name == 'Ketu':
+        rahu_res = calc_ut(jd, swe.MEAN_NODE, 'tropical')
+        rahu_pos = rahu_res[0][0]
+        rahu_speed = rahu_res[0][3]
+        return (rahu_pos + 180) % 360, rahu_speed # Ketu speed same as Rahu (mean node)
+    else:
+        res = calc_ut(jd, planet_id, 'tropical')
+        return res[0][0], res[0][3]
+
+
+def get_planet_position_speed(jd, planet_name, planet_id, method: str = "sidereal"):
+    """
+    Helper to get pos/speed for specific planet/node: the tropical position
+    (tropical_position_speed) shifted by the ayanamsa of `method`.
+    """
+    method = canonical_method(method)
+    lon, speed = tropical_position_speed(jd, planet_name, planet_id)
+    if method == 'tropical':
+        return lon, speed
+    shift, rate = ayanamsa(jd, method)
+    return (lon - shift) % 360, speed - rate
+
+
+def get_positions_speeds(jds, planet_name, planet_id, method: str = "sidereal"):
+    """
+    Vectorized get_planet_position_speed over an array of JDs.
+    Returns (longitudes, speeds) as NumPy arrays.
+    """
+    jds = np.asarray(jds, dtype=float)
+    method = canonical_method(method)
+    if (EPHEMERIS_TABLES is not None and jds.size
+            and EPHEMERIS_TABLES.covers(planet_name, jds.min(), 'tropical')
+            and EPHEMERIS_TABLES.covers(planet_name, jds.max(), 'tropical')):
+        EPHEMERIS_CALLS.inc(jds.size, function="table_lookup")
+        lons, speeds = EPHEMERIS_TABLES.lookup_many(planet_name, jds, 'tropical')
+    else:
+        res = np.array([tropical_position_speed(jd, planet_name, planet_id) for jd in jds], dtype=float)
+        res = res.reshape(-1, 2)
+        lons, speeds = res[:, 0], res[:, 1]
+    if method == 'tropical':
+        return lons, speeds
+    shifts, rates = ayanamsa_many(jds, method)
+    return (lons - shifts) % 360, speeds - rates
@@ -0,0 +1,77 @@
+"""
+Ephemeris backend selection.
+
+Swiss Ephemeris can compute positions from three sources:
+
+- moshier: analytical theory built into the library. No files; about 1"
+  for the planets and a few arcseconds for the Moon, and the slowest per call.
+- swiss: the compressed .se1 files (sepl_*.se1 planets, semo_*.se1 Moon,
+  seas_*.se1 asteroids; 1800-2400 for the *_18 set). Milliarcsecond
+  agreement with JPL. The library keeps the file pages it reads in memory.
+- jpl: a JPL DE ephemeris file (e.g. de440.eph); the reference, and large.
+
+The backend is chosen once at startup from EPHEMERIS_BACKEND (default
+"swiss"), with EPHEMERIS_PATH as the directory of the data files (default
+./ephe next to this file) and EPHEMERIS_JPL_FILE the JPL file name. When the
+files of the requested backend cannot be read Swiss Ephemeris silently falls
+back to the next one (jpl -> swiss -> moshier); configure() detects this with
+a probe calculation and reports the backend actually in use, which is part
+of ephemeris.EPHEMERIS_VERSION and of every API response.
+"""
+import logging
+import os
+from collections import namedtuple
+
+import swisseph as swe
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EPHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ephe")
+DEFAULT_JPL_FILE = "de440.eph"
+
+BACKEND_FLAGS = {
+    "moshier": swe.FLG_MOSEPH,
+    "swiss": swe.FLG_SWIEPH,
+    "jpl": swe.FLG_JPLEPH,
+}
+EPHEMERIS_SOURCE_MASK = swe.FLG_MOSEPH | swe.FLG_SWIEPH | swe.FLG_JPLEPH
+
+# name: backend in use; requested: the configured one; flags: FLG_* to pass to swe
+Backend = namedtuple("Backend", ["name", "requested", "flags", "path"])
+
+# J2000; any date inside the data files would do
+_PROBE_JD = 2451545.0
+
+
+def _backend_of(retflags):
+    source = retflags & EPHEMERIS_SOURCE_MASK
+    return next((name for name, flag in BACKEND_FLAGS.items() if flag == source), "moshier")
+
+
+def configure(name="swiss", path=DEFAULT_EPHE_PATH, jpl_file=DEFAULT_JPL_FILE):
+    """
+    Point Swiss Ephemeris at the data files of backend `name` and probe which
+    backend it really uses. Global library state: call it before any calculation.
+    """
+    if name not in BACKEND_FLAGS:
+        raise ValueError(f"Unknown ephemeris backend '{name}'. Expected one of: {', '.join(BACKEND_FLAGS)}")
+    swe.set_ephe_path(path)
+    if name == "jpl":
+        swe.set_jpl_file(jpl_file)
+    try:
+        _, retflags = swe.calc_ut(_PROBE_JD, swe.MOON, BACKEND_FLAGS[name])
+        actual = _backend_of(retflags)
+    except swe.Error:
+        actual = "moshier"
+    if actual != name:
+        logger.warning("Ephemeris backend '%s' unavailable (no data files in %s); using '%s'", name, path, actual)
+    return Backend(actual, name, BACKEND_FLAGS[actual], path)
+
+
+def backend_from_env():
+    """configure() from EPHEMERIS_BACKEND, EPHEMERIS_PATH and EPHEMERIS_JPL_FILE."""
+    return configure(
+        os.environ.get("EPHEMERIS_BACKEND", "swiss"),
+        os.environ.get("EPHEMERIS_PATH", DEFAULT_EPHE_PATH),
+        os.environ.get("EPHEMERIS_JPL_FILE", DEFAULT_JPL_FILE),
+    )
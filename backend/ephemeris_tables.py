@@ -0,0 +1,262 @@
+"""
+Precomputed ephemeris tables.
+
+Planetary longitudes are fitted offline with piecewise Chebyshev polynomials
+(one fixed-length segment after another, per planet) and written to a single
+binary file. Only tropical longitudes are stored: every sidereal system is
+derived from them with its ayanamsa (see ephemeris.py); files built with
+sidereal tables as well still load, and those tables go unused. At startup
+the file is memory-mapped read-only, so every uvicorn worker shares the same
+physical pages.
+
+Lookups return (longitude, speed) exactly like `swe.calc_ut(..., FLG_SPEED)`
+does for the engine. The fit is checked against Swiss Ephemeris at points
+between the interpolation nodes when the file is built; the worst longitude
+error of each body, over every segment, is stored in the header
+(`max_error_arcsec`). With the segment sizes below it stays around 1
+arcsecond or less for every body (typically well under 0.1"; the worst
+cases are small kinks in the reference itself),
+and speeds agree to about 1e-4 degree/day (the Moon) or better.
+
+File layout:
+    8 bytes   magic b"ASTROEPH"
+    4 bytes   little-endian uint32, length of the JSON header
+    n bytes   JSON header (padded with spaces to a multiple of 8)
+    rest      little-endian float64 coefficients, one block per table
+
+Build a table file with:
+    python ephemeris_tables.py --start 1950 --end 2100 --output ephemeris_tables.bin
+"""
+import argparse
+import json
+import math
+import os
+import struct
+
+import numpy as np
+import swisseph as swe
+
+from ephemeris_backend import backend_from_env
+
+MAGIC = b"ASTROEPH"
+FORMAT_VERSION = 1
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ephemeris_tables.bin")
+
+# Body -> (swisseph id, segment length in days, Chebyshev degree)
+# Ketu is not stored: it is always Rahu + 180.
+TABLE_BODIES = {
+    'Sun': (swe.SUN, 16, 12),
+    'Moon': (swe.MOON, 8, 16),
+    'Mars': (swe.MARS, 16, 12),
+    'Mercury': (swe.MERCURY, 16, 12),
+    'Jupiter': (swe.JUPITER, 16, 12),
+    'Venus': (swe.VENUS, 16, 12),
+    'Saturn': (swe.SATURN, 16, 12),
+    'Rahu': (swe.MEAN_NODE, 16, 12),
+    'Uranus': (swe.URANUS, 16, 12),
+    'Neptune': (swe.NEPTUNE, 16, 12),
+    'Pluto': (swe.PLUTO, 16, 12),
+}
+
+TABLE_METHODS = ("tropical",)
+
+
+def _fit_segment(planet_id, flags, seg_start, seg_len, degree):
+    """Fit one segment on Chebyshev nodes. Returns degree + 1 coefficients."""
+    k = np.arange(degree + 1)
+    x = np.cos(np.pi * (k + 0.5) / (degree + 1))
+    jds = seg_start + (x + 1) * seg_len / 2
+    lons = [swe.calc_ut(jd, planet_id, flags)[0][0] for jd in jds]
+    lons = np.degrees(np.unwrap(np.radians(lons)))
+    return np.polynomial.chebyshev.chebfit(x, lons, degree)
+
+
+def _segment_error(planet_id, flags, seg_start, seg_len, coeffs, samples=9):
+    """Worst longitude error (degrees) of a fitted segment, between the nodes."""
+    xs = np.linspace(-1, 1, samples)
+    fitted = np.polynomial.chebyshev.chebval(xs, coeffs)
+    worst = 0.0
+    for x, value in zip(xs, fitted):
+        ref = swe.calc_ut(seg_start + (x + 1) * seg_len / 2, planet_id, flags)[0][0]
+        worst = max(worst, abs((value - ref + 180) % 360 - 180))
+    return worst
+
+
+def build_tables(start_year, end_year, output_path=DEFAULT_PATH, bodies=None, methods=TABLE_METHODS, backend=None):
+    """
+    Fit every body/method over [start_year, end_year] and write the table file.
+    backend: ephemeris_backend.Backend to fit against (default: from the environment).
+    Returns the header dictionary that was written.
+    """
+    unknown = set(methods) - set(TABLE_METHODS)
+    if unknown:
+        raise ValueError(f"Only {', '.join(TABLE_METHODS)} tables are built; got {', '.join(sorted(unknown))}")
+    backend = backend or backend_from_env()
+    flags = backend.flags | swe.FLG_SPEED
+    start_jd = swe.julday(start_year, 1, 1, 0.0)
+    end_jd = swe.julday(end_year + 1, 1, 1, 0.0)
+    bodies = bodies or list(TABLE_BODIES)
+
+    tables = []
+    blocks = []
+    offset = 0
+    for method in methods:
+        for name in bodies:
+            planet_id, seg_len, degree = TABLE_BODIES[name]
+            count = int(math.ceil((end_jd - start_jd) / seg_len))
+            coeffs = np.empty((count, degree + 1), dtype="<f8")
+            worst = 0.0
+            for i in range(count):
+                seg_start = start_jd + i * seg_len
+                coeffs[i] = _fit_segment(planet_id, flags, seg_start, seg_len, degree)
+                worst = max(worst, _segment_error(planet_id, flags, seg_start, seg_len, coeffs[i]))
+            tables.append({
+                "body": name,
+                "method": method,
+                "start_jd": start_jd,
+                "segment_days": seg_len,
+                "degree": degree,
+                "segments": count,
+                "offset": offset,
+                "max_error_arcsec": round(worst * 3600, 4),
+            })
+            blocks.append(coeffs)
+            offset += coeffs.size
+
+    header = {
+        "version": FORMAT_VERSION,
+        "swisseph_version": swe.version,
+        "backend": backend.name,
+        "start_year": start_year,
+        "end_year": end_year,
+        "start_jd": start_jd,
+        "end_jd": end_jd,
+        "tables": tables,
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+    header_bytes += b" " * (-(len(MAGIC) + 4 + len(header_bytes)) % 8)
+
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header_bytes)))
+        f.write(header_bytes)
+        for block in blocks:
+            f.write(block.tobytes())
+    os.replace(tmp_path, output_path)
+    return header
+
+
+class EphemerisTables:
+    """Read-only, memory-mapped view of a table file."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not an ephemeris table file")
+            (header_len,) = struct.unpack("<I", f.read(4))
+            self.header = json.loads(f.read(header_len))
+        if self.header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported ephemeris table version in {path}")
+
+        self.path = path
+        self.start_jd = self.header["start_jd"]
+        self.end_jd = self.header["end_jd"]
+        self._data = np.memmap(path, dtype="<f8", mode="r", offset=len(MAGIC) + 4 + header_len)
+
+        # (body, method) -> (start_jd, segment_days, 2D coefficient view)
+        self._index = {}
+        for t in self.header["tables"]:
+            size = t["segments"] * (t["degree"] + 1)
+            view = self._data[t["offset"]:t["offset"] + size].reshape(t["segments"], t["degree"] + 1)
+            self._index[(t["body"], t["method"])] = (t["start_jd"], t["segment_days"], view)
+
+    def covers(self, body, jd, method):
+        if body == 'Ketu':
+            body = 'Rahu'
+        return (body, method) in self._index and self.start_jd <= jd < self.end_jd
+
+    def max_error_arcsec(self, body=None):
+        """Documented error bound: worst fitted error for a body, or across all tables."""
+        errors = [t["max_error_arcsec"] for t in self.header["tables"] if body in (None, t["body"])]
+        return max(errors) if errors else None
+
+    def lookup(self, body, jd, method="tropical"):
+        """Return (longitude, speed) in degrees and degrees/day."""
+        if body == 'Ketu':
+            lon, speed = self.lookup('Rahu', jd, method)
+            return (lon + 180) % 360, speed
+
+        start_jd, seg_len, coeffs = self._index[(body, method)]
+        i = int((jd - start_jd) // seg_len)
+        if i < 0 or i >= len(coeffs) or jd >= self.end_jd:
+            raise KeyError(f"JD {jd} outside ephemeris table range")
+        c = coeffs[i].tolist()
+        x = 2.0 * (jd - start_jd - i * seg_len) / seg_len - 1.0
+
+        # Forward recurrence for T_n(x) and T_n'(x)
+        t_prev, t_cur = 1.0, x
+        d_prev, d_cur = 0.0, 1.0
+        value = c[0] + c[1] * x
+        deriv = c[1]
+        for n in range(2, len(c)):
+            t_next = 2.0 * x * t_cur - t_prev
+            d_next = 2.0 * t_cur + 2.0 * x * d_cur - d_prev
+            value += c[n] * t_next
+            deriv += c[n] * d_next
+            t_prev, t_cur = t_cur, t_next
+            d_prev, d_cur = d_cur, d_next
+        return value % 360, deriv * 2.0 / seg_len
+
+    def lookup_many(self, body, jds, method="tropical"):
+        """Vectorized lookup. Returns (longitudes, speeds) as NumPy arrays."""
+        if body == 'Ketu':
+            lons, speeds = self.lookup_many('Rahu', jds, method)
+            return (lons + 180) % 360, speeds
+
+        jds = np.asarray(jds, dtype=float)
+        start_jd, seg_len, coeffs = self._index[(body, method)]
+        idx = ((jds - start_jd) // seg_len).astype(int)
+        if idx.size and (idx.min() < 0 or idx.max() >= len(coeffs) or jds.max() >= self.end_jd):
+            raise KeyError("JD outside ephemeris table range")
+        c = coeffs[idx]
+        x = 2.0 * (jds - start_jd - idx * seg_len) / seg_len - 1.0
+
+        t_prev, t_cur = np.ones_like(x), x
+        d_prev, d_cur = np.zeros_like(x), np.ones_like(x)
+        value = c[:, 0] + c[:, 1] * x
+        deriv = c[:, 1].copy()
+        for n in range(2, c.shape[1]):
+            t_next = 2.0 * x * t_cur - t_prev
+            d_next = 2.0 * t_cur + 2.0 * x * d_cur - d_prev
+            value += c[:, n] * t_next
+            deriv += c[:, n] * d_next
+            t_prev, t_cur = t_cur, t_next
+            d_prev, d_cur = d_cur, d_next
+        return value % 360, deriv * 2.0 / seg_len
+
+
+def load_tables(path=None):
+    """
+    Load the table file named by EPHEMERIS_TABLES (or the default path).
+    Returns None if no file exists, so the engine falls back to Swiss Ephemeris.
+    """
+    path = path or os.environ.get("EPHEMERIS_TABLES", DEFAULT_PATH)
+    if not path or not os.path.exists(path):
+        return None
+    return EphemerisTables(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build precomputed ephemeris tables.")
+    parser.add_argument("--start", type=int, required=True, help="First year covered")
+    parser.add_argument("--end", type=int, required=True, help="Last year covered (inclusive)")
+    parser.add_argument("--output", default=DEFAULT_PATH)
+    args = parser.parse_args()
+
+    header = build_tables(args.start, args.end, args.output)
+    size_kb = os.path.getsize(args.output) / 1024
+    print(f"Wrote {args.output} ({size_kb:.0f} KB) for {args.start}-{args.end}, {header['backend']} ephemeris")
+    for t in header["tables"]:
+        print(f"  {t['method']:9} {t['body']:8} {t['segments']:5} segments  max error {t['max_error_arcsec']}\"")
@@ -0,0 +1,235 @@
+"""
+Indexed event store: every calendar event of a year, sorted, per method.
+
+/api/calendar used to scan each month from scratch and /api/transits ran its
+own ingress search for the same sign changes. Here one scan per (year,
+method) with all the calendar detectors (stations, aspects, sign and
+nakshatra ingresses; see scanner.py) produces a YearIndex: the ScanEvent of
+the UTC year sorted by JD, plus one sorted position list per body. Any
+window - a month, a week, a custom range, the next events of one body - is
+then two binary searches and a slice.
+
+Indexes are kept in an in-process LRU (MAX_INDEXED_YEARS) and, when a
+persistent store is given (the SQLite tier of the result cache), pickled
+there under a versioned key, so they are built once per year across
+restarts and workers. Missing years of a multi-year query are built in
+parallel over the shared process pool (parallel.map_tasks).
+
+A year index costs far more than an ingress search of the same year, so
+/api/transits only reads the years has_years() reports as indexed and runs
+the ingress search otherwise.
+
+The Moon is not indexed (like the calendar and the transit overview, which
+leave it out); a Moon transit listing is computed directly.
+"""
+import pickle
+from bisect import bisect_left
+
+from cache import ObjectLRU
+from engine import (
+    CALENDAR_ASPECTS, CALENDAR_EVENT_FORMATTERS, ENGINE_VERSION, EVENT_PLANETS, STATION_PLANETS,
+    jd_to_datetime, year_range_jd,
+)
+from ephemeris import EPHEMERIS_VERSION, canonical_method
+from metrics import phase
+from parallel import map_tasks
+from scanner import AspectDetector, IngressDetector, NakshatraIngressDetector, StationDetector, scan
+from search import SIGN_SPAN, TOLERANCE_SECOND
+from singleflight import SingleFlight
+
+INDEXED_BODIES = EVENT_PLANETS
+
+# ScanEvent kinds of the index
+KIND_STATION = "station"
+KIND_ASPECT = "aspect"
+KIND_INGRESS = "ingress"
+KIND_NAKSHATRA = "nakshatra"
+CALENDAR_KINDS = frozenset({KIND_STATION, KIND_ASPECT, KIND_INGRESS})
+ALL_KINDS = CALENDAR_KINDS | {KIND_NAKSHATRA}
+
+MAX_INDEXED_YEARS = 64
+
+# How far next_events() looks ahead before giving up
+MAX_LOOKAHEAD_YEARS = 30
+
+
+def year_detectors():
+    """Detectors of a year index; same order (and so the same tie order) as the monthly calendar."""
+    return [
+        StationDetector(STATION_PLANETS),
+        AspectDetector(EVENT_PLANETS, CALENDAR_ASPECTS),
+        IngressDetector(INDEXED_BODIES, SIGN_SPAN, TOLERANCE_SECOND),
+        NakshatraIngressDetector(INDEXED_BODIES, TOLERANCE_SECOND),
+    ]
+
+
+def build_year(task):
+    """ScanEvent of one (year, method) in time order. Module-level so it can run in the process pool."""
+    year, method = task
+    start_jd, end_jd = year_range_jd(year)
+    return scan(year_detectors(), start_jd, end_jd, method)
+
+
+def event_bodies(event):
+    """Bodies an event belongs to: both bodies of an aspect, otherwise its body."""
+    if event.kind == KIND_ASPECT:
+        return event.item.body1, event.item.body2
+    return (event.body,)
+
+
+def event_year(jd):
+    """UTC year containing jd."""
+    return jd_to_datetime(jd).year
+
+
+def window_years(start_jd, end_jd):
+    """The UTC years overlapping [start_jd, end_jd)."""
+    first, last = event_year(start_jd), event_year(end_jd)
+    if last > first and year_range_jd(last)[0] >= end_jd:
+        last -= 1
+    return list(range(first, last + 1))
+
+
+class YearIndex:
+    """The events of one year sorted by JD, with a per-body index of positions."""
+
+    def __init__(self, year, method, events):
+        self.year = year
+        self.method = method
+        self.events = events
+        self.jds = [event.jd for event in events]
+        self.body_positions = {}
+        for position, event in enumerate(events):
+            for body in event_bodies(event):
+                self.body_positions.setdefault(body, []).append(position)
+        self.body_jds = {body: [self.jds[p] for p in positions] for body, positions in self.body_positions.items()}
+
+    def window(self, start_jd, end_jd, kinds=ALL_KINDS, body=None):
+        """ScanEvent of `kinds` (and `body`) with start_jd <= jd < end_jd, in time order."""
+        if body is None:
+            events = self.events[bisect_left(self.jds, start_jd):bisect_left(self.jds, end_jd)]
+        else:
+            jds = self.body_jds.get(body, [])
+            positions = self.body_positions.get(body, [])[bisect_left(jds, start_jd):bisect_left(jds, end_jd)]
+            events = [self.events[p] for p in positions]
+        if kinds is ALL_KINDS:
+            return events
+        return [event for event in events if event.kind in kinds]
+
+
+class EventStore:
+    """
+    YearIndex per (year, method), built on first use. Concurrent requests
+    for the same missing year share one build.
+    persist: optional bytes key/value store with get/set (e.g. cache.DiskCache).
+    """
+
+    def __init__(self, persist=None, max_years=MAX_INDEXED_YEARS, workers=None):
+        self.persist = persist
+        self.workers = workers
+        self._indexes = ObjectLRU(max_years)
+        self._in_flight = SingleFlight()
+        self.builds = 0
+        self.loads = 0
+
+    def _key(self, year, method):
+        return f"{ENGINE_VERSION}:{EPHEMERIS_VERSION}:eventindex:{year}:{method}"
+
+    def _load(self, key):
+        if self.persist is None:
+            return None
+        data = self.persist.get(key)
+        if data is None:
+            return None
+        self.loads += 1
+        return pickle.loads(data)
+
+    def _store(self, key, year, method, events):
+        index = YearIndex(year, method, events)
+        self._indexes.set(key, index)
+        if self.persist is not None:
+            self.persist.set(key, pickle.dumps(events, protocol=pickle.HIGHEST_PROTOCOL))
+        return index
+
+    def year(self, year, method="sidereal"):
+        """YearIndex of (year, method), building it if needed."""
+        return self.years([year], method)[0]
+
+    def years(self, years, method="sidereal"):
+        """YearIndex of each of `years`; missing ones are built in parallel."""
+        method = canonical_method(method)
+        keys = [self._key(year, method) for year in years]
+        indexes = [self._indexes.get(key) for key in keys]
+        missing = []
+        for n, (year, key) in enumerate(zip(years, keys)):
+            if indexes[n] is None:
+                events = self._load(key)
+                if events is None:
+                    missing.append(n)
+                else:
+                    indexes[n] = YearIndex(year, method, events)
+                    self._indexes.set(key, indexes[n])
+        if len(missing) == 1:
+            n = missing[0]
+            indexes[n] = self._in_flight.do(keys[n], lambda: self._build(years[n], method, keys[n]))
+        elif missing:
+            with phase("eventstore.build"):
+                built = map_tasks(build_year, [(years[n], method) for n in missing], self.workers)
+            self.builds += len(missing)
+            for n, events in zip(missing, built):
+                indexes[n] = self._store(keys[n], years[n], method, events)
+        return indexes
+
+    def _build(self, year, method, key):
+        # Re-check: a leader that just finished may have stored it
+        index = self._indexes.get(key)
+        if index is not None:
+            return index
+        with phase("eventstore.build"):
+            events = build_year((year, method))
+        self.builds += 1
+        return self._store(key, year, method, events)
+
+    def has_years(self, years, method="sidereal"):
+        """Whether every one of `years` is indexed in memory or persisted (loading those found on disk)."""
+        method = canonical_method(method)
+        for year in years:
+            key = self._key(year, method)
+            if self._indexes.get(key) is None:
+                events = self._load(key)
+                if events is None:
+                    return False
+                self._indexes.set(key, YearIndex(year, method, events))
+        return True
+
+    def window(self, start_jd, end_jd, method="sidereal", kinds=ALL_KINDS, body=None):
+        """ScanEvent of `kinds` (and `body`) with start_jd <= jd < end_jd, in time order."""
+        if end_jd <= start_jd:
+            return []
+        events = []
+        for index in self.years(window_years(start_jd, end_jd), method):
+            events += index.window(start_jd, end_jd, kinds, body)
+        return events
+
+    def next_events(self, body, after_jd, count, method="sidereal", kinds=ALL_KINDS):
+        """The first `count` events of `body` at or after after_jd (within MAX_LOOKAHEAD_YEARS)."""
+        events = []
+        first = event_year(after_jd)
+        for year in range(first, first + MAX_LOOKAHEAD_YEARS):
+            index = self.year(year, method)
+            _, end_jd = year_range_jd(year)
+            events += index.window(after_jd, end_jd, kinds, body)[:count - len(events)]
+            if len(events) >= count:
+                break
+        return events
+
+    def stats(self):
+        stats = self._indexes.stats()
+        stats["builds"] = self.builds
+        stats["loads"] = self.loads
+        return stats
+
+
+def calendar_events(events):
+    """Calendar entries (engine.CalendarEvent) for ScanEvent of the index."""
+    return [CALENDAR_EVENT_FORMATTERS[event.kind](event) for event in events]
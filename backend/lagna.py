@@ -0,0 +1,171 @@
+"""
+Lagna table: the times the Ascendant enters each sign, for a location.
+
+The Ascendant runs through the whole zodiac once per sidereal day, but not
+evenly: depending on the latitude a sign may rise in under two hours or in
+over three, and in a few minutes near the polar circles. Only its periodicity is regular, so:
+
+- the first sidereal day is sampled every SAMPLE_MINUTES with swe.houses_ex
+  and every sign change found is refined by the secant method;
+- each later crossing is predicted one sidereal day after the same crossing
+  the day before (off by a few seconds at most: only precession, nutation
+  and the ayanamsa drift move it) and refined by the secant method with the
+  rate measured there. Most predictions need a single houses_ex call.
+
+A month is roughly 160 + 380 houses_ex calls. Only the Ascendant is read,
+which is the same in every house system, so the houses are Porphyry: unlike
+Placidus it is defined at every latitude.
+
+Beyond POLAR_LATITUDE part of the ecliptic never rises: the Ascendant jumps
+across it, skipping signs, and can move backwards, so a crossing is no longer
+one sidereal day after the previous one. There the whole range is sampled
+every POLAR_SAMPLE_MINUTES and each sign change found is bisected, about 22
+houses_ex calls per sampled hour.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytz
+
+from engine import ZODIAC_SIGNS, get_julian_day
+from ephemeris import canonical_method, houses_ex
+from panchang import _local_iso, _trim, spans
+from search import SIGN_SPAN, TOLERANCE_SECOND
+
+SIDEREAL_DAY = 0.99726957  # days
+HOUSE_SYSTEM = b'O'
+
+# Sampling step of the first sidereal day
+SAMPLE_MINUTES = 10
+
+MAX_SECANT_ITERATIONS = 10
+
+# Beyond the polar circles (90 degrees minus the obliquity, with a margin) the
+# Ascendant can jump and turn back; see the module docstring
+POLAR_LATITUDE = 66.0
+POLAR_SAMPLE_MINUTES = 4
+
+
+def ascendant(jd, lat, lon, method="sidereal"):
+    """Longitude of the Ascendant at jd."""
+    return houses_ex(jd, lat, lon, HOUSE_SYSTEM, method)[1][0]
+
+
+def _offset(longitude, boundary):
+    """Signed distance in degrees from boundary to longitude, in [-180, 180)."""
+    return (longitude - boundary + 180) % 360 - 180
+
+
+def _refine(boundary, jd, rate, lat, lon, method, tolerance):
+    """
+    Secant iteration for the JD at which the Ascendant crosses boundary,
+    from the guess jd and an estimate of its rate (degrees/day).
+    Returns (jd, rate at the crossing).
+    """
+    offset = _offset(ascendant(jd, lat, lon, method), boundary)
+    for _ in range(MAX_SECANT_ITERATIONS):
+        step = -offset / rate
+        jd += step
+        if abs(step) < tolerance:
+            break
+        new_offset = _offset(ascendant(jd, lat, lon, method), boundary)
+        if new_offset != offset:
+            rate = (new_offset - offset) / step
+        offset = new_offset
+    return jd, rate
+
+
+def _first_day(start_jd, lat, lon, method, tolerance):
+    """(jd, sign, rate) of every sign change in the sidereal day after start_jd."""
+    step = SAMPLE_MINUTES / 1440
+    jds = start_jd + step * np.arange(int(np.ceil(SIDEREAL_DAY / step)) + 1)
+    longitudes = [ascendant(jd, lat, lon, method) for jd in jds.tolist()]
+    signs = [int(longitude // SIGN_SPAN) for longitude in longitudes]
+    crossings = []
+    for k in range(len(jds) - 1):
+        rate = ((longitudes[k + 1] - longitudes[k]) % 360) / step
+        # Near the polar circles a sign can rise within one step: refine every boundary passed
+        for n in range(1, (signs[k + 1] - signs[k]) % 12 + 1):
+            sign = (signs[k] + n) % 12
+            jd, crossing_rate = _refine(sign * SIGN_SPAN, float(jds[k]), rate, lat, lon, method, tolerance)
+            crossings.append((jd, sign, crossing_rate))
+    return crossings[:12]
+
+
+def _sign(jd, lat, lon, method):
+    return int(ascendant(jd, lat, lon, method) // SIGN_SPAN)
+
+
+def _polar_ingresses(start_jd, end_jd, lat, lon, method, tolerance):
+    """(jds, signs) of every sign change in [start_jd, end_jd], sampled and bisected."""
+    step = POLAR_SAMPLE_MINUTES / 1440
+    jds, signs = [], []
+    jd, sign = start_jd, _sign(start_jd, lat, lon, method)
+    while jd < end_jd:
+        next_jd = min(jd + step, end_jd)
+        next_sign = _sign(next_jd, lat, lon, method)
+        # One step may hold several changes (a jump, then a turn back): find
+        # the first change after jd, then go on from there
+        while sign != next_sign:
+            lo, hi, hi_sign = jd, next_jd, next_sign
+            while hi - lo > tolerance:
+                mid = (lo + hi) / 2
+                mid_sign = _sign(mid, lat, lon, method)
+                if mid_sign == sign:
+                    lo = mid
+                else:
+                    hi, hi_sign = mid, mid_sign
+            jds.append(hi)
+            signs.append(hi_sign)
+            jd, sign = hi, hi_sign
+        jd, sign = next_jd, next_sign
+    return np.array(jds), np.array(signs, dtype=int)
+
+
+def ascendant_ingresses(start_jd, end_jd, lat, lon, method="sidereal", tolerance=TOLERANCE_SECOND):
+    """
+    Sign changes of the Ascendant, from the last one at or before start_jd to
+    the first one after end_jd. Returns (jds, signs): the Ascendant enters
+    signs[i] (0-based) at jds[i].
+    """
+    method = canonical_method(method)
+    if abs(lat) > POLAR_LATITUDE:
+        jds, signs = _polar_ingresses(start_jd - SIDEREAL_DAY, end_jd + SIDEREAL_DAY, lat, lon, method, tolerance)
+        return _trim(jds, signs, start_jd, end_jd)
+    # Start a sign's rising early so the one in effect at start_jd is included
+    crossings = _first_day(start_jd - SIDEREAL_DAY / 2, lat, lon, method, tolerance)
+    count = len(crossings)
+    while crossings[-1][0] <= end_jd:
+        previous_jd, sign, rate = crossings[-count]
+        jd, rate = _refine(sign * SIGN_SPAN, previous_jd + SIDEREAL_DAY, rate, lat, lon, method, tolerance)
+        crossings.append((jd, sign, rate))
+    jds = np.array([c[0] for c in crossings])
+    signs = np.array([c[1] for c in crossings])
+    return _trim(jds, signs, start_jd, end_jd)
+
+
+def calculate_lagna(start, end, lat: float, lon: float, timezone: str = "Asia/Kolkata", method: str = "sidereal"):
+    """
+    Lagna table for the local days start..end (dates, inclusive): the rising
+    sign overlapping them, each with its start and end as ISO strings in `timezone`.
+    """
+    tz = pytz.timezone(timezone)
+    start_jd = get_julian_day(tz.localize(datetime(start.year, start.month, start.day)))
+    end_day = end + timedelta(days=1)
+    end_jd = get_julian_day(tz.localize(datetime(end_day.year, end_day.month, end_day.day)))
+
+    jds, signs = ascendant_ingresses(start_jd, end_jd, lat, lon, method)
+    return [{"number": s.number, "name": s.name, "start": _local_iso(s.start_jd, tz), "end": _local_iso(s.end_jd, tz)}
+            for s in spans(jds, signs, ZODIAC_SIGNS.__getitem__)]
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from datetime import date
+
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    t0 = time.perf_counter()
+    table = calculate_lagna(date(2024, 1, 1), date(2024, 1, 1) + timedelta(days=days - 1), 28.6139, 77.2090)
+    elapsed = time.perf_counter() - t0
+    print(f"Lagna table, {days} days (New Delhi): {len(table)} signs in {elapsed:.3f}s")
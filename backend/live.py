@@ -0,0 +1,191 @@
+"""
+Live positions pushed to subscribers (/api/live as server-sent events,
+/api/live/ws as a WebSocket).
+
+A dashboard polling /api/current costs one request and one lookup per client
+per refresh. Here one broadcaster task per channel - a (method, location,
+timezone) key - computes the positions once per tick of TICK_SECONDS,
+serializes them once and hands the same bytes to every subscriber of the
+channel, so the computation does not grow with the number of dashboards.
+
+The first message of a subscription is a full snapshot (the shape of
+/api/current, plus "type" and "seq"); every later one is a delta holding
+only the top-level fields and position fields that changed since the
+previous tick, positions keyed by body name. A subscriber that has not
+taken its previous message when the next tick is published gets that tick's
+snapshot instead (its delta chain is broken), so a slow client holds at most
+one pending message and never a growing queue.
+
+A channel's task is started by its first subscriber and cancelled when its
+last one leaves.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+TICK_SECONDS = max(1, int(os.environ.get("LIVE_TICK_SECONDS", 5)))
+
+# Distinct channels (methods x locations x timezones) served at the same time
+MAX_CHANNELS = 256
+
+# type: "snapshot" or "delta"; data: the JSON body; sse: data framed as one server-sent event
+Message = namedtuple("Message", ["type", "seq", "data", "sse"])
+
+
+class TooManyChannels(Exception):
+    pass
+
+
+def _message(type, seq, content, serialize):
+    data = serialize({"type": type, "seq": seq, **content})
+    return Message(type, seq, data, b"event: " + type.encode() + b"\ndata: " + data + b"\n\n")
+
+
+def position_delta(previous, current):
+    """{name: {field: value}} of the fields of the `current` positions that differ from `previous`."""
+    before = {p["name"]: p for p in previous}
+    delta = {}
+    for position in current:
+        old = before.get(position["name"], {})
+        changed = {k: v for k, v in position.items() if k != "name" and old.get(k) != v}
+        if changed:
+            delta[position["name"]] = changed
+    return delta
+
+
+def content_delta(previous, current):
+    """
+    Top-level fields of `current` that changed, with "positions" reduced to
+    position_delta() (per method for method=all).
+    """
+    delta = {k: v for k, v in current.items() if k != "positions" and previous.get(k) != v}
+    positions, before = current.get("positions", []), previous.get("positions", [])
+    if isinstance(positions, dict):
+        # method=all: {method: positions}
+        delta["positions"] = {m: position_delta(before.get(m, []), p) for m, p in positions.items()}
+    else:
+        delta["positions"] = position_delta(before, positions)
+    return delta
+
+
+class Subscription:
+    """One subscriber's slot: the next message to send, replaced by a snapshot if it falls behind."""
+
+    def __init__(self, channel):
+        self.channel = channel
+        self._pending = channel.snapshot
+        self._synced = channel.snapshot is not None
+        self._ready = asyncio.Event()
+        if self._synced:
+            self._ready.set()
+
+    def offer(self, snapshot, delta):
+        if self._pending is not None:
+            self.channel.broadcaster.resyncs += 1
+        if self._pending is None and self._synced and delta is not None:
+            self._pending = delta
+        else:
+            self._pending = snapshot
+        self._synced = True
+        self._ready.set()
+
+    async def next(self):
+        """The next Message, waiting for the channel's next tick if needed."""
+        await self._ready.wait()
+        self._ready.clear()
+        message, self._pending = self._pending, None
+        return message
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.next()
+
+
+class Channel:
+    def __init__(self, broadcaster, key):
+        self.broadcaster = broadcaster
+        self.key = key
+        self.subscribers = set()
+        self.content = None
+        self.snapshot = None
+        self.seq = 0
+        self.task = None
+
+    def publish(self, content):
+        """Serialize `content` once as snapshot and delta and offer both to every subscriber."""
+        serialize = self.broadcaster.serialize
+        self.seq += 1
+        snapshot = _message("snapshot", self.seq, content, serialize)
+        delta = None
+        if self.content is not None:
+            delta = _message("delta", self.seq, content_delta(self.content, content), serialize)
+        self.content, self.snapshot = content, snapshot
+        for subscription in self.subscribers:
+            subscription.offer(snapshot, delta)
+
+
+class Broadcaster:
+    """
+    Channels by key, each computed by compute(key, tick) - a dict with
+    "positions", for the Unix time `tick` (a multiple of tick_seconds) -
+    in a worker thread, and encoded to bytes by serialize(content).
+    Must be used from the event loop.
+    """
+
+    def __init__(self, compute, serialize, tick_seconds=TICK_SECONDS, max_channels=MAX_CHANNELS):
+        self.compute = compute
+        self.serialize = serialize
+        self.tick_seconds = tick_seconds
+        self.max_channels = max_channels
+        self.channels = {}
+        self.ticks = 0
+        self.resyncs = 0
+
+    def subscribe(self, key):
+        channel = self.channels.get(key)
+        if channel is None:
+            if len(self.channels) >= self.max_channels:
+                raise TooManyChannels(f"more than {self.max_channels} live channels")
+            channel = self.channels[key] = Channel(self, key)
+            channel.task = asyncio.get_running_loop().create_task(self._run(channel))
+        subscription = Subscription(channel)
+        channel.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        channel = subscription.channel
+        channel.subscribers.discard(subscription)
+        if not channel.subscribers and self.channels.get(channel.key) is channel:
+            del self.channels[channel.key]
+            channel.task.cancel()
+
+    async def _run(self, channel):
+        while True:
+            tick = int(time.time() // self.tick_seconds) * self.tick_seconds
+            try:
+                content = await asyncio.to_thread(self.compute, channel.key, tick)
+            except Exception:
+                logger.exception("Live positions for %s failed", channel.key)
+            else:
+                self.ticks += 1
+                channel.publish(content)
+            await asyncio.sleep(max(0.0, tick + self.tick_seconds - time.time()))
+
+    def stop(self):
+        for channel in self.channels.values():
+            channel.task.cancel()
+        self.channels.clear()
+
+    def stats(self):
+        return {
+            "channels": len(self.channels),
+            "subscribers": sum(len(c.subscribers) for c in self.channels.values()),
+            "ticks": self.ticks,
+            "resyncs": self.resyncs,
+        }
@@ -1,10 +1,88 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from datetime import datetime
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
+from typing import List
+import asyncio
+import gzip
+import json
+import os
+import time
 import pytz
-from engine import calculate_positions, calculate_transits, calculate_monthly_events
+import swisseph as swe
+from engine import (
+    ascendant_entry, calculate_aspects, calculate_crossings, calculate_monthly_events, calculate_transits, planet_entries,
+    tropical_ascendant, tropical_planet_positions, get_julian_day, month_range_jd, CALENDAR_ASPECT_NAMES,
+    transit_record, year_range_jd, CALENDAR_EVENT_FORMATTERS, DEFAULT_LATITUDE, DEFAULT_LONGITUDE, ENGINE_VERSION, IST,
+)
+from ephemeris import (
+    ALL_METHODS, EPHEMERIS_BACKEND, EPHEMERIS_TABLES, EPHEMERIS_VERSION, METHOD_ALL, PLANETS, canonical_method,
+)
+from cache import ObjectLRU, cache_from_env, make_etag
+from singleflight import SingleFlight
+from admission import Overloaded, pool_from_env
+from parallel import calculate_transits_range, shutdown_executor
+from batch import calculate_positions_batch
+from panchang import calculate_panchang
+from lagna import calculate_lagna
+from streams import iter_events, iter_transits
+from live import Broadcaster, TooManyChannels
+from aspects import ASPECTS
+from vargas import VARGAS, with_vargas
+from eventstore import (
+    ALL_KINDS, CALENDAR_KINDS, INDEXED_BODIES, KIND_INGRESS, EventStore, calendar_events, window_years,
+)
+from warmup import ActivityTracker, scheduler_from_env
+from metrics import PROFILE_REQUEST, REQUEST_SECONDS, add_collector, phase, profiled, render as render_metrics
+
+try:
+    import msgpack
+except ImportError:  # optional: only needed for Accept: application/msgpack on the batch endpoint
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:  # optional: json is used instead, several times slower on large event lists
+    orjson = None
+
+# Longest span accepted by /api/transits?end_year=... and the streaming range endpoints
+MAX_TRANSIT_YEARS = 200
+
+# Most charts accepted by one /api/positions/batch request
+MAX_BATCH_RECORDS = 10000
+
+# Longest range of one /api/lagna table, in days
+MAX_LAGNA_DAYS = 366
+
+# Longest /api/aspects range in days, and the largest orb accepted
+MAX_ASPECT_DAYS = 366
+MAX_ORB = 15.0
+
+# Longest /api/events window (in years) and most events one /api/events/next returns
+MAX_EVENT_WINDOW_YEARS = 10
+MAX_NEXT_EVENTS = 100
+
+# Most target longitudes of one /api/search/crossing and most crossings it returns
+MAX_CROSSING_TARGETS = 24
+MAX_CROSSINGS = 1000
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARMUP is not None:
+        WARMUP.start()
+    yield
+    LIVE.stop()
+    if WARMUP is not None:
+        WARMUP.stop()
+    COMPUTE_POOL.shutdown()
+    BATCH_POOL.shutdown()
+    shutdown_executor()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -12,57 +90,911 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Profile-Summary", "X-Ephemeris"],
 )
 
+# Results for a given (year, month, method) never change for a given engine/ephemeris
+# version, so they are cached in memory and on disk (see cache.py).
+RESULT_CACHE = cache_from_env()
+RESULT_CACHE_CONTROL = "public, max-age=86400"
+# For responses whose date defaulted to today (or this year): the same URL
+# means another result tomorrow, so clients revalidate with the ETag each time
+DEFAULT_DATE_CACHE_CONTROL = "no-cache"
+
+# Concurrent misses for the same key share one computation (see singleflight.py)
+IN_FLIGHT = SingleFlight()
+
+# Heavy engine calls run in bounded pools with bounded queues, and are refused
+# with 503 + Retry-After when a queue is full, so they cannot starve / and
+# /api/current (see admission.py). Sized by COMPUTE_WORKERS/COMPUTE_QUEUE_DEPTH
+# and BATCH_WORKERS/BATCH_QUEUE_DEPTH.
+COMPUTE_POOL = pool_from_env("compute", workers=2, queue_depth=16)
+BATCH_POOL = pool_from_env("batch", workers=1, queue_depth=2)
+
+# Sorted per-year event indexes behind /api/calendar, the event queries and
+# /api/transits of years already indexed, persisted in the SQLite tier of the result cache (see eventstore.py)
+EVENT_STORE = EventStore(persist=RESULT_CACHE.disk)
+
+
+# /api/current serves positions computed at the start of CURRENT_RESOLUTION_SECONDS
+# long time buckets: the tropical planets once per bucket, the tropical Ascendant
+# once per (bucket, location rounded to LOCATION_DECIMALS), every method derived
+# from them, so clients polling from the same few cities share a handful of
+# computations per bucket whatever zodiac they ask for.
+CURRENT_RESOLUTION_SECONDS = max(1, int(os.environ.get("CURRENT_RESOLUTION_SECONDS", 60)))
+LOCATION_DECIMALS = 2
+CURRENT_CACHE = ObjectLRU(4096)
+
+
+# Timezone of the display fields when the client doesn't choose one
+DEFAULT_TIMEZONE = "Asia/Kolkata"
+
+
+def _serialize(content, tz=IST):
+    """
+    Compact UTF-8 JSON, as FastAPI's default JSONResponse would produce.
+    Event records (engine.TransitRecord, engine.CalendarEvent) are expanded
+    with their display fields in `tz` while encoding.
+    """
+    def default(obj):
+        if hasattr(obj, "to_dict"):
+            return obj.to_dict(tz)
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    if orjson is not None:
+        return orjson.dumps(content, default=default)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"),
+                      default=default).encode("utf-8")
+
+
+def cached_body(key: str, compute, tz=IST):
+    """
+    JSON body for `key` from the result cache, computing and storing it on a miss.
+    Identical misses in flight at the same time are coalesced into one computation.
+    Event records in the result are displayed in `tz`, which must be part of the key.
+    """
+    key = f"{ENGINE_VERSION}:{EPHEMERIS_VERSION}:{key}"
+    body = RESULT_CACHE.get(key)
+    if body is None:
+        def compute_and_store():
+            # Re-check: a leader that just finished may have filled the cache
+            cached = RESULT_CACHE.get(key)
+            if cached is not None:
+                return cached
+            result = compute()
+            with phase("serialize"):
+                value = _serialize(result, tz)
+            RESULT_CACHE.set(key, value)
+            return value
+        # One pool call per distinct miss; requests coalesced onto it still
+        # hold a thread, so they count against the pool's limit too
+        with COMPUTE_POOL.admit():
+            body = IN_FLIGHT.do(key, lambda: COMPUTE_POOL.run(compute_and_store))
+    return body
+
+
+def cached_json_response(request: Request, key: str, compute, tz=IST, cache_control=RESULT_CACHE_CONTROL):
+    """
+    Serve cached_body(key, compute, tz) with ETag/Cache-Control; answers If-None-Match with 304.
+    """
+    return _json_response(request, cached_body(key, compute, tz), cache_control)
+
+
+def all_methods_response(request: Request, key, compute, tz=IST, cache_control=RESULT_CACHE_CONTROL):
+    """
+    method=all for the event endpoints: {"method": "all", "methods": {method: body}}
+    with the cached body of every method of ALL_METHODS, from key(method) and
+    compute(method). Event times differ per zodiac, so each method's result is
+    computed and cached on its own; the bodies are joined without re-encoding.
+    """
+    parts = [b'"' + method.encode() + b'":' + cached_body(key(method), lambda method=method: compute(method), tz)
+             for method in ALL_METHODS]
+    return _json_response(request, b'{"method":"all","methods":{' + b",".join(parts) + b"}}", cache_control)
+
+
+def _json_response(request: Request, body: bytes, cache_control=RESULT_CACHE_CONTROL):
+    headers = {"ETag": make_etag(body), "Cache-Control": cache_control}
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def current_cached(key: str, compute):
+    """Value for `key` from the /api/current micro-cache, computed once (coalesced) on a miss."""
+    value = CURRENT_CACHE.get(key)
+    if value is None:
+        def compute_and_store():
+            cached = CURRENT_CACHE.get(key)
+            if cached is not None:
+                return cached
+            result = compute()
+            CURRENT_CACHE.set(key, result)
+            return result
+        value = IN_FLIGHT.do(key, compute_and_store)
+    return value
+
+
+def check_method(method: str, allow_all=False):
+    """Reject unknown zodiac/ayanamsa names with 400 instead of a server error."""
+    if allow_all and method == METHOD_ALL:
+        return
+    try:
+        canonical_method(method)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def check_location(lat: float, lon: float):
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise HTTPException(status_code=400, detail="lat must be within [-90, 90] and lon within [-180, 180]")
+
+
+def check_timezone(timezone: str):
+    """pytz timezone for an IANA name, or 400."""
+    try:
+        return pytz.timezone(timezone)
+    except pytz.UnknownTimeZoneError:
+        raise HTTPException(status_code=400, detail=f"Unknown timezone '{timezone}'")
+
+
+def _timezone_suffix(timezone):
+    # Keys of the default timezone predate the parameter and are kept as they were
+    return "" if timezone == DEFAULT_TIMEZONE else f":tz={timezone}"
+
+
+def check_aspects(aspects: str):
+    """Comma-separated aspect names -> tuple in angle order (None when not given), or 400."""
+    if aspects is None:
+        return None
+    names = {a.strip() for a in aspects.split(",") if a.strip()}
+    if not names or not names <= set(ASPECTS):
+        raise HTTPException(status_code=400, detail=f"aspects must be a comma-separated subset of {list(ASPECTS)}")
+    return tuple(sorted(names, key=ASPECTS.get))
+
+
+def check_vargas(vargas):
+    """Comma-separated varga names (D1 ... D60) or "all" -> tuple in VARGAS order; () when not given; or 400."""
+    if not vargas:
+        return ()
+    if vargas == "all":
+        return VARGAS
+    names = {v.strip().upper() for v in vargas.split(",") if v.strip()}
+    if not names or not names <= set(VARGAS):
+        raise HTTPException(status_code=400,
+                            detail=f"vargas must be 'all' or a comma-separated subset of {list(VARGAS)}")
+    return tuple(v for v in VARGAS if v in names)
+
+
+def transits_key(year, planet, method, end_year=None, timezone=DEFAULT_TIMEZONE):
+    return f"transits:{year}:{end_year}:{planet}:{method}" + _timezone_suffix(timezone)
+
+
+def transits_result(year, planet, method, end_year=None, timezone=DEFAULT_TIMEZONE):
+    last_year = year if end_year is None else end_year
+    indexed = planet not in PLANETS or planet in INDEXED_BODIES
+    if not indexed or not EVENT_STORE.has_years(range(year, last_year + 1), method):
+        # The Moon is not indexed, and a year index costs far more than the
+        # ingress search alone: only read years already indexed from the store
+        if last_year == year:
+            transits = calculate_transits(year, planet, method=method)
+        else:
+            transits = calculate_transits_range(year, last_year, planet, method)
+    else:
+        start_jd, _ = year_range_jd(year)
+        _, end_jd = year_range_jd(last_year)
+        events = EVENT_STORE.window(start_jd, end_jd, method, {KIND_INGRESS}, planet)
+        transits = [transit_record(e.body, e.item) for e in events]
+    result = {
+        "year": year,
+        "planet": planet,
+        "method": method,
+        "timezone": timezone,
+        "count": len(transits),
+        "transits": transits
+    }
+    if end_year is not None:
+        result["end_year"] = end_year
+    return result
+
+
+def calendar_key(year, month, method, nakshatras=False, timezone=DEFAULT_TIMEZONE, aspects=None, moon=False):
+    key = f"calendar:{year}:{month}:{method}" + (":nakshatras" if nakshatras else "")
+    if aspects is not None:
+        key += ":aspects=" + ",".join(aspects)
+    return key + (":moon" if moon else "") + _timezone_suffix(timezone)
+
+
+def calendar_result(year, month, method, nakshatras=False, timezone=DEFAULT_TIMEZONE, aspects=None, moon=False):
+    if aspects is None and not moon:
+        start_jd, end_jd = month_range_jd(year, month)
+        kinds = ALL_KINDS if nakshatras else CALENDAR_KINDS
+        events = calendar_events(EVENT_STORE.window(start_jd, end_jd, method, kinds))
+    else:
+        # Not the aspects of the event store: scan the month with these
+        events = calculate_monthly_events(year, month, method, nakshatras, aspects or CALENDAR_ASPECT_NAMES, moon)
+    return {
+        "year": year,
+        "month": month,
+        "method": method,
+        "timezone": timezone,
+        "count": len(events),
+        "events": events
+    }
+
+
+def run_warmup_job(kind, params):
+    """Fill the result cache for one warmup job (see warmup.py); a no-op when already cached."""
+    if kind == "transits":
+        year, method = params
+        cached_body(transits_key(year, None, method), lambda: transits_result(year, None, method))
+    else:
+        year, month, method = params
+        cached_body(calendar_key(year, month, method), lambda: calendar_result(year, month, method))
+
+
+# Background precompute of the calendar/transit windows around today, paused
+# while requests are being served (WARMUP_ENABLED=0 turns it off)
+ACTIVITY = ActivityTracker()
+WARMUP = scheduler_from_env(run_warmup_job, ACTIVITY)
+
+
+# Requests sent with "X-Profile: 1" get a cProfile summary of the endpoint in the
+# X-Profile-Summary response header - only when PROFILING_ENABLED=1.
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED") == "1"
+
+
+def _method_label(method):
+    """Zodiac method for metric labels; bounded to the known names. Omitted is the default, sidereal."""
+    if method is None:
+        return "sidereal"
+    if method == METHOD_ALL:
+        return method
+    try:
+        return canonical_method(method)
+    except ValueError:
+        return "invalid"
+
+
+@app.middleware("http")
+async def instrument(request: Request, call_next):
+    """
+    Counts requests in progress (for the warmup), records latency, handles
+    X-Profile and reports the ephemeris behind the results in X-Ephemeris.
+    """
+    profile = {} if PROFILING_ENABLED and request.headers.get("x-profile") == "1" else None
+    token = PROFILE_REQUEST.set(profile)
+    start = time.perf_counter()
+    try:
+        with ACTIVITY.track():
+            response = await call_next(request)
+    finally:
+        PROFILE_REQUEST.reset(token)
+    route = request.scope.get("route")
+    REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=route.path if route else "unmatched",
+                            http_method=request.method, method=_method_label(request.query_params.get("method")))
+    if profile and "summary" in profile:
+        response.headers["X-Profile-Summary"] = profile["summary"]
+    response.headers["X-Ephemeris"] = EPHEMERIS_VERSION
+    return response
+
+
+@app.exception_handler(Overloaded)
+async def overloaded(request: Request, exc: Overloaded):
+    """503 with Retry-After when a compute pool's queue is full; no work was done."""
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": str(exc.retry_after)})
+
+
+def _cache_metrics():
+    stats = RESULT_CACHE.stats()
+    tiers = [(tier, tier_stats) for tier, tier_stats in stats.items() if tier_stats]
+    yield ("result_cache_hits_total", "counter", "Result cache hits per tier",
+           [({"tier": tier}, s["hits"]) for tier, s in tiers])
+    yield ("result_cache_misses_total", "counter", "Result cache misses per tier",
+           [({"tier": tier}, s["misses"]) for tier, s in tiers])
+    yield ("result_cache_entries", "gauge", "Entries in the result cache per tier",
+           [({"tier": tier}, s["entries"]) for tier, s in tiers])
+    yield ("result_cache_evictions_total", "counter", "Evictions from the memory tier",
+           [({}, stats["memory"]["evictions"])])
+    yield ("result_cache_bytes", "gauge", "Size of the memory tier", [({}, stats["memory"]["bytes"])])
+    current = CURRENT_CACHE.stats()
+    yield ("current_cache_hits_total", "counter", "/api/current micro-cache hits", [({}, current["hits"])])
+    yield ("current_cache_misses_total", "counter", "/api/current micro-cache misses", [({}, current["misses"])])
+    coalescing = IN_FLIGHT.stats()
+    yield ("computations_total", "counter", "Cache-miss computations run", [({}, coalescing["executions"])])
+    yield ("computations_coalesced_total", "counter", "Requests that joined a computation in flight",
+           [({}, coalescing["coalesced"])])
+    yield ("requests_in_progress", "gauge", "Requests being served", [({}, ACTIVITY.active)])
+    live = LIVE.stats()
+    yield ("live_channels", "gauge", "Live position channels with a broadcaster task", [({}, live["channels"])])
+    yield ("live_subscribers", "gauge", "Connected live position subscribers", [({}, live["subscribers"])])
+    yield ("live_ticks_total", "counter", "Live position computations (one per channel and tick)",
+           [({}, live["ticks"])])
+    yield ("live_resyncs_total", "counter", "Live messages replaced by a snapshot for a slow subscriber",
+           [({}, live["resyncs"])])
+
+
+add_collector(_cache_metrics)
+
+
+def _compute_metrics():
+    pools = [(pool.name, pool.stats()) for pool in (COMPUTE_POOL, BATCH_POOL)]
+    yield ("compute_calls_total", "counter", "Engine calls admitted to a compute pool",
+           [({"pool": name}, stats["calls"]) for name, stats in pools])
+    yield ("compute_rejected_total", "counter", "Engine calls refused with 503 because the pool's queue was full",
+           [({"pool": name}, stats["rejected"]) for name, stats in pools])
+    yield ("compute_active", "gauge", "Request threads and open streams counted against a compute pool's limit",
+           [({"pool": name}, stats["active"]) for name, stats in pools])
+    yield ("compute_queued", "gauge", "Engine calls waiting for a compute pool worker",
+           [({"pool": name}, stats["queued"]) for name, stats in pools])
+    yield ("compute_running", "gauge", "Engine calls running in a compute pool",
+           [({"pool": name}, stats["running"]) for name, stats in pools])
+
+
+add_collector(_compute_metrics)
+
+
 @app.get("/")
 def read_root():
-    return {"message": "Vedic Astrology API is running"}
+    return {
+        "message": "Vedic Astrology API is running",
+        "engine_version": ENGINE_VERSION,
+        "ephemeris": {
+            "backend": EPHEMERIS_BACKEND.name,
+            "requested_backend": EPHEMERIS_BACKEND.requested,
+            "version": EPHEMERIS_VERSION,
+            "tables": EPHEMERIS_TABLES is not None,
+        },
+    }
 
 @app.get("/api/current")
-def get_current_positions(method: str = "sidereal"):
+@profiled
+def get_current_positions(method: str = "sidereal", lat: float = DEFAULT_LATITUDE, lon: float = DEFAULT_LONGITUDE,
+                          timezone: str = DEFAULT_TIMEZONE, vargas: str = None):
     """
     Get current planetary positions in Sidereal or Tropical Zodiac.
-    Times are calculated for current IST time.
+    method: tropical, sidereal/lahiri, raman, kp or fagan_bradley; "all" returns
+    positions as {method: positions} for every zodiac, from one computation.
+    lat/lon: location for the Ascendant (default New Delhi), rounded to LOCATION_DECIMALS.
+    timezone: IANA name the timestamp is reported in (default IST).
+    vargas: divisional charts to add to every position, e.g. D9,D10, or "all" (see vargas.py).
+    Positions are for the start of the current CURRENT_RESOLUTION_SECONDS bucket.
     """
-    ist = pytz.timezone('Asia/Kolkata')
-    now_ist = datetime.now(ist)
-    
-    positions = calculate_positions(now_ist, method=method)
-    
+    check_method(method, allow_all=True)
+    check_location(lat, lon)
+    tz = check_timezone(timezone)
+    names = check_vargas(vargas)
+
+    now = time.time()
+    bucket = int(now // CURRENT_RESOLUTION_SECONDS) * CURRENT_RESOLUTION_SECONDS
+    result = current_positions(now, bucket, method, round(lat, LOCATION_DECIMALS), round(lon, LOCATION_DECIMALS),
+                               timezone, tz)
+    if names:
+        positions = result["positions"]
+        if method == METHOD_ALL:
+            result["positions"] = {m: with_vargas(p, names) for m, p in positions.items()}
+        else:
+            result["positions"] = with_vargas(positions, names)
+    return result
+
+
+def current_positions(now, bucket, method, lat, lon, timezone, tz):
+    """/api/current body for the positions at the Unix time `bucket`, through the micro-cache."""
+    jd = get_julian_day(datetime.fromtimestamp(bucket, pytz.utc))
+    with phase("current.compute"):
+        planets = current_cached(f"current:{bucket}", lambda: tropical_planet_positions(jd))
+        ascendant = current_cached(f"current:{bucket}:{lat}:{lon}", lambda: tropical_ascendant(jd, lat, lon))
+        methods = ALL_METHODS if method == METHOD_ALL else (method,)
+        positions = {m: planet_entries(planets, jd, m) + [ascendant_entry(ascendant, jd, m)] for m in methods}
+
     return {
-        "timestamp": now_ist.isoformat(),
+        "timestamp": datetime.fromtimestamp(now, tz).isoformat(),
+        "computed_for": datetime.fromtimestamp(bucket, tz).isoformat(),
         "method": method,
-        "positions": positions
+        "location": {"lat": lat, "lon": lon, "timezone": timezone},
+        "positions": positions if method == METHOD_ALL else positions[method]
     }
 
+
+def live_positions(key, tick):
+    """Content of a live channel (method, lat, lon, timezone) at the Unix time `tick`."""
+    method, lat, lon, timezone = key
+    return current_positions(time.time(), tick, method, lat, lon, timezone, pytz.timezone(timezone))
+
+
+# One broadcaster task per (method, location, timezone) computes the positions
+# once per tick for all its subscribers (see live.py)
+LIVE = Broadcaster(live_positions, _serialize)
+
+
+def live_subscription(method, lat, lon, timezone):
+    """Validate the parameters and subscribe to their channel; 503 when no channel can be added."""
+    check_method(method, allow_all=True)
+    check_location(lat, lon)
+    check_timezone(timezone)
+    key = (method, round(lat, LOCATION_DECIMALS), round(lon, LOCATION_DECIMALS), timezone)
+    try:
+        return LIVE.subscribe(key)
+    except TooManyChannels as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@app.get("/api/live")
+async def get_live_positions(method: str = "sidereal", lat: float = DEFAULT_LATITUDE,
+                             lon: float = DEFAULT_LONGITUDE, timezone: str = DEFAULT_TIMEZONE):
+    """
+    Server-sent events with the /api/current positions every LIVE_TICK_SECONDS:
+    an `event: snapshot` first, then `event: delta` with the changed fields only
+    (another snapshot when the client fell behind). Same parameters as /api/current.
+    """
+    subscription = live_subscription(method, lat, lon, timezone)
+
+    async def body():
+        try:
+            async for message in subscription:
+                yield message.sse
+        finally:
+            LIVE.unsubscribe(subscription)
+
+    return StreamingResponse(body(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.websocket("/api/live/ws")
+async def live_positions_socket(websocket: WebSocket, method: str = "sidereal", lat: float = DEFAULT_LATITUDE,
+                                lon: float = DEFAULT_LONGITUDE, timezone: str = DEFAULT_TIMEZONE):
+    """/api/live over a WebSocket: one JSON text message per tick, with "type" snapshot or delta."""
+    try:
+        subscription = live_subscription(method, lat, lon, timezone)
+    except HTTPException as e:
+        await websocket.close(code=1008 if e.status_code == 400 else 1013, reason=e.detail)
+        return
+    await websocket.accept()
+
+    async def send():
+        async for message in subscription:
+            await websocket.send_text(message.data.decode())
+
+    async def receive():
+        # Incoming messages are ignored; this only notices the client leaving
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    tasks = [asyncio.create_task(send()), asyncio.create_task(receive())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        LIVE.unsubscribe(subscription)
+
+
+class ChartRecord(BaseModel):
+    datetime: datetime  # naive values are taken as UTC
+    lat: float
+    lon: float
+
+
+class BatchRequest(BaseModel):
+    records: List[ChartRecord]
+    method: str = "sidereal"
+    vargas: List[str] = []  # e.g. ["D9", "D10"], or ["all"]
+
+
+@app.post("/api/positions/batch")
+@profiled
+def post_positions_batch(request: Request, body: BatchRequest):
+    """
+    Planets, Ascendant, MC and house cusps for up to MAX_BATCH_RECORDS charts,
+    as columns (one array per field, in record order; see batch.py).
+    Cusps are Placidus, or Porphyry for charts beyond the polar circles where
+    Placidus is undefined; "house_system" gives the system of each chart.
+    vargas adds the divisional signs (0 = Aries) of every body and the Ascendant.
+    Send Accept: application/msgpack for MessagePack instead of JSON;
+    the body is gzip-compressed when the client accepts it.
+    """
+    check_method(body.method)
+    names = check_vargas(",".join(body.vargas))
+    if len(body.records) > MAX_BATCH_RECORDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_RECORDS} records per request")
+    for r in body.records:
+        check_location(r.lat, r.lon)
+
+    if "application/msgpack" in request.headers.get("accept", ""):
+        if msgpack is None:
+            raise HTTPException(status_code=406, detail="MessagePack output is not available on this server")
+        encode, media_type = msgpack.packb, "application/msgpack"
+    else:
+        encode, media_type = _serialize, "application/json"
+
+    records = [(r.datetime, r.lat, r.lon) for r in body.records]
+    with phase("batch.compute"):
+        columns = BATCH_POOL.run(lambda: calculate_positions_batch(records, method=body.method, vargas=names))
+    with phase("batch.encode"):
+        content = encode({"method": body.method, "count": len(body.records), **columns})
+    headers = {}
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        content = gzip.compress(content, compresslevel=5)
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=content, media_type=media_type, headers=headers)
+
 @app.get("/api/transits")
-def get_transits(year: int = None, planet: str = None, method: str = "sidereal"):
+@profiled
+def get_transits(request: Request, year: int = None, planet: str = None, method: str = "sidereal",
+                 end_year: int = None, timezone: str = DEFAULT_TIMEZONE):
     """
     Get transits for a specific year or planet.
-    Defaults to current year and sidereal method.
+    Defaults to current year and sidereal method; method=all returns every zodiac's under "methods".
+    With end_year, covers year..end_year (inclusive), computed across worker processes.
+    timezone: IANA name the times are displayed in (default IST).
+    Without year the response must be revalidated (no-cache): it changes at New Year.
     """
+    check_method(method, allow_all=True)
+    tz = check_timezone(timezone)
+    cache_control = RESULT_CACHE_CONTROL
     if year is None:
         year = datetime.now().year
-        
-    transits = calculate_transits(year, planet, method=method)
-    return {
-        "year": year,
-        "planet": planet,
+        cache_control = DEFAULT_DATE_CACHE_CONTROL
+    if end_year is not None and not year <= end_year < year + MAX_TRANSIT_YEARS:
+        raise HTTPException(status_code=400, detail=f"end_year must be within {MAX_TRANSIT_YEARS} years after year")
+
+    if method == METHOD_ALL:
+        return all_methods_response(request, lambda m: transits_key(year, planet, m, end_year, timezone),
+                                    lambda m: transits_result(year, planet, m, end_year, timezone), tz, cache_control)
+    return cached_json_response(request, transits_key(year, planet, method, end_year, timezone),
+                                lambda: transits_result(year, planet, method, end_year, timezone), tz, cache_control)
+
+@app.get("/api/calendar")
+@profiled
+def get_calendar(request: Request, year: int, month: int, method: str = "sidereal", nakshatras: bool = False,
+                 timezone: str = DEFAULT_TIMEZONE, aspects: str = None, moon: bool = False):
+    """
+    Get astrological events for a specific month (UTC); method=all returns every zodiac's under "methods".
+    nakshatras=true adds the planets' nakshatra changes.
+    timezone: IANA name the dates and times are displayed in (default IST).
+    aspects: comma-separated aspect names (default conjunction,trine,opposition);
+    moon=true includes the Moon's aspects.
+    """
+    check_method(method, allow_all=True)
+    tz = check_timezone(timezone)
+    names = check_aspects(aspects)
+    if method == METHOD_ALL:
+        return all_methods_response(request, lambda m: calendar_key(year, month, m, nakshatras, timezone, names, moon),
+                                    lambda m: calendar_result(year, month, m, nakshatras, timezone, names, moon), tz)
+    return cached_json_response(request, calendar_key(year, month, method, nakshatras, timezone, names, moon),
+                                lambda: calendar_result(year, month, method, nakshatras, timezone, names, moon), tz)
+
+@app.get("/api/aspects")
+@profiled
+def get_aspects(request: Request, start: date, end: date, method: str = "sidereal", aspects: str = None,
+                orb: float = None, moon: bool = False, timezone: str = DEFAULT_TIMEZONE):
+    """
+    Exact aspects between two dates (inclusive, UTC, at most MAX_ASPECT_DAYS)
+    with the times each one enters its orb (applying) and leaves it (separating).
+    aspects: comma-separated names (default conjunction,trine,opposition);
+    orb: degrees for every aspect (default per aspect, see aspects.DEFAULT_ORBS);
+    moon=true includes the Moon.
+    """
+    check_method(method)
+    tz = check_timezone(timezone)
+    names = check_aspects(aspects) or CALENDAR_ASPECT_NAMES
+    if orb is not None and not 0 < orb <= MAX_ORB:
+        raise HTTPException(status_code=400, detail=f"orb must be within (0, {MAX_ORB}]")
+    if end < start or (end - start).days >= MAX_ASPECT_DAYS:
+        raise HTTPException(status_code=400, detail=f"end must be after start and within {MAX_ASPECT_DAYS} days")
+    start_jd, end_jd = _range_jd(start, end)
+
+    def compute():
+        records = calculate_aspects(start_jd, end_jd, method, names, orb, moon)
+        return {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "method": method,
+            "aspects": list(names),
+            "orb": orb,
+            "moon": moon,
+            "timezone": timezone,
+            "count": len(records),
+            "events": records,
+        }
+
+    key = f"aspects:{start}:{end}:{method}:{','.join(names)}:{orb}:{moon}" + _timezone_suffix(timezone)
+    return cached_json_response(request, key, compute, tz)
+
+@app.get("/api/panchang")
+@profiled
+def get_panchang(request: Request, year: int = None, lat: float = DEFAULT_LATITUDE, lon: float = DEFAULT_LONGITUDE,
+                 timezone: str = DEFAULT_TIMEZONE, method: str = "sidereal"):
+    """
+    A year of Panchang for a location: tithi, nakshatra, yoga and karana with
+    start/end times, and daily sunrise/sunset (see panchang.py).
+    Defaults to the current year (in `timezone`), New Delhi and IST; lat/lon are rounded to LOCATION_DECIMALS.
+    Without year the response must be revalidated (no-cache): it changes at New Year.
+    """
+    check_method(method)
+    check_location(lat, lon)
+    tz = check_timezone(timezone)
+    cache_control = RESULT_CACHE_CONTROL
+    if year is None:
+        year = datetime.now(tz).year
+        cache_control = DEFAULT_DATE_CACHE_CONTROL
+    lat, lon = round(lat, LOCATION_DECIMALS), round(lon, LOCATION_DECIMALS)
+
+    def compute():
+        return {
+            "year": year,
+            "method": method,
+            "location": {"lat": lat, "lon": lon, "timezone": timezone},
+            **calculate_panchang(year, lat, lon, timezone, method),
+        }
+
+    return cached_json_response(request, f"panchang:{year}:{lat}:{lon}:{timezone}:{method}", compute,
+                                cache_control=cache_control)
+
+@app.get("/api/lagna")
+@profiled
+def get_lagna(request: Request, start: date = None, end: date = None, lat: float = DEFAULT_LATITUDE,
+              lon: float = DEFAULT_LONGITUDE, timezone: str = DEFAULT_TIMEZONE, method: str = "sidereal"):
+    """
+    Lagna table: the rising sign with the times the Ascendant enters and leaves
+    it, for the local days start..end (inclusive, at most MAX_LAGNA_DAYS; see lagna.py).
+    Defaults to today (in `timezone`), New Delhi and IST; lat/lon are rounded to LOCATION_DECIMALS.
+    Without start the response must be revalidated (no-cache): it changes at local midnight.
+    """
+    check_method(method)
+    check_location(lat, lon)
+    tz = check_timezone(timezone)
+    cache_control = RESULT_CACHE_CONTROL
+    if start is None:
+        start = datetime.now(tz).date()
+        cache_control = DEFAULT_DATE_CACHE_CONTROL
+    if end is None:
+        end = start
+    if end < start or (end - start).days >= MAX_LAGNA_DAYS:
+        raise HTTPException(status_code=400, detail=f"end must be after start and within {MAX_LAGNA_DAYS} days")
+    lat, lon = round(lat, LOCATION_DECIMALS), round(lon, LOCATION_DECIMALS)
+
+    def compute():
+        table = calculate_lagna(start, end, lat, lon, timezone, method)
+        return {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "method": method,
+            "location": {"lat": lat, "lon": lon, "timezone": timezone},
+            "count": len(table),
+            "lagna": table,
+        }
+
+    return cached_json_response(request, f"lagna:{start}:{end}:{lat}:{lon}:{timezone}:{method}", compute,
+                                cache_control=cache_control)
+
+@app.get("/api/cache/stats")
+def get_cache_stats():
+    """
+    Hit/miss/eviction counters of the result cache, the /api/current micro-cache
+    and the event store, how many requests were coalesced, and the compute pools.
+    """
+    stats = RESULT_CACHE.stats()
+    stats["coalescing"] = IN_FLIGHT.stats()
+    stats["current"] = CURRENT_CACHE.stats()
+    stats["event_store"] = EVENT_STORE.stats()
+    stats["live"] = LIVE.stats()
+    stats["compute"] = {COMPUTE_POOL.name: COMPUTE_POOL.stats(), BATCH_POOL.name: BATCH_POOL.stats()}
+    return stats
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Counters and histograms in the Prometheus text format (see metrics.py)."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/warmup")
+def get_warmup_status():
+    """Progress of the background cache warmup."""
+    if WARMUP is None:
+        return {"state": "disabled"}
+    status = WARMUP.status()
+    status["active_requests"] = ACTIVITY.active
+    return status
+
+def _range_jd(start: date, end: date):
+    """[start 00:00 UTC, day after end 00:00 UTC) as Julian Days; end is inclusive."""
+    if end < start or (end - start).days > MAX_TRANSIT_YEARS * 366:
+        raise HTTPException(status_code=400, detail=f"end must be after start and within {MAX_TRANSIT_YEARS} years")
+    start_dt = datetime(start.year, start.month, start.day, tzinfo=pytz.utc)
+    end_dt = datetime(end.year, end.month, end.day, tzinfo=pytz.utc) + timedelta(days=1)
+    return get_julian_day(start_dt), get_julian_day(end_dt)
+
+
+def _stream(records, format: str, event: str, tz=IST):
+    """
+    Stream records as NDJSON (one object per line) or as server-sent events
+    (`event: <event>` per record, then `event: end`), displayed in `tz`.
+    The lazy `records` are computed in COMPUTE_POOL a chunk at a time.
+    """
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+    records = COMPUTE_POOL.stream(records)
+    if format == "ndjson":
+        body = (_serialize(r, tz) + b"\n" for r in records)
+        return StreamingResponse(body, media_type="application/x-ndjson")
+    def body():
+        for r in records:
+            yield b"event: " + event.encode() + b"\ndata: " + _serialize(r, tz) + b"\n\n"
+        yield b"event: end\ndata: {}\n\n"
+    return StreamingResponse(body(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.get("/api/transits/range")
+@profiled
+def get_transits_range(start: date, end: date, planet: str = None, method: str = "sidereal", format: str = "ndjson",
+                       timezone: str = DEFAULT_TIMEZONE):
+    """
+    Stream sign changes between two dates (inclusive, UTC), in chronological order.
+    format: ndjson (default) or sse. timezone: IANA name the times are displayed in.
+    """
+    check_method(method)
+    tz = check_timezone(timezone)
+    start_jd, end_jd = _range_jd(start, end)
+    return _stream(iter_transits(start_jd, end_jd, planet, method), format, "transit", tz)
+
+
+def range_events(start_jd, end_jd, method):
+    """
+    Calendar events of [start_jd, end_jd) in time order: years already
+    indexed are read from EVENT_STORE, the others scanned a window at a time
+    (streams.iter_events), so a cold year does not hold back the first
+    events for a whole year index build.
+    """
+    for year in window_years(start_jd, end_jd):
+        year_start, year_end = year_range_jd(year)
+        start, end = max(start_jd, year_start), min(end_jd, year_end)
+        if EVENT_STORE.has_years([year], method):
+            for e in EVENT_STORE.year(year, method).window(start, end, CALENDAR_KINDS):
+                yield CALENDAR_EVENT_FORMATTERS[e.kind](e)
+        else:
+            yield from iter_events(start, end, method)
+
+
+@app.get("/api/events/range")
+@profiled
+def get_events_range(start: date, end: date, method: str = "sidereal", format: str = "ndjson",
+                     timezone: str = DEFAULT_TIMEZONE):
+    """
+    Stream calendar events (stations, aspects, sign changes) between two dates
+    (inclusive, UTC), in chronological order. format: ndjson (default) or sse.
+    timezone: IANA name the dates and times are displayed in.
+    """
+    check_method(method)
+    tz = check_timezone(timezone)
+    start_jd, end_jd = _range_jd(start, end)
+    return _stream(range_events(start_jd, end_jd, method), format, "event", tz)
+
+
+def check_kinds(kinds: str):
+    """Comma-separated event kinds -> set (the calendar's kinds when None), or 400."""
+    if kinds is None:
+        return CALENDAR_KINDS
+    selected = frozenset(k.strip() for k in kinds.split(",") if k.strip())
+    if not selected or not selected <= ALL_KINDS:
+        raise HTTPException(status_code=400, detail=f"kinds must be a comma-separated subset of {sorted(ALL_KINDS)}")
+    return selected
+
+
+def check_body(body: str):
+    if body is not None and body not in INDEXED_BODIES:
+        raise HTTPException(status_code=400, detail=f"body must be one of {INDEXED_BODIES}")
+
+
+@app.get("/api/events")
+@profiled
+def get_events(start: date, end: date, method: str = "sidereal", body: str = None, kinds: str = None,
+               timezone: str = DEFAULT_TIMEZONE):
+    """
+    Calendar events between two dates (inclusive, UTC) from the event store:
+    any window, e.g. a week. body restricts them to one body (aspects count
+    for both of theirs); kinds is a comma-separated subset of station, aspect,
+    ingress and nakshatra (default: all but nakshatra, as in the calendar).
+    """
+    check_method(method)
+    check_body(body)
+    selected = check_kinds(kinds)
+    tz = check_timezone(timezone)
+    if end < start or end.year - start.year >= MAX_EVENT_WINDOW_YEARS:
+        raise HTTPException(status_code=400, detail=f"end must be after start and within {MAX_EVENT_WINDOW_YEARS} years")
+    start_jd, end_jd = _range_jd(start, end)
+    events = COMPUTE_POOL.run(lambda: calendar_events(EVENT_STORE.window(start_jd, end_jd, method, selected, body)))
+    content = {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
         "method": method,
-        "count": len(transits),
-        "transits": transits
+        "body": body,
+        "timezone": timezone,
+        "count": len(events),
+        "events": events,
     }
+    with phase("serialize"):
+        return Response(content=_serialize(content, tz), media_type="application/json")
 
-@app.get("/api/calendar")
-def get_calendar(year: int, month: int, method: str = "sidereal"):
+
+@app.get("/api/events/next")
+@profiled
+def get_next_events(body: str, count: int = 10, after: datetime = None, method: str = "sidereal",
+                    kinds: str = None, timezone: str = DEFAULT_TIMEZONE):
     """
-    Get astrological events for a specific month.
+    The next `count` events of `body` from `after` (default now; naive times
+    are UTC), e.g. the next 10 events for Saturn. kinds as for /api/events.
     """
-    events = calculate_monthly_events(year, month, method=method)
-    return {
-        "year": year,
-        "month": month,
+    check_method(method)
+    check_body(body)
+    selected = check_kinds(kinds)
+    tz = check_timezone(timezone)
+    if not 1 <= count <= MAX_NEXT_EVENTS:
+        raise HTTPException(status_code=400, detail=f"count must be within [1, {MAX_NEXT_EVENTS}]")
+    if after is None:
+        after = datetime.now(pytz.utc)
+    jd = get_julian_day(after)
+    events = COMPUTE_POOL.run(lambda: calendar_events(EVENT_STORE.next_events(body, jd, count, method, selected)))
+    content = {
+        "body": body,
+        "after": after.isoformat(),
         "method": method,
+        "timezone": timezone,
         "count": len(events),
-        "events": events
+        "events": events,
+    }
+    with phase("serialize"):
+        return Response(content=_serialize(content, tz), media_type="application/json")
+
+
+def check_longitudes(longitude: str):
+    """Comma-separated degrees in [0, 360) -> list, or 400."""
+    try:
+        values = [float(v) for v in longitude.split(",") if v.strip()]
+    except ValueError:
+        values = []
+    if not 1 <= len(values) <= MAX_CROSSING_TARGETS or not all(0 <= v < 360 for v in values):
+        raise HTTPException(status_code=400,
+                            detail=f"longitude must be 1 to {MAX_CROSSING_TARGETS} comma-separated degrees in [0, 360)")
+    return values
+
+
+@app.get("/api/search/crossing")
+@profiled
+def search_crossing(body: str, longitude: str, after: datetime = None, years: float = 1.0, method: str = "sidereal",
+                    timezone: str = DEFAULT_TIMEZONE):
+    """
+    Every time `body` reaches `longitude` - one degree, or a comma-separated
+    list such as natal degrees - within `years` (at most MAX_TRANSIT_YEARS)
+    from `after` (default now; naive times are UTC), retrograde re-crossings
+    included: returns, Sade Sati boundaries, transits over natal points.
+    At most MAX_CROSSINGS are returned; "truncated" tells whether there were more.
+    A range outside the ephemeris (e.g. past year 3000 with Moshier) is a 400.
+    """
+    check_method(method)
+    tz = check_timezone(timezone)
+    if body not in PLANETS:
+        raise HTTPException(status_code=400, detail=f"body must be one of {list(PLANETS)}")
+    targets = check_longitudes(longitude)
+    if not 0 < years <= MAX_TRANSIT_YEARS:
+        raise HTTPException(status_code=400, detail=f"years must be within (0, {MAX_TRANSIT_YEARS}]")
+    if after is None:
+        after = datetime.now(pytz.utc)
+    start_jd = get_julian_day(after)
+    try:
+        crossings = COMPUTE_POOL.run(calculate_crossings, body, targets, start_jd, start_jd + years * 365.25, method,
+                                     MAX_CROSSINGS + 1)
+    except swe.Error as e:
+        # The range reaches past the dates the ephemeris covers
+        raise HTTPException(status_code=400, detail=f"after .. after + years is outside the ephemeris range: {e}")
+    content = {
+        "body": body,
+        "longitudes": targets,
+        "after": after.isoformat(),
+        "years": years,
+        "method": method,
+        "timezone": timezone,
+        "count": min(len(crossings), MAX_CROSSINGS),
+        "truncated": len(crossings) > MAX_CROSSINGS,
+        "crossings": crossings[:MAX_CROSSINGS],
     }
+    with phase("serialize"):
+        return Response(content=_serialize(content, tz), media_type="application/json")
@@ -0,0 +1,190 @@
+"""
+Minimal Prometheus-style metrics and per-request profiling.
+
+Counters and histograms live in this process and are rendered in the
+Prometheus text exposition format by render() (served on /metrics).
+Collectors registered with add_collector contribute values that already
+live elsewhere (the cache and coalescing stats) at scrape time.
+
+- phase(name): times a block into the phase_seconds histogram; used around
+  the scans of the engine and the serialization of the API.
+- EPHEMERIS_CALLS: swe.calc_ut / swe.houses_ex calls and table lookups,
+  counted in ephemeris.py.
+- REQUEST_SECONDS: request latency per endpoint, HTTP method and zodiac method.
+
+Work done in the process pool (parallel.py) is counted in the worker
+processes and therefore not visible here.
+
+profiled(fn) wraps an endpoint so that, when profiling was requested for the
+current request (see PROFILE_REQUEST), it runs under cProfile and leaves a
+short summary of the hottest functions for the response headers.
+"""
+import cProfile
+import contextvars
+import io
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_metrics = []
+_collectors = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, entry in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, entry):
+                    labels = _label_text(self.labels + ("le",), key + (repr(float(bound)),))
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _label_text(self.labels + ("le",), key + ("+Inf",))
+                lines.append(f"{self.name}_bucket{labels} {entry[-1]}")
+                lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {entry[-2]}")
+                lines.append(f"{self.name}_count{_label_text(self.labels, key)} {entry[-1]}")
+        return lines
+
+
+def add_collector(fn):
+    """fn() -> iterable of (name, type, help, [(labels dict, value), ...]) evaluated at scrape time."""
+    _collectors.append(fn)
+
+
+def render():
+    """All metrics in the Prometheus text format."""
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for collector in _collectors:
+        for name, kind, help, samples in collector():
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+            for labels, value in samples:
+                lines.append(f"{name}{_label_text(tuple(labels), tuple(labels.values()))} {value}")
+    return "\n".join(lines) + "\n"
+
+
+PHASE_SECONDS = Histogram("phase_seconds", "Time spent per computation phase", ["phase"])
+EPHEMERIS_CALLS = Counter("ephemeris_calls_total", "Ephemeris evaluations by function", ["function"])
+REQUEST_SECONDS = Histogram("request_seconds", "Request latency until the response starts",
+                            ["endpoint", "http_method", "method"])
+
+
+@contextmanager
+def phase(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        PHASE_SECONDS.observe(time.perf_counter() - start, phase=name)
+
+
+# Set by the HTTP middleware to a dict when the request asked for a profile;
+# profiled() stores the summary in it under "summary", and profiled_call()
+# the profiles of work done for the request on other threads under "profilers"
+# (which then replace the endpoint thread's in the summary).
+PROFILE_REQUEST = contextvars.ContextVar("profile_request", default=None)
+PROFILE_TOP = 10
+
+
+def profile_summary(*profilers, top=PROFILE_TOP):
+    """
+    'function (file:line) cumulative ms' for the top functions by cumulative
+    time over the merged `profilers`, joined by '; '.
+    """
+    stats = pstats.Stats(*profilers, stream=io.StringIO())
+    stats.sort_stats("cumulative")
+    entries = []
+    for (filename, line, func) in stats.fcn_list[:top]:
+        _, _, _, cumulative, _ = stats.stats[(filename, line, func)]
+        where = filename.rsplit("/", 1)[-1]
+        entries.append(f"{func} ({where}:{line}) {cumulative * 1000:.1f}ms")
+    return "; ".join(entries)
+
+
+def profiled(fn):
+    """Run the endpoint under cProfile when PROFILE_REQUEST is set for this request."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        holder = PROFILE_REQUEST.get()
+        if holder is None:
+            return fn(*args, **kwargs)
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(fn, *args, **kwargs)
+        finally:
+            # When the work was handed to a pool, the endpoint's own thread
+            # mostly waited for it: summarize the pool threads' profiles alone
+            holder["summary"] = profile_summary(*holder.get("profilers", [profiler]))
+    return wrapper
+
+
+def profiled_call(fn, *args):
+    """
+    fn(*args), added to the current request's profile when one was requested:
+    for work a request hands to another thread (see admission.py).
+    """
+    holder = PROFILE_REQUEST.get()
+    if holder is None:
+        return fn(*args)
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(fn, *args)
+    finally:
+        holder.setdefault("profilers", []).append(profiler)
@@ -0,0 +1,218 @@
+"""
+Panchang: tithi, nakshatra, yoga and karana transitions, and daily sunrise/sunset.
+
+The limbs are angles that only ever increase (the Sun and Moon are never
+retrograde), each crossing a boundary every `span` degrees:
+
+- tithi: Moon - Sun elongation, 30 of 12 deg (karana: 60 half-tithis of 6 deg)
+- nakshatra: Moon's sidereal longitude, 27 of 13 deg 20'
+- yoga: Sun + Moon sidereal longitudes, 27 of 13 deg 20'
+
+Instead of scanning the Moon, every boundary of the period is first predicted
+from the mean rate of its angle (the true angle stays within a few degrees of
+the mean one) and all predictions are then refined together by Newton's
+method, vectorized over the boundaries, with the true rate as derivative.
+Each boundary takes two or three Sun+Moon lookups. A year is roughly 740
+karana, 360 nakshatra and 390 yoga boundaries; tithis are every second
+karana boundary.
+
+Sunrise and sunset come from swe.rise_trans (upper limb, with refraction),
+one call each per local day.
+"""
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytz
+import swisseph as swe
+
+from engine import NAKSHATRAS, get_julian_day, jd_to_datetime
+from ephemeris import PLANETS, canonical_method, get_positions_speeds, rise_trans
+from search import NAKSHATRA_SPAN, TOLERANCE_SECOND
+
+TITHIS = [
+    "Pratipada", "Dwitiya", "Tritiya", "Chaturthi", "Panchami", "Shashthi", "Saptami", "Ashtami",
+    "Navami", "Dashami", "Ekadashi", "Dwadashi", "Trayodashi", "Chaturdashi",
+]
+
+YOGAS = [
+    "Vishkambha", "Priti", "Ayushman", "Saubhagya", "Shobhana", "Atiganda", "Sukarma", "Dhriti",
+    "Shula", "Ganda", "Vriddhi", "Dhruva", "Vyaghata", "Harshana", "Vajra", "Siddhi",
+    "Vyatipata", "Variyana", "Parigha", "Shiva", "Siddha", "Sadhya", "Shubha", "Shukla",
+    "Brahma", "Indra", "Vaidhriti",
+]
+
+# Karana 1 is fixed, 2-57 cycle through the seven movable ones, 58-60 are fixed
+MOVABLE_KARANAS = ["Bava", "Balava", "Kaulava", "Taitila", "Garaja", "Vanija", "Vishti"]
+FIXED_KARANAS = {0: "Kimstughna", 57: "Shakuni", 58: "Chatushpada", 59: "Naga"}
+
+TITHI_SPAN = 12.0
+KARANA_SPAN = 6.0
+YOGA_SPAN = NAKSHATRA_SPAN
+
+# Mean daily motion of each angle in degrees
+MEAN_RATE_ELONGATION = 12.190749
+MEAN_RATE_MOON = 13.176396
+MEAN_RATE_YOGA = 14.162043
+
+MAX_NEWTON_ITERATIONS = 10
+
+# Bound on |angle'' / (2 angle')| in 1/day for these angles. Newton's error after a
+# step of size h is at most about NEWTON_CURVATURE * h**2, so once steps are small
+# enough for that to be under the tolerance no confirming evaluation is needed.
+NEWTON_CURVATURE = 0.05
+
+# One limb period: number (1-based) and name of the limb, and its start/end JDs
+Span = namedtuple("Span", ["number", "name", "start_jd", "end_jd"])
+
+
+def tithi_name(index):
+    """0-based tithi index -> name with its paksha, e.g. 'Shukla Pratipada', 'Purnima'."""
+    if index == 14:
+        return "Purnima"
+    if index == 29:
+        return "Amavasya"
+    return ("Shukla " if index < 15 else "Krishna ") + TITHIS[index % 15]
+
+
+def karana_name(index):
+    """0-based karana index (half-tithi of the lunar month) -> name."""
+    if index in FIXED_KARANAS:
+        return FIXED_KARANAS[index]
+    return MOVABLE_KARANAS[(index - 1) % 7]
+
+
+def _sun_moon(jds, method):
+    sun, sun_speed = get_positions_speeds(jds, 'Sun', PLANETS['Sun'], method)
+    moon, moon_speed = get_positions_speeds(jds, 'Moon', PLANETS['Moon'], method)
+    return sun, sun_speed, moon, moon_speed
+
+
+def _elongation(jds, method):
+    sun, sun_speed, moon, moon_speed = _sun_moon(jds, method)
+    return (moon - sun) % 360, moon_speed - sun_speed
+
+
+def _moon(jds, method):
+    return get_positions_speeds(jds, 'Moon', PLANETS['Moon'], method)
+
+
+def _yoga(jds, method):
+    sun, sun_speed, moon, moon_speed = _sun_moon(jds, method)
+    return (moon + sun) % 360, moon_speed + sun_speed
+
+
+def _solve(angle, targets, jds, method, tolerance):
+    """Newton's method, vectorized: the JDs where angle(jd) == targets (mod 360), starting from jds."""
+    jds = jds.copy()
+    converged_step = np.sqrt(tolerance / NEWTON_CURVATURE)
+    active = np.arange(len(jds))
+    for _ in range(MAX_NEWTON_ITERATIONS):
+        if not active.size:
+            break
+        value, rate = angle(jds[active], method)
+        step = ((targets[active] - value + 180) % 360 - 180) / rate
+        jds[active] += step
+        active = active[np.abs(step) > converged_step]
+    return jds
+
+
+def boundaries(angle, span, mean_rate, start_jd, end_jd, method="sidereal", tolerance=TOLERANCE_SECOND):
+    """
+    Crossings of multiples of `span` by angle(jds, method), from the last one
+    at or before start_jd to the first one after end_jd.
+    Returns (jds, indices): indices[i] is the 0-based limb that starts at jds[i].
+    """
+    value, _ = angle(np.array([start_jd]), method)
+    first = int(value[0] // span)  # the limb in effect at start_jd began at first * span
+    # Mean-rate predictions drift by a few degrees either way; a margin of boundaries covers it
+    count = int(np.ceil((end_jd - start_jd) * mean_rate / span)) + 3
+    unwrapped = (first + np.arange(count)) * span
+    guesses = start_jd + (unwrapped - value[0]) / mean_rate
+    jds = _solve(angle, unwrapped % 360, guesses, method, tolerance)
+    indices = (first + np.arange(count)) % int(round(360 / span))
+    return _trim(jds, indices, start_jd, end_jd)
+
+
+def _trim(jds, indices, start_jd, end_jd):
+    """Boundaries from the last at or before start_jd to the first after end_jd."""
+    lo = max(int(np.searchsorted(jds, start_jd, side="right")) - 1, 0)
+    hi = int(np.searchsorted(jds, end_jd, side="right"))
+    return jds[lo:hi + 1], indices[lo:hi + 1]
+
+
+def spans(jds, indices, namer):
+    """Consecutive limbs between boundaries."""
+    return [Span(int(i) + 1, namer(int(i)), float(start), float(end))
+            for i, start, end in zip(indices[:-1], jds[:-1], jds[1:])]
+
+
+def calculate_limbs(start_jd, end_jd, method="sidereal"):
+    """Tithi, nakshatra, yoga and karana spans overlapping [start_jd, end_jd)."""
+    method = canonical_method(method)
+    # Karanas last under a day: with a day of margin either side the even
+    # boundaries (the tithi boundaries) around start and end are included too
+    karana_jds, karana_indices = boundaries(_elongation, KARANA_SPAN, MEAN_RATE_ELONGATION,
+                                            start_jd - 1, end_jd + 1, method)
+    even = karana_indices % 2 == 0
+    tithi_jds, tithi_indices = _trim(karana_jds[even], karana_indices[even] // 2, start_jd, end_jd)
+    karana_jds, karana_indices = _trim(karana_jds, karana_indices, start_jd, end_jd)
+
+    nakshatra_jds, nakshatra_indices = boundaries(_moon, NAKSHATRA_SPAN, MEAN_RATE_MOON, start_jd, end_jd, method)
+    yoga_jds, yoga_indices = boundaries(_yoga, YOGA_SPAN, MEAN_RATE_YOGA, start_jd, end_jd, method)
+    return {
+        "tithi": spans(tithi_jds, tithi_indices, tithi_name),
+        "nakshatra": spans(nakshatra_jds, nakshatra_indices, NAKSHATRAS.__getitem__),
+        "yoga": spans(yoga_jds, yoga_indices, YOGAS.__getitem__),
+        "karana": spans(karana_jds, karana_indices, karana_name),
+    }
+
+
+def sun_times(first_day, days, lat, lon, tz):
+    """(date, sunrise JD, sunset JD) for `days` local days from first_day; None where the Sun doesn't rise/set."""
+    result = []
+    for n in range(days):
+        day = first_day + timedelta(days=n)
+        midnight = get_julian_day(tz.localize(datetime(day.year, day.month, day.day)))
+        sunrise = rise_trans(midnight, swe.SUN, swe.CALC_RISE, lat, lon)
+        sunset = rise_trans(midnight, swe.SUN, swe.CALC_SET, lat, lon)
+        result.append((day, sunrise, sunset))
+    return result
+
+
+def _local_iso(jd, tz):
+    return jd_to_datetime(jd).astimezone(tz).isoformat() if jd is not None else None
+
+
+def calculate_panchang(year: int, lat: float, lon: float, timezone: str = "Asia/Kolkata", method: str = "sidereal"):
+    """
+    A year of Panchang for a location: every tithi, nakshatra, yoga and karana
+    overlapping the (local) year with start and end times, and the daily
+    sunrise/sunset. Times are ISO strings in `timezone`.
+    """
+    tz = pytz.timezone(timezone)
+    start_jd = get_julian_day(tz.localize(datetime(year, 1, 1)))
+    end_jd = get_julian_day(tz.localize(datetime(year + 1, 1, 1)))
+
+    limbs = calculate_limbs(start_jd, end_jd, method)
+    result = {
+        kind: [{"number": s.number, "name": s.name,
+                "start": _local_iso(s.start_jd, tz), "end": _local_iso(s.end_jd, tz)} for s in limb_spans]
+        for kind, limb_spans in limbs.items()
+    }
+    days = (datetime(year + 1, 1, 1) - datetime(year, 1, 1)).days
+    result["days"] = [{"date": day.isoformat(), "sunrise": _local_iso(rise, tz), "sunset": _local_iso(set_, tz)}
+                      for day, rise, set_ in sun_times(datetime(year, 1, 1).date(), days, lat, lon, tz)]
+    return result
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    year = int(sys.argv[1]) if len(sys.argv) > 1 else 2024
+    t0 = time.perf_counter()
+    panchang = calculate_panchang(year, 28.6139, 77.2090)
+    elapsed = time.perf_counter() - t0
+    counts = ", ".join(f"{len(panchang[k])} {k}" for k in ("tithi", "nakshatra", "yoga", "karana", "days"))
+    print(f"Panchang {year} (New Delhi): {counts} in {elapsed:.3f}s")
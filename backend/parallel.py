@@ -0,0 +1,93 @@
+"""
+Process-pool execution for multi-year transit listings.
+
+calculate_transits runs planet after planet on one core. Here the work is
+split into (planet, year) tasks, spread over a ProcessPoolExecutor and merged
+back in the same order the serial code produces, so the result does not
+depend on the worker count or on scheduling.
+
+The pool size comes from TRANSIT_WORKERS (default: CPU count). A value of 1
+(or 0) disables the pool and everything runs in-process.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import planet_transits, transit_planets, year_range_jd
+from ephemeris import canonical_method
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def configured_workers():
+    """Worker count from TRANSIT_WORKERS, defaulting to the number of CPUs."""
+    value = os.environ.get("TRANSIT_WORKERS")
+    if value:
+        return max(1, int(value))
+    return os.cpu_count() or 1
+
+
+def _new_executor(workers):
+    # spawn: workers must not inherit the server's threads and locks
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def get_executor():
+    """Shared process pool of configured_workers() processes, created on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = _new_executor(configured_workers())
+        return _executor
+
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def map_tasks(fn, tasks, workers=None):
+    """
+    list(map(fn, tasks)) over a process pool. workers defaults to the shared
+    TRANSIT_WORKERS pool; 1 runs in-process, any other count uses a dedicated
+    pool of that size. fn must be a module-level function.
+    """
+    workers = configured_workers() if workers is None else workers
+    if workers <= 1 or len(tasks) <= 1:
+        return [fn(task) for task in tasks]
+    if workers == configured_workers():
+        return list(get_executor().map(fn, tasks))
+    with _new_executor(workers) as pool:
+        return list(pool.map(fn, tasks))
+
+
+def _transit_task(task):
+    name, year, method = task
+    start_jd, end_jd = year_range_jd(year)
+    return planet_transits(name, start_jd, end_jd, method)
+
+
+def calculate_transits_range(start_year: int, end_year: int, planet_name: str = None,
+                             method: str = "sidereal", workers: int = None):
+    """
+    Transits for every year in [start_year, end_year], like calculate_transits
+    but computed by (planet, year) tasks across a process pool.
+    workers defaults to the shared TRANSIT_WORKERS pool; 1 runs in-process,
+    any other count uses a dedicated pool of that size.
+    """
+    method = canonical_method(method)
+    tasks = [(name, year, method)
+             for name in transit_planets(planet_name)
+             for year in range(start_year, end_year + 1)]
+    chunks = map_tasks(_transit_task, tasks, workers)
+
+    # Chunks arrive in task order (planet, then year), exactly as the serial loop
+    # appends them; the stable sort then gives the same order as calculate_transits.
+    transits = [t for chunk in chunks for t in chunk]
+    transits.sort(key=lambda x: x.jd)
+    return transits
@@ -0,0 +1,175 @@
+"""
+Single-pass event scanner with pluggable detectors.
+
+The monthly calendar used to run one search per event kind: stations per
+planet, aspects over their own 6-hour sample grid, sign ingresses per planet.
+Here every body any detector needs is sampled once on one shared grid
+(longitude and speed together, Ketu derived from Rahu), and each detector
+finds its events from those arrays. Only the detected crossings cost further
+ephemeris lookups, to refine them.
+
+A detector is any object with:
+
+- kind: the ScanEvent.kind of its events,
+- bodies: the bodies it needs sampled,
+- detect(grid): the ScanEvent it finds in grid.start_jd <= jd < grid.end_jd,
+- optionally prepare(start_jd, end_jd, method, step), called before the
+  bodies are collected, to narrow them down for this scan.
+
+Adding an event type is adding a detector; the grid is not sampled again.
+Brackets are one grid step (6 hours) wide, shorter than the time between two
+crossings of the same kind for any body.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from aspects import (
+    DEFAULT_TARGETS, SAMPLE_STEP, detect_aspects, reachable_combinations, sample_grid, sample_positions,
+)
+from metrics import phase
+from search import (
+    NAKSHATRA_SPAN, SIGN_SPAN, STATION_DIRECT, STATION_RETROGRADE, TOLERANCE_MINUTE,
+    Ingress, Station, refine_ingress, refine_station,
+)
+
+# kind: the detector's kind; body: None for aspects; item: Station, Ingress or AspectHit
+ScanEvent = namedtuple("ScanEvent", ["jd", "kind", "body", "item"])
+
+SampleGrid = namedtuple("SampleGrid", ["start_jd", "end_jd", "method", "jds", "bodies", "lons", "speeds"])
+
+
+def _rows(grid, bodies):
+    return [(name, grid.bodies.index(name)) for name in bodies]
+
+
+class StationDetector:
+    """Retrograde and direct stations: sign changes of speed between samples."""
+    kind = "station"
+
+    def __init__(self, bodies, tolerance=TOLERANCE_MINUTE):
+        self.bodies = list(bodies)
+        self.tolerance = tolerance
+
+    def detect(self, grid):
+        events = []
+        for name, row in _rows(grid, self.bodies):
+            speeds = grid.speeds[row]
+            before, after = speeds[:-1], speeds[1:]
+            for k in np.nonzero(((before > 0) & (after < 0)) | ((before < 0) & (after > 0)))[0]:
+                jd, lon = refine_station(name, grid.method, float(grid.jds[k]), float(before[k]),
+                                         float(grid.jds[k + 1]), float(after[k]),
+                                         self.tolerance, None)
+                if grid.start_jd <= jd < grid.end_jd:
+                    kind = STATION_RETROGRADE if before[k] > 0 else STATION_DIRECT
+                    events.append(ScanEvent(jd, self.kind, name, Station(jd, kind, lon)))
+        return events
+
+
+class IngressDetector:
+    """Crossings of multiples of `span` degrees (sign ingresses by default)."""
+    kind = "ingress"
+
+    def __init__(self, bodies, span=SIGN_SPAN, tolerance=TOLERANCE_MINUTE, kind=None):
+        self.bodies = list(bodies)
+        self.span = span
+        self.tolerance = tolerance
+        if kind is not None:
+            self.kind = kind
+
+    def detect(self, grid):
+        events = []
+        divisions = int(round(360 / self.span))
+        for name, row in _rows(grid, self.bodies):
+            lons = grid.lons[row]
+            index = (lons // self.span).astype(int) % divisions
+            for k in np.nonzero(index[:-1] != index[1:])[0]:
+                i, i_next = index[k], index[k + 1]
+                boundary = float(i_next * self.span if i_next == (i + 1) % divisions else i * self.span)
+                f_lo = float((lons[k] - boundary + 180) % 360 - 180)
+                jd, speed = refine_ingress(name, grid.method, boundary, float(grid.jds[k]), f_lo,
+                                           float(grid.jds[k + 1]), self.tolerance, None)
+                if grid.start_jd <= jd < grid.end_jd:
+                    ingress = Ingress(jd, int(i), int(i_next), boundary % 360, speed)
+                    events.append(ScanEvent(jd, self.kind, name, ingress))
+        return events
+
+
+class NakshatraIngressDetector(IngressDetector):
+    """Nakshatra changes (27 equal divisions of 13 deg 20')."""
+
+    def __init__(self, bodies, tolerance=TOLERANCE_MINUTE):
+        super().__init__(bodies, NAKSHATRA_SPAN, tolerance, kind="nakshatra")
+
+
+class AspectDetector:
+    """
+    Exact aspects between every pair of `bodies` (see aspects.detect_aspects).
+    With prune, prepare() keeps only the pair/target combinations that can
+    become exact within the scan (aspects.reachable_combinations), and only
+    the bodies of those pairs are sampled for it.
+    """
+    kind = "aspect"
+
+    def __init__(self, bodies, targets=DEFAULT_TARGETS, tolerance=TOLERANCE_MINUTE, prune=True):
+        self.all_bodies = list(bodies)
+        self.bodies = list(bodies)
+        self.targets = targets
+        self.tolerance = tolerance
+        self.prune = prune
+        self.combinations = None
+
+    def prepare(self, start_jd, end_jd, method, step):
+        if not self.prune:
+            return
+        # The grid runs up to one step past end_jd
+        self.combinations = {
+            pair: mask for pair, mask in
+            reachable_combinations(self.all_bodies, start_jd, end_jd + step, method, self.targets).items()
+            if mask.any()
+        }
+        used = {body for pair in self.combinations for body in pair}
+        self.bodies = [name for name in self.all_bodies if name in used]
+
+    def detect(self, grid):
+        if not self.bodies:
+            return []
+        rows = [row for _, row in _rows(grid, self.bodies)]
+        hits = detect_aspects(self.bodies, grid.jds, grid.lons[rows], grid.start_jd, grid.end_jd,
+                              grid.method, self.targets, self.tolerance, self.combinations)
+        return [ScanEvent(hit.jd, self.kind, None, hit) for hit in hits]
+
+
+def sample(bodies, start_jd, end_jd, method="sidereal", step=SAMPLE_STEP):
+    """SampleGrid of `bodies` over [start_jd, end_jd] every `step` days."""
+    jds = sample_grid(start_jd, end_jd, step)
+    lons, speeds = sample_positions(bodies, jds, method)
+    return SampleGrid(start_jd, end_jd, method, jds, list(bodies), lons, speeds)
+
+
+def needed_bodies(detectors):
+    """Union of the detectors' bodies, in first-seen order."""
+    bodies = []
+    for detector in detectors:
+        bodies += [name for name in detector.bodies if name not in bodies]
+    return bodies
+
+
+def scan(detectors, start_jd, end_jd, method="sidereal", step=SAMPLE_STEP):
+    """
+    Run every detector over one shared sample grid of [start_jd, end_jd).
+    Returns ScanEvent in time order; simultaneous events keep detector order.
+    Timed in the phases scan.sample and scan.<kind> of each detector.
+    """
+    for detector in detectors:
+        if hasattr(detector, "prepare"):
+            detector.prepare(start_jd, end_jd, method, step)
+    with phase("scan.sample"):
+        grid = sample(needed_bodies(detectors), start_jd, end_jd, method, step)
+    events = []
+    for order, detector in enumerate(detectors):
+        with phase(f"scan.{detector.kind}"):
+            found = detector.detect(grid)
+        events += [(event.jd, order, n, event) for n, event in enumerate(found)]
+    events.sort(key=lambda entry: entry[:3])
+    return [event for *_, event in events]
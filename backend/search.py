@@ -0,0 +1,376 @@
+"""
+Event search engine shared by the transit and calendar calculations.
+
+Instead of walking every planet one day at a time and bisecting a fixed
+number of times, the searches here use each body's speed:
+
+- Ingresses (sign or nakshatra boundaries): from any sample the distance to
+  the nearest boundary divided by the body's maximum speed is a step the body
+  provably cannot cross a boundary in, so slow planets take steps of weeks or
+  months. Once a boundary is bracketed it is refined with Newton's method on
+  longitude (the speed is the derivative), safeguarded by bisection.
+- Stations (speed = 0): stepped with a per-body interval shorter than the
+  shortest retrograde or direct phase, then refined by regula falsi on speed.
+- Crossings of arbitrary longitudes (returns, transits over natal degrees):
+  over any interval a body moves its mean motion give or take a bounded
+  deviation (MEAN_SPEED, MEAN_DEVIATION), so far from every target the next
+  crossing is predicted from the mean motion and the scan jumps straight to
+  the earliest time it could happen - years for the slow planets. Close to
+  a target the maximum-speed bound takes over, and a step the body turns
+  around in is checked at its station, so retrograde re-crossings are
+  found even when they fall inside one step.
+
+Both refine to a configurable time tolerance (`TOLERANCE_MINUTE`,
+`TOLERANCE_SECOND`) and count the ephemeris lookups they make in a
+`SearchStats`.
+
+Run `python search.py [year]` to compare call counts with daily stepping,
+and to see the cost of a century of returns.
+"""
+from collections import namedtuple
+
+from ephemeris import PLANETS, get_planet_position_speed
+
+TOLERANCE_MINUTE = 1.0 / 1440
+TOLERANCE_SECOND = 1.0 / 86400
+
+SIGN_SPAN = 30.0
+NAKSHATRA_SPAN = 360.0 / 27
+
+# Upper bounds of |daily motion| in degrees/day (geocentric), with a small margin.
+MAX_SPEED = {
+    'Sun': 1.03,
+    'Moon': 15.5,
+    'Mercury': 2.25,
+    'Venus': 1.3,
+    'Mars': 0.85,
+    'Jupiter': 0.26,
+    'Saturn': 0.14,
+    'Rahu': 0.06,
+    'Ketu': 0.06,
+    'Uranus': 0.07,
+    'Neptune': 0.04,
+    'Pluto': 0.045,
+}
+
+# Mean daily motion (degrees/day) and the widest spread of the longitude
+# about its mean-motion line, in degrees, with a margin (fitted over
+# 1800-2200): in any dt days a body moves MEAN_SPEED * dt give or take
+# MEAN_DEVIATION. Mercury and Venus move with the Sun on average; the
+# mean nodes regress.
+MEAN_SPEED = {
+    'Sun': 0.9856,
+    'Moon': 13.1764,
+    'Mercury': 0.9856,
+    'Venus': 0.9856,
+    'Mars': 0.5240,
+    'Jupiter': 0.0831,
+    'Saturn': 0.0335,
+    'Rahu': -0.0530,
+    'Ketu': -0.0530,
+    'Uranus': 0.0118,
+    'Neptune': 0.0060,
+    'Pluto': 0.0039,
+}
+MEAN_DEVIATION = {
+    'Sun': 5.0,
+    'Moon': 19.0,
+    'Mercury': 59.0,
+    'Venus': 107.0,
+    'Mars': 119.0,
+    'Jupiter': 38.0,
+    'Saturn': 29.0,
+    'Rahu': 1.0,
+    'Ketu': 1.0,
+    'Uranus': 21.0,
+    'Neptune': 8.0,
+    'Pluto': 71.0,
+}
+
+# Station scan step in days: well under the shortest retrograde or direct
+# phase of each body, so two stations can never fall inside one step.
+STATION_STEP = {
+    'Mercury': 6.0,
+    'Venus': 15.0,
+    'Mars': 20.0,
+    'Jupiter': 30.0,
+    'Saturn': 30.0,
+    'Uranus': 30.0,
+    'Neptune': 30.0,
+    'Pluto': 30.0,
+}
+
+# Smallest ingress step, as a fraction of the boundary span travelled at
+# maximum speed. Keeps the scan from creeping towards a boundary forever.
+MIN_STEP_FRACTION = 0.02
+
+STATION_RETROGRADE = "retrograde"
+STATION_DIRECT = "direct"
+
+Ingress = namedtuple("Ingress", ["jd", "from_index", "to_index", "longitude", "speed"])
+Station = namedtuple("Station", ["jd", "kind", "longitude"])
+Crossing = namedtuple("Crossing", ["jd", "target", "speed"])
+
+
+class SearchStats:
+    """Ephemeris lookups made by one or more searches."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __repr__(self):
+        return f"SearchStats(calls={self.calls})"
+
+
+def _sample(body, jd, method, stats):
+    if stats is not None:
+        stats.calls += 1
+    return get_planet_position_speed(jd, body, PLANETS[body], method)
+
+
+def _offset(lon, boundary):
+    """Signed angular distance of lon from boundary, in [-180, 180)."""
+    return (lon - boundary + 180) % 360 - 180
+
+
+def refine_ingress(body, method, boundary, lo, f_lo, hi, tolerance, stats):
+    """
+    Newton iteration on f(t) = lon(t) - boundary inside the bracket [lo, hi].
+    Returns (jd, speed).
+    """
+    t = (lo + hi) / 2
+    speed = 0.0
+    while hi - lo > tolerance:
+        lon, speed = _sample(body, t, method, stats)
+        f = _offset(lon, boundary)
+        if (f < 0) == (f_lo < 0):
+            lo, f_lo = t, f
+        else:
+            hi = t
+        if speed:
+            step = f / speed
+            if abs(step) < tolerance / 2:
+                return t - step, speed
+            t_next = t - step
+        else:
+            t_next = lo - 1
+        # Fall back to bisection when Newton leaves the bracket (e.g. near a station)
+        t = t_next if lo < t_next < hi else (lo + hi) / 2
+    return (lo + hi) / 2, speed
+
+
+def iter_ingresses(body, start_jd, end_jd, method="sidereal", span=SIGN_SPAN,
+                   tolerance=TOLERANCE_MINUTE, stats=None):
+    """
+    Yield every crossing of a multiple of `span` degrees by `body` in
+    [start_jd, end_jd), including retrograde re-crossings, as Ingress in time order.
+    Lazy, so arbitrarily long ranges can be consumed in constant memory.
+    """
+    max_speed = MAX_SPEED[body]
+    min_step = MIN_STEP_FRACTION * span / max_speed
+    divisions = int(round(360 / span))
+
+    t = start_jd
+    lon, _ = _sample(body, t, method, stats)
+    index = int(lon / span) % divisions
+
+    while t < end_jd:
+        within = lon - index * span
+        nearest = min(within, span - within)
+        step = max(nearest / max_speed, min_step)
+        t_next = min(t + step, end_jd)
+
+        lon_next, speed_next = _sample(body, t_next, method, stats)
+        index_next = int(lon_next / span) % divisions
+
+        if index_next != index:
+            if index_next == (index + 1) % divisions:
+                boundary = index_next * span
+            else:
+                boundary = index * span
+            jd, speed = refine_ingress(body, method, boundary, t, _offset(lon, boundary),
+                                        t_next, tolerance, stats)
+            yield Ingress(jd, index, index_next, boundary % 360, speed)
+
+        t, lon, index = t_next, lon_next, index_next
+
+
+def find_ingresses(body, start_jd, end_jd, method="sidereal", span=SIGN_SPAN,
+                   tolerance=TOLERANCE_MINUTE, stats=None):
+    """List form of iter_ingresses."""
+    return list(iter_ingresses(body, start_jd, end_jd, method, span, tolerance, stats))
+
+
+def find_sign_ingresses(body, start_jd, end_jd, method="sidereal", tolerance=TOLERANCE_MINUTE, stats=None):
+    """Sign (rasi) changes; from_index/to_index are 0-based sign indices."""
+    return find_ingresses(body, start_jd, end_jd, method, SIGN_SPAN, tolerance, stats)
+
+
+def find_nakshatra_ingresses(body, start_jd, end_jd, method="sidereal", tolerance=TOLERANCE_MINUTE, stats=None):
+    """Nakshatra changes; from_index/to_index are 0-based nakshatra indices."""
+    return find_ingresses(body, start_jd, end_jd, method, NAKSHATRA_SPAN, tolerance, stats)
+
+
+def refine_station(body, method, lo, v_lo, hi, v_hi, tolerance, stats):
+    """Regula falsi (Illinois variant) on speed inside [lo, hi]. Returns (jd, longitude)."""
+    lon = None
+    side = 0
+    t = (lo + hi) / 2
+    while hi - lo > tolerance:
+        t = hi - v_hi * (hi - lo) / (v_hi - v_lo)
+        if not lo < t < hi:
+            t = (lo + hi) / 2
+        lon, v = _sample(body, t, method, stats)
+        if (v < 0) == (v_hi < 0):
+            hi, v_hi = t, v
+            if side == 1:
+                v_lo /= 2
+            side = 1
+        else:
+            lo, v_lo = t, v
+            if side == -1:
+                v_hi /= 2
+            side = -1
+        if v == 0:
+            break
+    if lon is None:
+        lon, _ = _sample(body, t, method, stats)
+    return t, lon
+
+
+def iter_stations(body, start_jd, end_jd, method="sidereal", tolerance=TOLERANCE_MINUTE, stats=None):
+    """
+    Yield the stations of `body` in [start_jd, end_jd) as Station in time order.
+    Bodies without stations (Sun, Moon, mean nodes) yield nothing.
+    """
+    step = STATION_STEP.get(body)
+    if step is None:
+        return
+
+    t = start_jd
+    _, speed = _sample(body, t, method, stats)
+    while t < end_jd:
+        t_next = min(t + step, end_jd)
+        _, speed_next = _sample(body, t_next, method, stats)
+        if (speed > 0 and speed_next < 0) or (speed < 0 and speed_next > 0):
+            jd, lon = refine_station(body, method, t, speed, t_next, speed_next, tolerance, stats)
+            kind = STATION_RETROGRADE if speed > 0 else STATION_DIRECT
+            yield Station(jd, kind, lon)
+        t, speed = t_next, speed_next
+
+
+def find_stations(body, start_jd, end_jd, method="sidereal", tolerance=TOLERANCE_MINUTE, stats=None):
+    """List form of iter_stations."""
+    return list(iter_stations(body, start_jd, end_jd, method, tolerance, stats))
+
+
+def _crossing_free(body, lon, targets):
+    """
+    Days from a sample at `lon` in which `body` provably reaches none of
+    `targets`: per target the longer of the maximum-speed and the mean-motion
+    bound, and the shortest of those over the targets.
+    """
+    max_speed = MAX_SPEED[body]
+    mean = MEAN_SPEED[body]
+    deviation = MEAN_DEVIATION[body]
+    direction = 1 if mean > 0 else -1
+    free = float("inf")
+    for target in targets:
+        ahead = (direction * (target - lon)) % 360  # distance in the direction of mean motion
+        behind = 360 - ahead
+        bound = min(ahead, behind) / max_speed
+        if behind > deviation:
+            # Cannot fall back to the target, and reaches it no sooner than
+            # the mean motion plus the deviation allows
+            bound = max(bound, (ahead - deviation) / abs(mean))
+        free = min(free, bound)
+    return free
+
+
+def iter_crossings(body, targets, start_jd, end_jd, method="sidereal", tolerance=TOLERANCE_MINUTE, stats=None):
+    """
+    Yield every time `body` crosses one of the longitudes `targets` in
+    [start_jd, end_jd), including retrograde re-crossings, as Crossing
+    (target normalized to [0, 360); negative speed when crossing retrograde)
+    in time order. Lazy, so arbitrarily long ranges can be consumed in constant memory.
+    """
+    targets = sorted({target % 360 for target in targets})
+    min_step = MIN_STEP_FRACTION * SIGN_SPAN / MAX_SPEED[body]
+
+    t = start_jd
+    lon, speed = _sample(body, t, method, stats)
+    while t < end_jd:
+        free = _crossing_free(body, lon, targets)
+        if free >= min_step:
+            # Nothing can be reached before t + free, however far the body moves
+            t = min(t + free, end_jd)
+            lon, speed = _sample(body, t, method, stats)
+            continue
+
+        t_next = min(t + min_step, end_jd)
+        lon_next, speed_next = _sample(body, t_next, method, stats)
+        found = []
+        station = None
+        for target in targets:
+            f, f_next = _offset(lon, target), _offset(lon_next, target)
+            if (f < 0) != (f_next < 0):
+                jd, v = refine_ingress(body, method, target, t, f, t_next, tolerance, stats)
+                found.append(Crossing(jd, target, v))
+            elif (speed < 0) != (speed_next < 0):
+                # Turned around inside the step (min_step is shorter than any
+                # retrograde or direct phase, so at most once): the target was
+                # crossed and re-crossed if the station lies beyond it.
+                if station is None:
+                    station = refine_station(body, method, t, speed, t_next, speed_next, tolerance, stats)
+                t_station, lon_station = station
+                f_station = _offset(lon_station, target)
+                if (f_station < 0) != (f < 0):
+                    jd, v = refine_ingress(body, method, target, t, f, t_station, tolerance, stats)
+                    found.append(Crossing(jd, target, v))
+                    jd, v = refine_ingress(body, method, target, t_station, f_station, t_next, tolerance, stats)
+                    found.append(Crossing(jd, target, v))
+        found.sort()
+        yield from found
+
+        t, lon, speed = t_next, lon_next, speed_next
+
+
+def find_crossings(body, targets, start_jd, end_jd, method="sidereal", tolerance=TOLERANCE_MINUTE, stats=None):
+    """List form of iter_crossings."""
+    return list(iter_crossings(body, targets, start_jd, end_jd, method, tolerance, stats))
+
+
+if __name__ == "__main__":
+    import sys
+    import swisseph as swe
+
+    year = int(sys.argv[1]) if len(sys.argv) > 1 else 2024
+    start_jd = swe.julday(year, 1, 1, 0.0)
+    end_jd = swe.julday(year + 1, 1, 1, 0.0)
+    days = int(end_jd - start_jd)
+
+    total_new = total_old = 0
+    print(f"Sign ingress + station search for {year} (sidereal)")
+    for body in PLANETS:
+        stats = SearchStats()
+        ingresses = find_sign_ingresses(body, start_jd, end_jd, tolerance=TOLERANCE_SECOND, stats=stats)
+        stations = find_stations(body, start_jd, end_jd, tolerance=TOLERANCE_SECOND, stats=stats)
+        # Daily stepping + 10 bisections (+1 speed lookup) per event, as the scans used to do
+        steps = days * 4 + 1 if body == 'Moon' else days + 1
+        old = steps + 11 * len(ingresses)
+        if body in STATION_STEP:
+            old += days + 1 + 11 * len(stations)
+        total_new += stats.calls
+        total_old += old
+        print(f"  {body:8} {len(ingresses):3} ingresses {len(stations):2} stations  "
+              f"{stats.calls:5} calls (daily stepping: {old})")
+    print(f"  total    {total_new} calls (daily stepping: {total_old})")
+
+    # Returns: every crossing of each body's longitude on 1 Jan `year` over the next century
+    print(f"Returns {year}-{year + 100} (sidereal)")
+    for body in PLANETS:
+        stats = SearchStats()
+        lon, _ = _sample(body, start_jd, "sidereal", None)
+        crossings = find_crossings(body, [lon], start_jd + 1, start_jd + 36525, tolerance=TOLERANCE_SECOND, stats=stats)
+        retrograde = sum(c.speed < 0 for c in crossings)
+        print(f"  {body:8} {len(crossings):4} crossings ({retrograde:3} retrograde) {stats.calls:6} calls")
@@ -0,0 +1,63 @@
+"""
+Lazy, chronologically ordered event streams over arbitrary date ranges.
+
+Transits: each planet is its own generator, already in time order;
+heapq.merge interleaves them so the combined stream is chronological while
+holding only one pending item per source. Memory therefore stays flat however
+long the range is, and the first events are produced as soon as every source
+has found its first one.
+
+Calendar events: the range is scanned in consecutive windows with the same
+detectors as the monthly calendar (see scanner.py), so memory is bounded by
+one window's events.
+"""
+import heapq
+
+from engine import (
+    CALENDAR_ASPECTS, CALENDAR_EVENT_FORMATTERS, EVENT_PLANETS, STATION_PLANETS,
+    transit_planets, transit_record,
+)
+from ephemeris import canonical_method
+from scanner import AspectDetector, IngressDetector, StationDetector, scan
+from search import SIGN_SPAN, TOLERANCE_SECOND, iter_ingresses
+
+# Calendar events are scanned one window at a time.
+SCAN_WINDOW_DAYS = 30
+
+
+def _tagged(kind, name, items):
+    """(jd, kind, name, item) tuples for heapq.merge."""
+    for item in items:
+        yield item.jd, kind, name, item
+
+
+def _by_jd(entry):
+    return entry[0]
+
+
+def iter_transits(start_jd, end_jd, planet_name=None, method="sidereal"):
+    """Yield /api/transits records for [start_jd, end_jd) in time order."""
+    method = canonical_method(method)
+    streams = [
+        _tagged("transit", name, iter_ingresses(name, start_jd, end_jd, method, SIGN_SPAN, TOLERANCE_SECOND))
+        for name in transit_planets(planet_name)
+    ]
+    for _, _, name, ingress in heapq.merge(*streams, key=_by_jd):
+        yield transit_record(name, ingress)
+
+
+def iter_events(start_jd, end_jd, method="sidereal"):
+    """Yield calendar events (stations, aspects, sign changes) for [start_jd, end_jd) in time order."""
+    method = canonical_method(method)
+    # Same detectors, and tie order, as the monthly calendar
+    detectors = [
+        StationDetector(STATION_PLANETS),
+        AspectDetector(EVENT_PLANETS, CALENDAR_ASPECTS),
+        IngressDetector(EVENT_PLANETS, SIGN_SPAN, TOLERANCE_SECOND),
+    ]
+    window_start = start_jd
+    while window_start < end_jd:
+        window_end = min(window_start + SCAN_WINDOW_DAYS, end_jd)
+        for event in scan(detectors, window_start, window_end, method):
+            yield CALENDAR_EVENT_FORMATTERS[event.kind](event)
+        window_start = window_end
@@ -0,0 +1,99 @@
+"""
+Reference scans for the tests: sample on a fixed grid, find every change of
+a discrete state between neighbouring samples, and bisect it. Slow but
+obviously correct, like the day-stepping search the engine started from.
+"""
+from collections import defaultdict
+
+import numpy as np
+
+from ephemeris import PLANETS, get_planet_position_speed, get_positions_speeds
+from search import TOLERANCE_MINUTE
+
+HOUR = 1 / 24
+
+
+def position(body, jd, method="sidereal"):
+    return get_planet_position_speed(jd, body, PLANETS[body], method)
+
+
+def grid(start_jd, end_jd, step=HOUR):
+    return np.arange(start_jd, end_jd, step)
+
+
+def positions(body, jds, method="sidereal"):
+    return get_positions_speeds(jds, body, PLANETS[body], method)
+
+
+def bisect(state, lo, hi, tolerance=TOLERANCE_MINUTE / 4):
+    """JD at which state(jd) first differs from state(lo), within [lo, hi]."""
+    before = state(lo)
+    while hi - lo > tolerance:
+        mid = (lo + hi) / 2
+        if state(mid) == before:
+            lo = mid
+        else:
+            hi = mid
+    return (lo + hi) / 2
+
+
+def changes(states, jds, state):
+    """(jd, before, after) of every change of `states` (the state at `jds`), bisected with state(jd)."""
+    found = []
+    for k in np.nonzero(states[:-1] != states[1:])[0].tolist():
+        found.append((bisect(state, float(jds[k]), float(jds[k + 1])), states[k], states[k + 1]))
+    return found
+
+
+def ingresses(body, start_jd, end_jd, span=30.0, method="sidereal", step=HOUR):
+    """(jd, from, to) of every crossing of a multiple of `span` by `body`."""
+    divisions = int(round(360 / span))
+    jds = grid(start_jd, end_jd, step)
+    lons, _ = positions(body, jds, method)
+    states = (lons // span).astype(int) % divisions
+    return changes(states, jds, lambda jd: int(position(body, jd, method)[0] // span) % divisions)
+
+
+def offset(angle, target):
+    """Signed distance of angle from target, in [-180, 180)."""
+    return (angle - target + 180) % 360 - 180
+
+
+def crossings(angles, jds, target, angle_at):
+    """
+    JD of every crossing of `target` by the angle sampled as `angles` at
+    `jds` (angle_at(jd) gives it anywhere), not counting the jump at the antipode.
+    """
+    offsets = offset(angles, target)
+    found = []
+    for k in np.nonzero((offsets[:-1] < 0) != (offsets[1:] < 0))[0].tolist():
+        if abs(offsets[k] - offsets[k + 1]) >= 180:
+            continue
+        found.append(bisect(lambda jd: offset(angle_at(jd), target) < 0, float(jds[k]), float(jds[k + 1])))
+    return found
+
+
+def assert_same_events(found, expected, max_error=2 * TOLERANCE_MINUTE):
+    """found and expected, (jd, *key) tuples in time order, have the same keys and times within max_error."""
+    assert [key for _, *key in found] == [key for _, *key in expected]
+    for (jd, *_), (expected_jd, *_) in zip(found, expected):
+        assert abs(jd - expected_jd) < max_error
+
+
+def assert_same_event_sets(found, expected, max_error=2 * TOLERANCE_MINUTE):
+    """
+    Like assert_same_events, for lists whose simultaneous events may come in
+    any order: per key, the same number of events at the same times.
+    """
+    def by_key(events):
+        times = defaultdict(list)
+        for jd, *key in events:
+            times[tuple(key)].append(jd)
+        return {key: sorted(jds) for key, jds in times.items()}
+
+    found, expected = by_key(found), by_key(expected)
+    assert sorted(found, key=str) == sorted(expected, key=str)
+    for key, jds in expected.items():
+        assert len(found[key]) == len(jds), key
+        for jd, expected_jd in zip(found[key], jds):
+            assert abs(jd - expected_jd) < max_error, key
@@ -0,0 +1,12 @@
+"""
+Shared setup for the backend tests: run them from backend/ with
+`python -m pytest tests`. The modules use flat imports, so backend/ goes on
+sys.path; the result cache stays in memory and the warmup scheduler is off.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("CACHE_DB_PATH", "")
+os.environ.setdefault("WARMUP_ENABLED", "0")
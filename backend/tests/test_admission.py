@@ -0,0 +1,90 @@
+"""ComputePool admission: bounded work, Overloaded past the limit, and the API's 503 + Retry-After."""
+import gc
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from admission import ComputePool, Overloaded
+
+
+@pytest.fixture
+def pool():
+    pool = ComputePool("test", workers=1, queue_depth=1)
+    yield pool
+    pool.shutdown()
+
+
+def test_calls_past_the_limit_are_rejected(pool):
+    release = threading.Event()
+    blockers = [threading.Thread(target=pool.run, args=(release.wait, 10)) for _ in range(pool.limit)]
+    for thread in blockers:
+        thread.start()
+    while pool.stats()["active"] < pool.limit:
+        threading.Event().wait(0.001)
+    with pytest.raises(Overloaded) as error:
+        pool.run(lambda: None)
+    assert error.value.retry_after >= 1
+    release.set()
+    for thread in blockers:
+        thread.join(10)
+    stats = pool.stats()
+    assert (stats["active"], stats["rejected"], stats["calls"]) == (0, 1, pool.limit)
+    assert pool.run(lambda: "done") == "done"
+
+
+def test_nested_calls_run_inline(pool):
+    # On the pool's single worker a nested run() must not wait for a worker
+    assert pool.run(lambda: pool.run(lambda: threading.current_thread().name)).startswith("test-pool")
+
+
+def test_admitted_thread_is_counted_once(pool):
+    with pool.admit():
+        assert pool.stats()["active"] == 1
+        assert pool.run(lambda: 1) == 1
+        assert pool.stats()["active"] == 1
+    assert pool.stats()["active"] == 0
+
+
+def test_stream_holds_a_slot_until_exhausted(pool):
+    chunks = []
+
+    def items():
+        for n in range(20):
+            chunks.append(threading.current_thread().name)
+            yield n
+
+    stream = pool.stream(items())
+    assert pool.stats()["active"] == 1
+    assert list(stream) == list(range(20))
+    assert pool.stats()["active"] == 0
+    # Computed on the pool's worker, in chunks of 1, 2, 4, 8, then the rest
+    assert all(name.startswith("test-pool") for name in chunks)
+    assert pool.stats()["calls"] == 5
+
+
+def test_unstarted_stream_is_released(pool):
+    streams = [pool.stream(iter(range(3))) for _ in range(pool.limit)]
+    with pytest.raises(Overloaded):
+        pool.stream(iter(()))
+    streams[0].close()
+    assert pool.stats()["active"] == pool.limit - 1
+    del streams
+    gc.collect()
+    assert pool.stats()["active"] == 0
+
+
+def test_api_answers_503_with_retry_after_when_full():
+    client = TestClient(main.app)
+    streams = [main.COMPUTE_POOL.stream(iter(())) for _ in range(main.COMPUTE_POOL.limit)]
+    try:
+        response = client.get("/api/transits", params={"year": 1901, "planet": "Mars"})
+        assert response.status_code == 503
+        assert int(response.headers["Retry-After"]) >= 1
+        # Lightweight endpoints never enter the pool
+        assert client.get("/").status_code == 200
+    finally:
+        for stream in streams:
+            stream.close()
+    assert client.get("/api/transits", params={"year": 1901, "planet": "Mars"}).status_code == 200
@@ -0,0 +1,91 @@
+"""engine.py's transit and calendar listings against brute-force scans of the same ephemeris."""
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+import brute_force
+from engine import (
+    CALENDAR_ASPECTS, EVENT_ASPECT, EVENT_NAKSHATRA, EVENT_PLANETS, EVENT_STATION, EVENT_TRANSIT, STATION_PLANETS,
+    calculate_monthly_events, calculate_transits, month_range_jd, transit_planets, year_range_jd,
+)
+from parallel import calculate_transits_range
+from search import NAKSHATRA_SPAN, STATION_DIRECT, STATION_RETROGRADE
+
+YEAR = 2024
+
+
+def transit_keys(transits):
+    return [(t.jd, t.planet, t.from_index, t.to_index) for t in transits]
+
+
+@pytest.mark.parametrize("method", ["sidereal", "tropical", "kp"])
+def test_transits_match_brute_force(method):
+    start_jd, end_jd = year_range_jd(YEAR)
+    transits = calculate_transits(YEAR, method=method)
+    expected = sorted((jd, name, before, after)
+                      for name in transit_planets()
+                      for jd, before, after in brute_force.ingresses(name, start_jd, end_jd, method=method))
+    brute_force.assert_same_events(transit_keys(transits), expected)
+    for t in transits:
+        assert t.retrograde == (brute_force.position(t.planet, t.jd, method)[1] < 0)
+
+
+def test_moon_transits_match_brute_force():
+    start_jd, end_jd = year_range_jd(YEAR)
+    expected = [(jd, "Moon", before, after) for jd, before, after in brute_force.ingresses("Moon", start_jd, end_jd)]
+    brute_force.assert_same_events(transit_keys(calculate_transits(YEAR, "Moon")), expected)
+
+
+@pytest.mark.parametrize("planet", [None, "Mars"])
+def test_transits_range_matches_yearly_transits(planet):
+    expected = [t for year in range(YEAR - 1, YEAR + 2) for t in calculate_transits(year, planet)]
+    # In-process and over a process pool: same records in the same order
+    for workers in (1, 2):
+        transits = calculate_transits_range(YEAR - 1, YEAR + 1, planet, workers=workers)
+        assert [(t.jd, t.planet, t.from_index, t.to_index, t.retrograde) for t in transits] == \
+               [(t.jd, t.planet, t.from_index, t.to_index, t.retrograde) for t in expected]
+
+
+def brute_force_month(year, month, method="sidereal", nakshatras=False):
+    """(jd, kind, body, other, value) of the calendar events of a month, from hourly samples."""
+    start_jd, end_jd = month_range_jd(year, month)
+    jds = brute_force.grid(start_jd, end_jd)
+    sampled = {name: brute_force.positions(name, jds, method) for name in EVENT_PLANETS}
+    events = []
+    for name in STATION_PLANETS:
+        speeds = sampled[name][1]
+        for jd, before, _ in brute_force.changes(speeds < 0, jds,
+                                                 lambda jd: brute_force.position(name, jd, method)[1] < 0):
+            events.append((jd, EVENT_STATION, name, None, STATION_DIRECT if before else STATION_RETROGRADE))
+    for first, second in combinations(EVENT_PLANETS, 2):
+        if {first, second} == {"Rahu", "Ketu"}:
+            continue  # always exactly opposite: nothing is ever crossed
+        separations = (sampled[first][0] - sampled[second][0]) % 360
+
+        def separation(jd):
+            return brute_force.position(first, jd, method)[0] - brute_force.position(second, jd, method)[0]
+
+        for target in CALENDAR_ASPECTS:
+            for jd in brute_force.crossings(separations, jds, target, separation):
+                events.append((jd, EVENT_ASPECT, first, second, target))
+    for name in EVENT_PLANETS:
+        for jd, _, sign in brute_force.ingresses(name, start_jd, end_jd, method=method):
+            events.append((jd, EVENT_TRANSIT, name, None, sign))
+        if nakshatras:
+            for jd, _, nakshatra in brute_force.ingresses(name, start_jd, end_jd, NAKSHATRA_SPAN, method):
+                events.append((jd, EVENT_NAKSHATRA, name, None, nakshatra))
+    return events
+
+
+@pytest.mark.parametrize("year, month, method, nakshatras", [
+    (2024, 4, "sidereal", False),   # Mercury retrograde, Sun conjunct Rahu
+    (2024, 8, "sidereal", True),
+    (2025, 3, "tropical", False),
+    (2023, 12, "fagan_bradley", True),
+])
+def test_monthly_events_match_brute_force(year, month, method, nakshatras):
+    events = calculate_monthly_events(year, month, method, nakshatras)
+    assert np.all(np.diff([e.jd for e in events]) >= 0)
+    found = [(e.jd, e.kind, e.body, e.other, e.value) for e in events]
+    brute_force.assert_same_event_sets(found, brute_force_month(year, month, method, nakshatras))
@@ -0,0 +1,53 @@
+"""Sidereal positions derived from tropical ones against Swiss Ephemeris' own FLG_SIDEREAL."""
+import numpy as np
+import pytest
+
+from ephemeris import (
+    AYANAMSAS, PLANETS, ayanamsa, ayanamsa_many, calc_ut, get_planet_position_speed, get_positions_speeds,
+)
+
+# Dates spread over 1900-2100
+JDS = np.random.default_rng(0).uniform(2415020.5, 2488069.5, 50)
+ARCSECOND = 1 / 3600
+# The ayanamsa interpolation is good to 1e-4"; allow for rounding in the subtraction
+MAX_LONGITUDE_ERROR = 1e-3 * ARCSECOND
+# degree/day: swe's sidereal speeds differ from tropical speed minus the
+# ayanamsa rate by a few 1e-6 (its own differentiation), about 0.02"/day
+MAX_SPEED_ERROR = 1e-5
+
+
+def angle_difference(a, b):
+    return abs((a - b + 180) % 360 - 180)
+
+
+@pytest.mark.parametrize("method", list(AYANAMSAS))
+@pytest.mark.parametrize("body", [name for name in PLANETS if name != "Ketu"])
+def test_derived_sidereal_matches_flg_sidereal(body, method):
+    for jd in JDS.tolist():
+        lon, speed = get_planet_position_speed(jd, body, PLANETS[body], method)
+        reference = calc_ut(jd, PLANETS[body], method)[0]
+        assert angle_difference(lon, reference[0]) < MAX_LONGITUDE_ERROR
+        assert abs(speed - reference[3]) < MAX_SPEED_ERROR
+
+
+@pytest.mark.parametrize("method", list(AYANAMSAS))
+def test_ketu_opposite_rahu(method):
+    for jd in JDS.tolist():
+        ketu, _ = get_planet_position_speed(jd, "Ketu", PLANETS["Ketu"], method)
+        rahu = calc_ut(jd, PLANETS["Rahu"], method)[0][0]
+        assert angle_difference(ketu, (rahu + 180) % 360) < MAX_LONGITUDE_ERROR
+
+
+@pytest.mark.parametrize("method", list(AYANAMSAS))
+def test_vectorized_matches_scalar(method):
+    values, rates = ayanamsa_many(JDS, method)
+    lons, speeds = get_positions_speeds(JDS, "Mars", PLANETS["Mars"], method)
+    for n, jd in enumerate(JDS.tolist()):
+        assert (values[n], rates[n]) == pytest.approx(ayanamsa(jd, method), abs=1e-12)
+        lon, speed = get_planet_position_speed(jd, "Mars", PLANETS["Mars"], method)
+        assert angle_difference(lons[n], lon) < 1e-9
+        assert speeds[n] == pytest.approx(speed, abs=1e-12)
+
+
+def test_tropical_has_no_ayanamsa():
+    assert ayanamsa(JDS[0], "tropical") == (0.0, 0.0)
@@ -0,0 +1,171 @@
+"""Live channels: a snapshot first, deltas that rebuild the content, and a snapshot resync for a lagging subscriber."""
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from live import Broadcaster, Channel, Subscription, TooManyChannels, content_delta, position_delta
+
+BODIES = ["Sun", "Moon", "Mars"]
+
+
+def content(tick):
+    """Made-up channel content at `tick`: the Moon moves every tick, Mars every other one, the Sun never."""
+    speeds = {"Sun": 0, "Moon": 13, "Mars": tick % 2}
+    return {
+        "timestamp": f"t{tick}",
+        "ayanamsa": 24.1,
+        "positions": [
+            {"name": name, "longitude": (10 * i + speeds[name] * tick) % 360, "sign": (i + speeds[name] * tick // 30) % 12}
+            for i, name in enumerate(BODIES)
+        ],
+    }
+
+
+def serialize(content):
+    return json.dumps(content).encode()
+
+
+def apply(content, delta):
+    """`content` updated with a delta message's fields, as a client would."""
+    updated = {**content, **{k: v for k, v in delta.items() if k not in ("type", "seq", "positions")}}
+    updated["positions"] = [{**p, **delta["positions"].get(p["name"], {})} for p in content["positions"]]
+    return updated
+
+
+def body(message):
+    data = json.loads(message.data)
+    assert (data.pop("type"), data.pop("seq")) == (message.type, message.seq)
+    return data
+
+
+def take(subscription):
+    return asyncio.run(asyncio.wait_for(subscription.next(), 1))
+
+
+def subscribe(channel):
+    subscription = Subscription(channel)
+    channel.subscribers.add(subscription)
+    return subscription
+
+
+@pytest.fixture
+def channel():
+    return Channel(Broadcaster(compute=None, serialize=serialize), key="test")
+
+
+def test_position_delta_has_changed_fields_only():
+    before, after = content(1)["positions"], content(2)["positions"]
+    assert position_delta(before, after) == {
+        "Moon": {"longitude": (10 + 26) % 360},
+        "Mars": {"longitude": 20},
+    }
+    assert position_delta(after, after) == {}
+
+
+def test_content_delta_per_method():
+    before = {"timestamp": "t1", "positions": {"sidereal": content(1)["positions"], "kp": content(1)["positions"]}}
+    after = {"timestamp": "t2", "positions": {"sidereal": content(2)["positions"], "kp": content(1)["positions"]}}
+    delta = content_delta(before, after)
+    assert delta["timestamp"] == "t2"
+    assert delta["positions"]["kp"] == {}
+    assert delta["positions"]["sidereal"] == position_delta(content(1)["positions"], content(2)["positions"])
+
+
+def test_deltas_rebuild_the_content(channel):
+    subscription = subscribe(channel)
+    channel.publish(content(0))
+    first = take(subscription)
+    assert (first.type, first.seq) == ("snapshot", 1)
+    state = body(first)
+    for tick in range(1, 40):
+        channel.publish(content(tick))
+        message = take(subscription)
+        assert (message.type, message.seq) == ("delta", tick + 1)
+        state = apply(state, body(message))
+        assert state == content(tick)
+    assert channel.broadcaster.resyncs == 0
+
+
+def test_late_subscriber_starts_with_the_current_snapshot(channel):
+    channel.publish(content(0))
+    channel.publish(content(1))
+    subscription = subscribe(channel)
+    message = take(subscription)
+    assert (message.type, message.seq) == ("snapshot", 2)
+    assert body(message) == content(1)
+    channel.publish(content(2))
+    assert apply(content(1), body(take(subscription))) == content(2)
+
+
+def test_lagging_subscriber_resyncs_with_a_snapshot(channel):
+    fast, slow = subscribe(channel), subscribe(channel)
+    channel.publish(content(0))
+    take(fast), take(slow)
+    for tick in range(1, 4):
+        channel.publish(content(tick))
+        take(fast)
+    # slow missed the deltas of ticks 1 and 2; it holds only tick 3, as a snapshot
+    message = take(slow)
+    assert (message.type, message.seq) == ("snapshot", 4)
+    assert body(message) == content(3)
+    assert channel.broadcaster.resyncs == 2
+    # and follows with deltas again
+    state = body(message)
+    channel.publish(content(4))
+    message = take(slow)
+    assert message.type == "delta"
+    assert apply(state, body(message)) == content(4)
+
+
+def test_subscription_before_the_first_tick_waits_for_a_snapshot(channel):
+    subscription = subscribe(channel)
+
+    async def scenario():
+        waiting = asyncio.create_task(subscription.next())
+        await asyncio.sleep(0)
+        assert not waiting.done()
+        channel.publish(content(0))
+        return await asyncio.wait_for(waiting, 1)
+
+    message = asyncio.run(scenario())
+    assert message.type == "snapshot"
+    assert body(message) == content(0)
+
+
+def test_broadcaster_channels_share_a_task_and_stop_with_the_last_subscriber():
+    computed = []
+
+    def compute(key, tick):
+        computed.append(key)
+        return content(0)
+
+    async def scenario():
+        broadcaster = Broadcaster(compute, serialize, tick_seconds=60, max_channels=1)
+        first, second = broadcaster.subscribe("a"), broadcaster.subscribe("a")
+        with pytest.raises(TooManyChannels):
+            broadcaster.subscribe("b")
+        messages = [await asyncio.wait_for(s.next(), 5) for s in (first, second)]
+        assert messages[0] is messages[1]
+        assert messages[0].type == "snapshot"
+        task = first.channel.task
+        broadcaster.unsubscribe(first)
+        assert not task.cancelled()
+        broadcaster.unsubscribe(second)
+        await asyncio.sleep(0)
+        assert task.cancelled()
+        assert broadcaster.stats() == {"channels": 0, "subscribers": 0, "ticks": 1, "resyncs": 0}
+
+    asyncio.run(scenario())
+    assert computed == ["a"]
+
+
+def test_websocket_starts_with_a_snapshot():
+    # Not entered as a context manager: the app's shutdown would stop its shared pools
+    with TestClient(main.app).websocket_connect("/api/live/ws?method=sidereal") as websocket:
+        message = websocket.receive_json()
+    assert (message["type"], message["seq"]) == ("snapshot", 1)
+    assert {p["name"] for p in message["positions"]} >= {"Sun", "Moon", "Rahu", "Ketu"}
+    assert main.LIVE.stats()["channels"] == 0
@@ -0,0 +1,44 @@
+"""search.py against a brute-force scan: hourly samples, each change bisected."""
+import pytest
+
+import brute_force
+from engine import year_range_jd
+from ephemeris import PLANETS
+from search import NAKSHATRA_SPAN, SIGN_SPAN, iter_crossings, iter_ingresses
+
+YEAR = 2024
+
+
+@pytest.mark.parametrize("body", list(PLANETS))
+@pytest.mark.parametrize("span", [SIGN_SPAN, NAKSHATRA_SPAN])
+def test_ingresses_match_brute_force(body, span):
+    start_jd, end_jd = year_range_jd(YEAR)
+    found = [(i.jd, i.from_index, i.to_index) for i in iter_ingresses(body, start_jd, end_jd, span=span)]
+    brute_force.assert_same_events(found, brute_force.ingresses(body, start_jd, end_jd, span))
+
+
+def test_ingresses_tropical():
+    start_jd, end_jd = year_range_jd(YEAR)
+    found = [(i.jd, i.from_index, i.to_index) for i in iter_ingresses("Mercury", start_jd, end_jd, "tropical")]
+    brute_force.assert_same_events(found, brute_force.ingresses("Mercury", start_jd, end_jd, method="tropical"))
+
+
+# Slow bodies are sampled daily: they move under 0.15 degree a day
+@pytest.mark.parametrize("body, targets, years, step", [
+    ("Moon", [0, 123.4], 1, brute_force.HOUR),
+    ("Mercury", [15, 100, 250.5], 2, brute_force.HOUR),
+    ("Venus", [345.5], 4, brute_force.HOUR),
+    ("Saturn", [345, 355.5], 30, 1),
+    ("Ketu", [10, 200], 40, 1),
+    ("Pluto", [-60.25], 40, 1),
+])
+def test_crossings_match_brute_force(body, targets, years, step):
+    start_jd, _ = year_range_jd(2000)
+    end_jd = start_jd + years * 365.25
+    found = [(c.jd, c.target) for c in iter_crossings(body, targets, start_jd, end_jd)]
+    jds = brute_force.grid(start_jd, end_jd, step)
+    lons, _ = brute_force.positions(body, jds)
+    expected = sorted((jd, target % 360) for target in targets
+                      for jd in brute_force.crossings(lons, jds, target % 360,
+                                                      lambda jd: brute_force.position(body, jd)[0]))
+    brute_force.assert_same_events(found, expected)
@@ -0,0 +1,81 @@
+"""SingleFlight: concurrent callers of one key share a single computation."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from singleflight import SingleFlight
+
+CALLERS = 8
+
+
+def run_concurrently(flight, key, fn):
+    """flight.do(key, fn) from CALLERS threads, all started while the first call runs; their outcomes."""
+    with ThreadPoolExecutor(CALLERS) as pool:
+        futures = [pool.submit(flight.do, key, fn) for _ in range(CALLERS)]
+        outcomes = []
+        for future in futures:
+            try:
+                outcomes.append(future.result(timeout=10))
+            except Exception as e:
+                outcomes.append(e)
+    return outcomes
+
+
+def gated(result, started, release, calls):
+    """fn for do(): counts its calls, and blocks until every caller has joined."""
+    def fn():
+        calls.append(1)
+        started.set()
+        release.wait(10)
+        if isinstance(result, Exception):
+            raise result
+        return result
+    return fn
+
+
+def wait_for_waiters(flight, started, release):
+    started.wait(10)
+    # Release the leader once the others have joined it
+    while flight.stats()["coalesced"] < CALLERS - 1:
+        time.sleep(0.001)
+    release.set()
+
+
+def test_concurrent_calls_run_once():
+    flight, started, release, calls = SingleFlight(), threading.Event(), threading.Event(), []
+    result = object()
+    threading.Thread(target=wait_for_waiters, args=(flight, started, release)).start()
+    outcomes = run_concurrently(flight, "key", gated(result, started, release, calls))
+    assert len(calls) == 1
+    assert all(outcome is result for outcome in outcomes)
+    assert flight.stats() == {"executions": 1, "coalesced": CALLERS - 1, "in_flight": 0}
+
+
+def test_error_reaches_every_caller():
+    flight, started, release, calls = SingleFlight(), threading.Event(), threading.Event(), []
+    error = ValueError("failed")
+    threading.Thread(target=wait_for_waiters, args=(flight, started, release)).start()
+    outcomes = run_concurrently(flight, "key", gated(error, started, release, calls))
+    assert len(calls) == 1
+    assert all(outcome is error for outcome in outcomes)
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_finished_key_runs_again():
+    flight = SingleFlight()
+    assert flight.do("key", lambda: 1) == 1
+    assert flight.do("key", lambda: 2) == 2
+    with pytest.raises(KeyError):
+        flight.do("key", lambda: {}["missing"])
+    assert flight.stats() == {"executions": 3, "coalesced": 0, "in_flight": 0}
+
+
+def test_different_keys_do_not_wait_for_each_other():
+    flight, release = SingleFlight(), threading.Event()
+    with ThreadPoolExecutor(2) as pool:
+        blocked = pool.submit(flight.do, "a", lambda: release.wait(10) and "a")
+        assert flight.do("b", lambda: "b") == "b"
+        release.set()
+        assert blocked.result(timeout=10) == "a"
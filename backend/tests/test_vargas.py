@@ -0,0 +1,96 @@
+"""vargas.py's tables against the Parashara rules, written out one varga at a time."""
+import numpy as np
+import pytest
+
+from engine import ZODIAC_SIGNS
+from vargas import VARGAS, varga_signs, with_vargas
+
+ARIES, TAURUS, GEMINI, CANCER, LEO, VIRGO, LIBRA, SCORPIO, SAGITTARIUS, CAPRICORN, AQUARIUS, PISCES = range(12)
+
+PARTS = {"D1": 1, "D2": 2, "D3": 3, "D4": 4, "D7": 7, "D9": 9, "D10": 10, "D12": 12, "D16": 16, "D20": 20,
+         "D24": 24, "D27": 27, "D30": 30, "D40": 40, "D45": 45, "D60": 60}
+
+# Trimsamsa: (end degree, sign) of the parts ruled by Mars, Saturn, Jupiter, Mercury, Venus in odd
+# signs, and by Venus, Mercury, Jupiter, Saturn, Mars in even signs
+TRIMSAMSA_ODD = ((5, ARIES), (10, AQUARIUS), (18, SAGITTARIUS), (25, GEMINI), (30, LIBRA))
+TRIMSAMSA_EVEN = ((5, TAURUS), (12, VIRGO), (20, PISCES), (25, CAPRICORN), (30, SCORPIO))
+
+
+def reference(varga, longitude):
+    """Sign of `longitude` in `varga`, one rule at a time."""
+    sign, degree = int(longitude // 30), longitude % 30
+    part = int(degree * PARTS[varga] / 30)
+    odd = sign % 2 == 0
+    movable, fixed = sign % 3 == 0, sign % 3 == 1
+    element = ("fire", "earth", "air", "water")[sign % 4]
+    if varga == "D1":
+        return sign
+    if varga == "D2":
+        return (LEO if part == 0 else CANCER) if odd else (CANCER if part == 0 else LEO)
+    if varga == "D3":
+        return (sign + (0, 4, 8)[part]) % 12          # the sign, its 5th, its 9th
+    if varga == "D4":
+        return (sign + 3 * part) % 12                 # the sign and its kendras
+    if varga == "D7":
+        return ((sign if odd else sign + 6) + part) % 12
+    if varga == "D9":
+        start = {"fire": ARIES, "earth": CAPRICORN, "air": LIBRA, "water": CANCER}[element]
+        return (start + part) % 12
+    if varga == "D10":
+        return ((sign if odd else sign + 8) + part) % 12
+    if varga == "D12":
+        return (sign + part) % 12
+    if varga in ("D16", "D45"):
+        return ((ARIES if movable else LEO if fixed else SAGITTARIUS) + part) % 12
+    if varga == "D20":
+        return ((ARIES if movable else SAGITTARIUS if fixed else LEO) + part) % 12
+    if varga == "D24":
+        return ((LEO if odd else CANCER) + part) % 12
+    if varga == "D27":
+        start = {"fire": ARIES, "earth": CANCER, "air": LIBRA, "water": CAPRICORN}[element]
+        return (start + part) % 12
+    if varga == "D30":
+        return next(target for end, target in (TRIMSAMSA_ODD if odd else TRIMSAMSA_EVEN) if degree < end)
+    if varga == "D40":
+        return ((ARIES if odd else LIBRA) + part) % 12
+    if varga == "D60":
+        return (sign + part) % 12
+    raise ValueError(varga)
+
+
+def test_every_varga_has_a_rule():
+    assert set(VARGAS) == set(PARTS)
+
+
+@pytest.mark.parametrize("varga", VARGAS)
+def test_every_part_matches_the_rule(varga):
+    # The middle of every part of every sign, and every whole degree (the Trimsamsa boundaries)
+    longitudes = sorted({s * 30 + (p + 0.5) * 30 / PARTS[varga] for s in range(12) for p in range(PARTS[varga])}
+                        | {d + 0.5 for d in range(360)} | set(range(360)))
+    signs = varga_signs(np.array(longitudes), [varga])[varga]
+    assert signs.tolist() == [reference(varga, lon) for lon in longitudes]
+
+
+def test_known_placements():
+    signs = varga_signs([15.0, 30.0, 37.0, 359.999999], ["D9", "D30", "D2"])
+    assert signs["D9"].tolist() == [LEO, CAPRICORN, PISCES, PISCES]
+    assert signs["D30"].tolist() == [SAGITTARIUS, TAURUS, VIRGO, SCORPIO]
+    assert signs["D2"].tolist() == [CANCER, CANCER, CANCER, LEO]
+
+
+def test_shape_and_wrapping():
+    longitudes = np.random.default_rng(0).uniform(-720, 720, (5, 13))
+    signs = varga_signs(longitudes)
+    wrapped = varga_signs(longitudes % 360)
+    for varga in VARGAS:
+        assert signs[varga].shape == longitudes.shape
+        assert np.array_equal(signs[varga], wrapped[varga])
+        assert signs[varga].min() >= 0 and signs[varga].max() < 12
+
+
+def test_with_vargas_names_signs():
+    positions = [{"name": "Sun", "full_degree": 15.0}, {"name": "Moon", "full_degree": 200.0}]
+    charts = with_vargas(positions, ("D1", "D9"))
+    assert charts[0]["vargas"] == {"D1": "Aries", "D9": "Leo"}
+    assert charts[1]["vargas"]["D1"] == ZODIAC_SIGNS[LIBRA]
+    assert "vargas" not in positions[0]
@@ -0,0 +1,126 @@
+"""
+Divisional charts (vargas): the 16 Shodasha vargas of Parashara.
+
+A varga divides every sign into N parts and maps each part to a sign. All
+of them are table lookups: VARGA_TABLES holds, per varga, the resulting sign
+for every (sign, part) pair, so any number of longitudes - one chart, or
+an array of charts x bodies - is mapped with one floor, one multiply and one
+fancy index per varga, whatever its rule. The unequal Trimsamsa (D30) uses
+one part per degree, which all its boundaries fall on.
+
+Signs are 0-based (0 = Aries); "odd" signs are Aries, Gemini, ... (index 0, 2, ...).
+
+Usage: python vargas.py [charts] prints the cost of all 16 vargas for
+`charts` charts of 13 bodies.
+"""
+import sys
+import time
+
+import numpy as np
+
+from engine import ZODIAC_SIGNS
+
+VARGA_NAMES = {
+    "D1": "Rasi",
+    "D2": "Hora",
+    "D3": "Drekkana",
+    "D4": "Chaturthamsa",
+    "D7": "Saptamsa",
+    "D9": "Navamsa",
+    "D10": "Dasamsa",
+    "D12": "Dwadasamsa",
+    "D16": "Shodasamsa",
+    "D20": "Vimsamsa",
+    "D24": "Chaturvimsamsa",
+    "D27": "Saptavimsamsa",
+    "D30": "Trimsamsa",
+    "D40": "Khavedamsa",
+    "D45": "Akshavedamsa",
+    "D60": "Shashtiamsa",
+}
+VARGAS = tuple(VARGA_NAMES)
+
+_ODD = np.arange(12) % 2 == 0
+_MODALITY = np.arange(12) % 3   # 0 movable, 1 fixed, 2 dual
+_ELEMENT = np.arange(12) % 4    # 0 fire, 1 earth, 2 air, 3 water
+
+# Trimsamsa: (end degree, sign) of the five parts, for odd and for even signs
+_TRIMSAMSA_ODD = ((5, 0), (10, 10), (18, 8), (25, 2), (30, 6))    # Mars, Saturn, Jupiter, Mercury, Venus
+_TRIMSAMSA_EVEN = ((5, 1), (12, 5), (20, 11), (25, 9), (30, 7))   # Venus, Mercury, Jupiter, Saturn, Mars
+
+
+def _counted(start, parts):
+    """(12, parts) table: part p of sign s falls in sign start[s] + p."""
+    return (np.asarray(start)[:, None] + np.arange(parts)[None, :]) % 12
+
+
+def _trimsamsa():
+    table = np.empty((12, 30), dtype=np.int64)
+    for sign in range(12):
+        degree = 0
+        for end, target in _TRIMSAMSA_ODD if _ODD[sign] else _TRIMSAMSA_EVEN:
+            table[sign, degree:end] = target
+            degree = end
+    return table
+
+
+def _build_tables():
+    signs = np.arange(12)
+    hora = np.where(_ODD[:, None], [[4, 3]], [[3, 4]])   # Leo (Sun) / Cancer (Moon)
+    return {
+        "D1": signs[:, None],
+        "D2": hora,
+        "D3": (signs[:, None] + np.array([0, 4, 8])[None, :]) % 12,
+        "D4": (signs[:, None] + 3 * np.arange(4)[None, :]) % 12,
+        "D7": _counted(np.where(_ODD, signs, signs + 6), 7),
+        "D9": _counted(np.array([0, 9, 6, 3])[_ELEMENT], 9),
+        "D10": _counted(np.where(_ODD, signs, signs + 8), 10),
+        "D12": _counted(signs, 12),
+        "D16": _counted(np.array([0, 4, 8])[_MODALITY], 16),
+        "D20": _counted(np.array([0, 8, 4])[_MODALITY], 20),
+        "D24": _counted(np.where(_ODD, 4, 3), 24),
+        "D27": _counted(np.array([0, 3, 6, 9])[_ELEMENT], 27),
+        "D30": _trimsamsa(),
+        "D40": _counted(np.where(_ODD, 0, 6), 40),
+        "D45": _counted(np.array([0, 4, 8])[_MODALITY], 45),
+        "D60": _counted(signs, 60),
+    }
+
+
+# varga -> (12, parts) array of resulting signs
+VARGA_TABLES = _build_tables()
+
+
+def varga_signs(longitudes, vargas=VARGAS):
+    """
+    {varga: signs} for an array of longitudes (any shape); each value is an
+    int array of the same shape with the 0-based sign in that varga.
+    """
+    longitudes = np.asarray(longitudes, dtype=float) % 360
+    signs = (longitudes // 30).astype(np.int64) % 12
+    in_sign = longitudes - 30 * (longitudes // 30)
+    result = {}
+    for varga in vargas:
+        table = VARGA_TABLES[varga]
+        parts = table.shape[1]
+        part = np.minimum((in_sign * (parts / 30)).astype(np.int64), parts - 1)
+        result[varga] = table[signs, part]
+    return result
+
+
+def with_vargas(positions, vargas=VARGAS):
+    """Copies of position entries (engine.calculate_positions) with "vargas": {varga: sign name}."""
+    signs = varga_signs([p["full_degree"] for p in positions], vargas)
+    return [{**p, "vargas": {v: ZODIAC_SIGNS[signs[v][n]] for v in vargas}} for n, p in enumerate(positions)]
+
+
+if __name__ == "__main__":
+    charts = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    longitudes = np.random.default_rng(0).uniform(0, 360, (charts, 13))
+    varga_signs(longitudes[:1])
+    for vargas in (("D9",), VARGAS):
+        t0 = time.perf_counter()
+        varga_signs(longitudes, vargas)
+        elapsed = time.perf_counter() - t0
+        print(f"{len(vargas):2} vargas x {charts} charts x 13 bodies: {elapsed * 1000:.1f} ms "
+              f"({elapsed / len(vargas) * 1e9 / longitudes.size:.1f} ns per body and varga)")
@@ -0,0 +1,155 @@
+"""
+Background warmup of the result cache.
+
+A daemon thread started with the app precomputes /api/calendar months and
+/api/transits years for the current year +/- WARMUP_YEARS and every method in
+WARMUP_METHODS, nearest to today first (the current month, then the current
+year's transits, then outwards). It re-plans when the month changes, so the
+window rolls forward at month and year boundaries.
+
+Foreground requests win: the scheduler only starts a job while no request is
+being served, and a request for a key the scheduler is computing joins that
+computation through the single-flight layer instead of starting its own.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytz
+
+logger = logging.getLogger(__name__)
+
+IST = pytz.timezone('Asia/Kolkata')
+
+
+class ActivityTracker:
+    """Counts requests in progress so background work can stay out of their way."""
+
+    def __init__(self):
+        self._active = 0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def track(self):
+        with self._cond:
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    @property
+    def active(self):
+        return self._active
+
+    def wait_idle(self, stop_event, poll=0.5):
+        """Block until no request is in progress (or stop_event is set)."""
+        with self._cond:
+            while self._active and not stop_event.is_set():
+                self._cond.wait(poll)
+
+
+def plan_jobs(today, years_around, methods):
+    """
+    Warmup jobs as (priority, kind, params) sorted by priority.
+    Priority is the distance in months from today's month; a year's transit
+    listing counts as being at its middle, except the current year's which
+    comes right after the current month.
+    """
+    here = today.year * 12 + today.month - 1
+    jobs = []
+    for year in range(today.year - years_around, today.year + years_around + 1):
+        transit_priority = 0.5 if year == today.year else abs(year * 12 + 5.5 - here)
+        for method in methods:
+            jobs.append((transit_priority, "transits", (year, method)))
+            for month in range(1, 13):
+                jobs.append((abs(year * 12 + month - 1 - here), "calendar", (year, month, method)))
+    jobs.sort(key=lambda job: job[0])
+    return jobs
+
+
+class WarmupScheduler:
+    """
+    Runs planned jobs through run_job(kind, params) on a daemon thread.
+    run_job is expected to be cheap when the result is already cached.
+    """
+
+    def __init__(self, run_job, activity, years_around=1, methods=("sidereal", "tropical"), recheck_seconds=600):
+        self.run_job = run_job
+        self.activity = activity
+        self.years_around = years_around
+        self.methods = tuple(methods)
+        self.recheck_seconds = recheck_seconds
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._status = {"state": "stopped", "window": None, "total": 0, "done": 0, "failed": 0,
+                        "current": None, "started_at": None, "finished_at": None}
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self._update(state="stopped", current=None)
+
+    def status(self):
+        with self._lock:
+            return dict(self._status)
+
+    def _update(self, **fields):
+        with self._lock:
+            self._status.update(fields)
+
+    def _run(self):
+        planned_month = None
+        while not self._stop.is_set():
+            today = datetime.now(IST).date()
+            if (today.year, today.month) != planned_month:
+                planned_month = (today.year, today.month)
+                self._run_plan(today)
+            # Re-check periodically so the window rolls over at month/year boundaries
+            self._stop.wait(self.recheck_seconds)
+
+    def _run_plan(self, today):
+        jobs = plan_jobs(today, self.years_around, self.methods)
+        self._update(state="running", window=[today.year - self.years_around, today.year + self.years_around],
+                     total=len(jobs), done=0, failed=0, started_at=time.time(), finished_at=None)
+        for _, kind, params in jobs:
+            self.activity.wait_idle(self._stop)
+            if self._stop.is_set():
+                return
+            self._update(current=f"{kind}:{':'.join(map(str, params))}")
+            try:
+                self.run_job(kind, params)
+            except Exception:
+                logger.exception("Warmup job %s %s failed", kind, params)
+                with self._lock:
+                    self._status["failed"] += 1
+            with self._lock:
+                self._status["done"] += 1
+        self._update(state="idle", current=None, finished_at=time.time())
+
+
+def scheduler_from_env(run_job, activity):
+    """
+    WarmupScheduler configured from WARMUP_YEARS (default 1) and WARMUP_METHODS
+    (comma separated, default "sidereal,tropical"). Returns None when
+    WARMUP_ENABLED is "0".
+    """
+    if os.environ.get("WARMUP_ENABLED", "1") == "0":
+        return None
+    years = int(os.environ.get("WARMUP_YEARS", 1))
+    methods = [m.strip() for m in os.environ.get("WARMUP_METHODS", "sidereal,tropical").split(",") if m.strip()]
+    return WarmupScheduler(run_job, activity, years_around=years, methods=methods)
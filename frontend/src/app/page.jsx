@@ -1,7 +1,7 @@
 'use client';
 
 import { useEffect, useState } from 'react';
-import { fetchCurrentPositions } from '../services/api';
+import { fetchCurrentPositions, subscribeLivePositions } from '../services/api';
 import { RefreshCw } from 'lucide-react';
 import ZodiacChart from '../components/ZodiacChart';
 import { useCalculationMethod } from '../context/CalculationMethodContext';
@@ -25,6 +25,8 @@ export default function Dashboard() {
 
     useEffect(() => {
         loadData();
+        // Keep the chart moving with the server's live stream instead of re-fetching
+        return subscribeLivePositions(method, setData);
     }, [method]);
 
     if (loading && !data) {
@@ -19,3 +19,28 @@ export const fetchCalendar = async (year, month, method = 'sidereal') => {
     const response = await fetch(`${API_BASE_URL}/calendar?year=${year}&month=${month}&method=${method}`);
     return response.json();
 };
+
+// Live positions pushed by the server (/api/live, server-sent events): a full
+// snapshot first, then only the changed fields per tick. onUpdate receives the
+// merged /api/current-shaped object; call the returned function to unsubscribe.
+export const subscribeLivePositions = (method = 'sidereal', onUpdate) => {
+    const source = new EventSource(`${API_BASE_URL}/live?method=${method}`);
+    let current = null;
+
+    source.addEventListener('snapshot', (event) => {
+        current = JSON.parse(event.data);
+        onUpdate(current);
+    });
+    source.addEventListener('delta', (event) => {
+        if (!current) return;
+        const { positions, ...fields } = JSON.parse(event.data);
+        current = {
+            ...current,
+            ...fields,
+            positions: current.positions.map((p) => (positions[p.name] ? { ...p, ...positions[p.name] } : p)),
+        };
+        onUpdate(current);
+    });
+
+    return () => source.close();
+};